@@ -0,0 +1,41 @@
+"""
+比較各音訊特徵提取模式的轉換速度
+
+python benchmarks/bench_audio_modes.py [秒數]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3.music_to_wave import MODES, convert_samples  # noqa: E402
+
+
+def synth(seconds: float, sr: int = 44100) -> np.ndarray:
+    t = np.arange(int(seconds * sr)) / sr
+    rng = np.random.default_rng(0)
+    bass = 0.4 * np.sin(2 * np.pi * 55 * t) * (t % 0.5 < 0.1)
+    lead = 0.2 * np.sin(2 * np.pi * 880 * t * (1 + 0.01 * np.sin(2 * np.pi * 5 * t)))
+    hats = 0.05 * rng.standard_normal(len(t)) * (t % 0.25 < 0.02)
+    return (bass + lead + hats).astype(np.float32)
+
+
+def main(seconds: float) -> None:
+    sr = 44100
+    y = synth(seconds, sr)
+    print(f"{seconds:.0f}s of audio @ {sr} Hz")
+    for mode in MODES:
+        convert_samples(y[:sr], sr, mode)
+        elapsed = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            convert_samples(y, sr, mode)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        print(f"{mode:>9}: {elapsed * 1000:8.1f} ms  ({seconds / elapsed:7.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,64 @@
+"""
+比較逐一發送與 batch() 發送「設定強度 + 發送波形」時，App收齊所有訊息的延遲
+
+python benchmarks/bench_batch.py [actions]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3 import PULSES, dglabv3  # noqa: E402
+from dglabv3.dtype import Channel  # noqa: E402
+from dglabv3.relay import DGLabRelay  # noqa: E402
+from dglabv3.tracer import LatencyHistogram  # noqa: E402
+
+
+async def action(client: dglabv3, power: int) -> None:
+    await client.set_strength_value(Channel.BOTH, power)
+    await client.send_wave_message(PULSES["呼吸"], 1, Channel.BOTH)
+
+
+async def measure(client: dglabv3, app, actions: int, batched: bool) -> LatencyHistogram:
+    histogram = LatencyHistogram()
+    for i in range(actions):
+        start = time.perf_counter()
+        if batched:
+            async with client.batch():
+                await action(client, i % 50)
+        else:
+            await action(client, i % 50)
+        for _ in range(4):
+            await app.recv()
+        histogram.record((time.perf_counter() - start) * 1000)
+    return histogram
+
+
+async def main(actions: int = 500) -> None:
+    relay = DGLabRelay(host="127.0.0.1", port=0)
+    await relay.start()
+    client = dglabv3(url=relay.url)
+    await client.connect_and_wait(timeout=5)
+    app = await connect(relay.url + client.client_id)
+    app_id = json.loads(await app.recv())["clientId"]
+    await app.send(json.dumps({"type": "bind", "clientId": client.client_id, "targetId": app_id, "message": "DGLAB"}))
+    await client.wait_for_app_connect(timeout=5)
+    for _ in range(3):
+        await app.recv()
+    try:
+        for name, batched in (("sequential", False), ("batch", True)):
+            stats = (await measure(client, app, actions, batched)).to_dict()
+            print(f"{name:<10} mean {stats['mean']:6.3f}ms  p99 <= {stats['p99']}ms")
+    finally:
+        await client.close()
+        await app.close()
+        await relay.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*map(int, sys.argv[1:])))
@@ -0,0 +1,90 @@
+"""
+比較解碼器與分析取樣率的轉換速度，並檢查結果與原始取樣率的差異
+
+python benchmarks/bench_decode.py [音訊檔案]
+
+未指定檔案時產生 60 秒的測試音樂
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3.music_to_wave import ANALYSIS_SR, convert_audio_to_v3_protocol  # noqa: E402
+
+# 與原始取樣率結果的平均絕對誤差上限 (V3 頻率值 / 強度 0-100)
+FREQ_TOLERANCE = 3.0
+INTENSITY_TOLERANCE = 3.0
+CASES = [
+    ("librosa", None),
+    ("librosa", ANALYSIS_SR),
+    ("soundfile", None),
+    ("soundfile", ANALYSIS_SR),
+    ("soundfile", 8000),
+    ("audioread", ANALYSIS_SR),
+    ("ffmpeg", ANALYSIS_SR),
+    ("auto", ANALYSIS_SR),
+]
+
+
+def synth_song(path: str, seconds: int = 60, sr: int = 44100) -> None:
+    t = np.arange(sr * seconds) / sr
+    rng = np.random.default_rng(1)
+    beat = t % 0.5
+    kick = 0.6 * np.sin(2 * np.pi * (50 + 60 * np.exp(-beat * 30)) * beat) * np.exp(-beat * 12)
+    bass_freq = np.array([41.2, 55, 49, 36.7])[(t // 2).astype(int) % 4]
+    bass = 0.25 * np.sin(2 * np.pi * np.cumsum(bass_freq) / sr)
+    chords = sum(0.06 * np.sin(2 * np.pi * f * t) for f in (261.6, 329.6, 392))
+    hats = 0.08 * rng.standard_normal(len(t)) * np.exp(-((t + 0.25) % 0.5) * 60)
+    envelope = np.clip(t / 2, 0, 1) * np.clip((seconds - t) / 2, 0, 1)
+    y = ((kick + bass + chords + hats) * envelope).astype(np.float32)
+    soundfile.write(path, np.stack([y, y * 0.8], axis=1), sr)
+
+
+def best_of(func, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(path: str) -> None:
+    minutes = soundfile.info(path).duration / 60
+    convert_audio_to_v3_protocol(path)
+    baseline_time, baseline = best_of(lambda: convert_audio_to_v3_protocol(path))
+    reference = np.array(baseline)
+    print(f"{path}: {minutes * 60:.1f}s")
+    print(f"tolerance: freq MAE <= {FREQ_TOLERANCE}, intensity MAE <= {INTENSITY_TOLERANCE}")
+    print(f"{'backend':>10} {'sr':>6} {'s/min':>8} {'speedup':>8} {'freq':>6} {'int':>6}")
+    for backend, sr in CASES:
+        try:
+            elapsed, wave = best_of(lambda: convert_audio_to_v3_protocol(path, analysis_sr=sr, backend=backend))
+        except Exception as e:
+            print(f"{backend:>10} {str(sr):>6}  unavailable ({e.__class__.__name__})")
+            continue
+        timing = f"{backend:>10} {str(sr):>6} {elapsed / minutes:8.3f} {baseline_time / elapsed:7.2f}x"
+        if len(wave) != len(reference):
+            print(f"{timing}  length {len(wave)} != {len(reference)}  OUT OF TOLERANCE")
+            continue
+        error = np.abs(np.array(wave) - reference)
+        freq_error, intensity_error = error[:, 0].mean(), error[:, 1].mean()
+        ok = freq_error <= FREQ_TOLERANCE and intensity_error <= INTENSITY_TOLERANCE
+        print(f"{timing} {freq_error:6.2f} {intensity_error:6.2f}  {'ok' if ok else 'OUT OF TOLERANCE'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in ("wav", "mp3"):
+                song = os.path.join(directory, f"song.{extension}")
+                synth_song(song)
+                main(song)
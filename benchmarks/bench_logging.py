@@ -0,0 +1,72 @@
+"""
+訊息收發的記錄成本基準測試，比較 INFO 等級與完全停用記錄時每則訊息的耗時
+
+python benchmarks/bench_logging.py [messages]
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3 import dglabv3  # noqa: E402
+
+legacy_logger = logging.getLogger("dglabv3.bench")
+
+
+class NullSocket:
+    async def send(self, text: str) -> None:
+        pass
+
+
+async def send_path(client: dglabv3, count: int) -> float:
+    message = {"type": "clientMsg", "channel": "A", "message": "A:" + json.dumps(["0a0a0a0a64646464"] * 4), "time": 1}
+    start = time.perf_counter()
+    for _ in range(count):
+        await client._send_message(dict(message))
+    return time.perf_counter() - start
+
+
+async def receive_path(client: dglabv3, count: int) -> float:
+    data = json.dumps({"type": "msg", "clientId": "c", "targetId": "t", "message": "strength-10+20+100+100"})
+    start = time.perf_counter()
+    for _ in range(count):
+        await client._handle_message(data)
+    return time.perf_counter() - start
+
+
+def legacy_path(count: int) -> float:
+    """
+    改寫前每則訊息無條件組合 f-string 的成本
+    """
+    message = {"type": "msg", "clientId": "c", "targetId": "t", "message": "strength-10+20+100+100"}
+    start = time.perf_counter()
+    for _ in range(count):
+        legacy_logger.debug(f"Received message: {message}")
+    return time.perf_counter() - start
+
+
+async def main(count: int = 100_000) -> None:
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+    client = dglabv3()
+    client.client = NullSocket()
+    client.client_id, client.target_id = "c", "t"
+
+    for name, path in (("send", send_path), ("receive", receive_path)):
+        logging.disable(logging.CRITICAL)
+        await path(client, count // 10)
+        baseline = await path(client, count)
+        logging.disable(logging.NOTSET)
+        at_info = await path(client, count)
+        overhead = (at_info - baseline) / count * 1e9
+        print(f"{name:<8} disabled {baseline / count * 1e6:6.2f} us/msg  INFO {at_info / count * 1e6:6.2f} us/msg")
+        print(f"         logging overhead at INFO: {overhead:7.1f} ns/msg")
+    print(f"legacy f-string debug at INFO: {legacy_path(count) / count * 1e9:7.1f} ns/msg")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*map(int, sys.argv[1:])))
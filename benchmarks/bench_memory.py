@@ -0,0 +1,49 @@
+"""
+資料模型記憶體基準測試
+
+python benchmarks/bench_memory.py [sessions]
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3.dtype import ChannelStrength, Strength  # noqa: E402
+from dglabv3.wsmessage import WSMessage  # noqa: E402
+
+
+def measure(factory, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del objects
+    return total / count
+
+
+def main(sessions: int = 10_000) -> None:
+    raw = {"type": "msg", "message": "strength-10+20+100+100", "clientId": "c", "targetId": "t"}
+    cases = {
+        "ChannelStrength": lambda i: ChannelStrength(),
+        "Strength": lambda i: Strength(A=i % 100, B=i % 100, MAXA=100, MAXB=100),
+        "WSMessage": lambda i: WSMessage(raw),
+    }
+    print(f"sessions: {sessions}")
+    for name, factory in cases.items():
+        per_object = measure(factory, sessions)
+        print(f"  {name:<16} {per_object:8.1f} B/object  {per_object * sessions / 1024:10.1f} KiB total")
+
+    cs = ChannelStrength()
+    snapshot = Strength(A=10, B=20, MAXA=100, MAXB=100)
+    n = 200_000
+    print(f"set_strength:    {timeit.timeit(lambda: cs.set_strength(snapshot), number=n) / n * 1e9:8.1f} ns")
+    print(f"read A:          {timeit.timeit(lambda: cs.A, number=n) / n * 1e9:8.1f} ns")
+    print(f"WSMessage parse: {timeit.timeit(lambda: WSMessage(raw).strength(), number=n) / n * 1e9:8.1f} ns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
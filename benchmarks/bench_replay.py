@@ -0,0 +1,40 @@
+"""
+以錄製的流量測試訊息處理效能
+
+python benchmarks/bench_replay.py traffic.jsonl
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3 import dglabv3  # noqa: E402
+from dglabv3.record import TrafficReplayer, load_recording  # noqa: E402
+
+
+class NullSocket:
+    async def send(self, text: str) -> None:
+        pass
+
+
+async def main(path: str) -> None:
+    frames = load_recording(path)
+    client = dglabv3()
+    client.client = NullSocket()
+    replayer = TrafficReplayer(frames, speed=0)
+
+    start = time.perf_counter()
+    inbound = await replayer.replay_to_client(client)
+    elapsed = time.perf_counter() - start
+    print(f"inbound:  {inbound} frames in {elapsed:.3f}s ({inbound / max(elapsed, 1e-9):.0f} frames/s)")
+
+    start = time.perf_counter()
+    outbound = await replayer.replay_outbound(client.client.send)
+    elapsed = time.perf_counter() - start
+    print(f"outbound: {outbound} frames in {elapsed:.3f}s ({outbound / max(elapsed, 1e-9):.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1]))
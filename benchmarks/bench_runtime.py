@@ -0,0 +1,89 @@
+"""
+比較預設事件迴圈與 uvloop 在大量同時連線下的表現，
+中繼伺服器、客戶端與模擬的App都在同一個事件迴圈中執行。
+QR code渲染是與事件迴圈無關的CPU工作(每個約 20ms)，測試中略過
+
+python benchmarks/bench_runtime.py [sessions] [messages]
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3 import dglabv3  # noqa: E402
+from dglabv3.dtype import Channel  # noqa: E402
+from dglabv3.qrcache import QRCodeCache  # noqa: E402
+from dglabv3.relay import DGLabRelay  # noqa: E402
+from dglabv3.runtime import DEFAULT, PRODUCTION, RuntimeProfile, run  # noqa: E402
+
+WAVE = [[[10, 10, 10, 10], [50, 50, 50, 50]]] * 4
+
+
+class SkipRender(QRCodeCache):
+    async def render(self, data: str) -> None:
+        return None
+
+
+QR_CACHE = SkipRender()
+
+
+async def session(relay: DGLabRelay, messages: int, semaphore: asyncio.Semaphore, timings: dict) -> None:
+    async with semaphore:
+        client = dglabv3(url=relay.url, qr_cache=QR_CACHE)
+        start = time.perf_counter()
+        await client.connect_and_wait(timeout=60)
+        app = await connect(relay.url + client.client_id, max_queue=None)
+        app_id = json.loads(await app.recv())["clientId"]
+        bind = {"type": "bind", "clientId": client.client_id, "targetId": app_id, "message": "DGLAB"}
+        await app.send(json.dumps(bind))
+        await client.wait_for_app_connect(timeout=60)
+        timings["pair"].append(time.perf_counter() - start)
+    # 綁定時同步強度會送出兩則訊息，加上綁定成功通知
+    expected = 3 + messages
+    start = time.perf_counter()
+    for _ in range(messages):
+        await client.send_wave_message(WAVE, 1, Channel.A)
+    for _ in range(expected):
+        await app.recv()
+    timings["messages"].append(time.perf_counter() - start)
+    await client.close()
+    await app.close()
+
+
+async def main(sessions: int, messages: int) -> dict:
+    relay = DGLabRelay(host="127.0.0.1", port=0, pulse_interval=3600)
+    await relay.start()
+    timings: dict = {"pair": [], "messages": []}
+    semaphore = asyncio.Semaphore(50)
+    start = time.perf_counter()
+    await asyncio.gather(*(session(relay, messages, semaphore, timings) for _ in range(sessions)))
+    total = time.perf_counter() - start
+    await relay.stop()
+    return {"loop": type(asyncio.get_running_loop()).__module__, "total": total, **timings}
+
+
+def report(name: str, profile: RuntimeProfile, sessions: int, messages: int) -> None:
+    result = run(main(sessions, messages), profile)
+    pair = sorted(result["pair"])
+    sent = sessions * messages
+    print(
+        f"{name:<10} loop={result['loop']:<16} total {result['total']:6.2f}s  "
+        f"pair p50 {pair[len(pair) // 2] * 1000:7.1f}ms p99 {pair[int(len(pair) * 0.99)] * 1000:7.1f}ms  "
+        f"{sent / result['total']:8.0f} msg/s"
+    )
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"sessions: {sessions}, messages/session: {messages}")
+    report("default", DEFAULT, sessions, messages)
+    report("tuned", dataclasses.replace(PRODUCTION, uvloop=False), sessions, messages)
+    report("production", PRODUCTION, sessions, messages)
+    asyncio.set_event_loop_policy(None)
@@ -0,0 +1,46 @@
+"""
+波形腳本編譯速度基準測試
+
+python benchmarks/bench_wavescript.py [scripts]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3.wavescript import WaveCompiler  # noqa: E402
+
+TEMPLATES = [
+    "[200ms f={a} i=0..100; 300ms i=100; rest 100ms]x{b}",
+    "A: [100ms f={a} i=100; 100ms i=0]x{b}\nB: 1s f=10..{a} i=50+50*sin(2*pi*t*{b})",
+    "500ms f={a} i=tri(t*{b})*100; 500ms i=square(t*{b})*80; rest 200ms",
+    "AB: 250ms f={a} i=20..80\nA: [100ms i=100; 50ms i=0]x{b}\nB: 2s i=max(0,100-t*{a})",
+]
+
+
+def main(count: int = 5000) -> None:
+    sources = [TEMPLATES[i % len(TEMPLATES)].format(a=10 + i % 200, b=1 + i % 9) for i in range(count)]
+    compiler = WaveCompiler(maxsize=count)
+
+    start = time.perf_counter()
+    frames = sum(len(compiler.compile(source).a) for source in sources)
+    elapsed = time.perf_counter() - start
+    print(f"compile: {count} scripts in {elapsed:.3f}s ({count / elapsed:.0f} scripts/s, {frames} frames)")
+
+    start = time.perf_counter()
+    for source in sources:
+        compiler.compile(source)
+    elapsed = time.perf_counter() - start
+    print(f"cached:  {count} scripts in {elapsed:.3f}s ({count / elapsed:.0f} scripts/s)")
+
+    program = compiler.compile(sources[1])
+    start = time.perf_counter()
+    for _ in range(count):
+        program.hex()
+    elapsed = time.perf_counter() - start
+    print(f"hex:     {count / elapsed:.0f} programs/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
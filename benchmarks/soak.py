@@ -0,0 +1,208 @@
+"""
+長時間浸泡測試：大量客戶端反覆連線、配對、發送波形、斷線，檢查記憶體、任務與檔案描述符是否持續增長
+
+中繼伺服器在同一個行程內執行，心跳與波形重送間隔都縮短，用幾分鐘模擬數天的連線循環。
+暖機後的第一次取樣作為基準，最後一次取樣超過門檻或失敗的連線數超過 --max-errors 時以非零狀態結束。
+
+python benchmarks/soak.py [--generations 20] [--concurrency 100]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional
+
+from websockets.asyncio.client import ClientConnection, connect
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dglabv3 import dglabv3  # noqa: E402
+from dglabv3.dtype import Channel  # noqa: E402
+from dglabv3.qrcache import QRCodeCache  # noqa: E402
+from dglabv3.relay import DGLabRelay  # noqa: E402
+
+WAVE = [[[10, 10, 10, 10], [50, 50, 50, 50]]] * 4
+# 加速後的時鐘：心跳、中繼重送與每個步驟的間隔(秒)
+HEARTBEAT = 0.05
+PULSE = 0.02
+STEP = 0.01
+
+
+class SkipRender(QRCodeCache):
+    async def render(self, data: str) -> None:
+        return None
+
+
+QR_CACHE = SkipRender()
+
+
+@dataclass
+class Sample:
+    sessions: int
+    elapsed: float
+    memory: int
+    tasks: int
+    fds: Optional[int]
+    relay_connections: int
+
+
+def count_fds() -> Optional[int]:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return None
+
+
+async def drain(app: ClientConnection) -> None:
+    try:
+        async for _ in app:
+            pass
+    except Exception:
+        pass
+
+
+async def session(relay: DGLabRelay, steps: int) -> None:
+    client = dglabv3(url=relay.url, qr_cache=QR_CACHE)
+    client.interval = HEARTBEAT
+    reports = []
+
+    async def on_strength(strength) -> None:
+        reports.append(strength)
+
+    client.register_event("strength", on_strength)
+    app = None
+    reader = None
+    try:
+        await client.connect_and_wait(timeout=30)
+        app = await connect(relay.url + client.client_id, max_queue=None)
+        app_id = json.loads(await app.recv())["clientId"]
+        bind = {"type": "bind", "clientId": client.client_id, "targetId": app_id, "message": "DGLAB"}
+        await app.send(json.dumps(bind))
+        await client.wait_for_app_connect(timeout=30)
+        reader = asyncio.create_task(drain(app))
+        report = {"type": "msg", "clientId": client.client_id, "targetId": app_id}
+        for step in range(steps):
+            async with client.batch():
+                await client.set_strength_value(Channel.BOTH, step % 50)
+                await client.send_wave_message(WAVE, 3, Channel.BOTH)
+            await app.send(json.dumps({**report, "message": f"strength-{step % 50}+{step % 50}+100+100"}))
+            await asyncio.sleep(STEP)
+    finally:
+        await client.close()
+        if app is not None:
+            await app.close()
+        if reader is not None:
+            await reader
+
+
+async def settle(relay: DGLabRelay, timeout: float = 30) -> None:
+    """
+    等待中繼伺服器清掉已斷線的連線與重送任務
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if not relay.clients and not relay._pulses:
+            break
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(PULSE * 2)
+    gc.collect()
+
+
+def take_sample(relay: DGLabRelay, sessions: int, start: float) -> Sample:
+    return Sample(
+        sessions=sessions,
+        elapsed=time.perf_counter() - start,
+        memory=tracemalloc.get_traced_memory()[0],
+        tasks=len(asyncio.all_tasks()),
+        fds=count_fds(),
+        relay_connections=len(relay.clients),
+    )
+
+
+def check(samples: List[Sample], errors: int, args: argparse.Namespace) -> List[str]:
+    failures = []
+    if errors > args.max_errors:
+        failures.append(f"{errors} sessions failed (limit {args.max_errors})")
+    if not samples:
+        return failures
+    baseline, last = samples[min(args.warmup, len(samples) - 1)], samples[-1]
+    sessions = last.sessions - baseline.sessions
+    if sessions:
+        per_session = (last.memory - baseline.memory) / sessions
+        if per_session > args.max_bytes_per_session:
+            failures.append(f"memory grew {per_session:.0f} B/session (limit {args.max_bytes_per_session})")
+    if last.tasks > baseline.tasks + args.max_task_growth:
+        failures.append(f"tasks grew from {baseline.tasks} to {last.tasks}")
+    if last.fds is not None and baseline.fds is not None and last.fds > baseline.fds + args.max_fd_growth:
+        failures.append(f"fds grew from {baseline.fds} to {last.fds}")
+    if last.relay_connections:
+        failures.append(f"{last.relay_connections} relay connections left open")
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    relay = DGLabRelay(host="127.0.0.1", port=0, heartbeat_interval=HEARTBEAT, pulse_interval=PULSE)
+    await relay.start()
+    tracemalloc.start(args.frames)
+    start = time.perf_counter()
+    samples: List[Sample] = []
+    sessions = 0
+    errors = 0
+    snapshot = None
+    try:
+        for generation in range(args.generations):
+            results = await asyncio.gather(
+                *(session(relay, args.steps) for _ in range(args.concurrency)), return_exceptions=True
+            )
+            failed = [result for result in results if isinstance(result, BaseException)]
+            if failed:
+                print(f"  {len(failed)} sessions failed: {failed[0]!r}")
+            errors += len(failed)
+            sessions += args.concurrency
+            await settle(relay)
+            sample = take_sample(relay, sessions, start)
+            samples.append(sample)
+            if generation == args.warmup:
+                snapshot = tracemalloc.take_snapshot()
+            print(
+                f"{sample.sessions:>7} sessions  {sample.elapsed:7.1f}s  "
+                f"mem {sample.memory / 1024:9.1f} KiB  tasks {sample.tasks:>4}  "
+                f"fds {sample.fds if sample.fds is not None else '-':>4}  relay {sample.relay_connections}"
+            )
+        failures = check(samples, errors, args)
+        if snapshot is not None:
+            print("top growth since warmup:")
+            for stat in tracemalloc.take_snapshot().compare_to(snapshot, "lineno")[: args.top]:
+                print(f"  {stat}")
+    finally:
+        tracemalloc.stop()
+        await relay.stop()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generations", type=int, default=20, help="連線循環次數")
+    parser.add_argument("--concurrency", type=int, default=100, help="每次循環同時連線的客戶端數")
+    parser.add_argument("--steps", type=int, default=10, help="每個客戶端發送的波形次數")
+    parser.add_argument("--warmup", type=int, default=2, help="作為基準前略過的循環數")
+    parser.add_argument("--max-bytes-per-session", type=int, default=256, help="暖機後每個連線允許增長的記憶體")
+    parser.add_argument("--max-task-growth", type=int, default=0, help="允許增加的任務數")
+    parser.add_argument("--max-errors", type=int, default=0, help="允許失敗的連線數")
+    parser.add_argument("--max-fd-growth", type=int, default=5, help="允許增加的檔案描述符數")
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc 保留的堆疊深度")
+    parser.add_argument("--top", type=int, default=10, help="列出增長最多的配置位置數")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
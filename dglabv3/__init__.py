@@ -1,3 +1,23 @@
+import logging
+
 from .dglab import dglabv3  # noqa: F401
 from .dtype import Button, Channel, Strength, StrengthType  # noqa: F401
+from .event import EventItem, OverflowPolicy  # noqa: F401
 from .waves import ALL_PULSES, PULSES, Pulse  # noqa: F401
+from .scheduler import PlayMode, WaveScheduler  # noqa: F401
+from .governor import StrengthGovernor  # noqa: F401
+from .qrcache import QRCodeCache  # noqa: F401
+from .record import TrafficRecorder, TrafficReplayer  # noqa: F401
+from .sync import SyncDGLab  # noqa: F401
+from .shard import ShardedSessionHost  # noqa: F401
+from .group import GroupResult, SessionGroup  # noqa: F401
+from .transport import MultiplexTransport, Transport, WebSocketTransport  # noqa: F401
+from .tracer import LatencyTracer, ProfileHooks  # noqa: F401
+from .stream import AudioStream  # noqa: F401
+from .compact import CompactWave, compact_wave  # noqa: F401
+from .snapshot import SessionSnapshotter, SnapshotStore, restore_sessions  # noqa: F401
+from .runtime import PRODUCTION, RuntimeProfile, apply_profile  # noqa: F401
+from .wavescript import WaveCompiler, WaveProgram, WaveScriptError, compile_wave  # noqa: F401
+
+# 函式庫不輸出任何記錄，除非應用程式自行設定 handler
+logging.getLogger("dglabv3").addHandler(logging.NullHandler())
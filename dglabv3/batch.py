@@ -0,0 +1,123 @@
+import json
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from dglabv3.dtype import Channel, MessageType, StrengthType
+
+logger = logging.getLogger("dglabv3.batch")
+
+__all__ = ["CommandBatch"]
+
+_Key = Tuple[str, str]
+
+
+class CommandBatch:
+    """
+    收集同一個客戶端在 `batch()` 區塊內的指令，離開區塊時合併並一次寫出
+
+    合併規則只移除App端最終看不到效果的指令:
+
+    - 指定強度或歸零會取代同通道先前的強度指令
+    - 清除波形會取代同通道先前的波形與清除指令
+    - 同通道上一則波形會由中繼伺服器重送(time > 1)時，新的波形會讓中繼伺服器清除App佇列，
+      因此先前的波形會被取代，但之前的清除指令仍會保留，以清掉批次開始前已排隊的波形；
+      time = 1 的波形會在App端排隊播放，不會被合併
+
+    :param owner: 擁有此批次的客戶端
+    """
+
+    def __init__(self, owner: Any) -> None:
+        self.owner = owner
+        self.open = True
+        self.merged = 0
+        self._entries: List[Optional[Tuple[dict, bool]]] = []
+        self._indices: Dict[_Key, List[int]] = {}
+        self._last_wave: Dict[str, dict] = {}
+        # 區塊內本地強度會立即更新，丟棄批次時要還原
+        self._strength = owner.strength.snapshot()
+
+    def __len__(self) -> int:
+        return len(self._entries) - self.merged
+
+    @staticmethod
+    def _classify(message: dict) -> Optional[Tuple[str, str, bool]]:
+        """
+        :return: (種類, 通道, 是否為絕對設定)，無法合併的訊息返回None
+        """
+        type_ = message.get("type")
+        if type_ == MessageType.CLIENT_MSG:
+            return "wave", str(message.get("channel")), False
+        if type_ == "msg" and message.get("message") in ("clear-1", "clear-2"):
+            return "clear", Channel(int(message["message"][-1])).name, True
+        if type_ in (StrengthType.DECREASE, StrengthType.INCREASE, StrengthType.ZERO):
+            return "strength", Channel(message["channel"]).name, type_ == StrengthType.ZERO
+        if type_ == StrengthType.SPECIFIC and str(message.get("message", "")).startswith("strength-"):
+            return "strength", Channel(int(message["message"][9])).name, True
+        return None
+
+    def _drop(self, *keys: _Key) -> None:
+        for key in keys:
+            for index in self._indices.pop(key, ()):
+                if self._entries[index] is not None:
+                    self._entries[index] = None
+                    self.merged += 1
+
+    def add(self, message: dict, update: bool = True) -> None:
+        """
+        加入指令並合併被取代的指令
+
+        :param message: 訊息字典
+        :param update: 送出時是否添加clientId和targetId
+        """
+        kind = self._classify(message)
+        if kind is not None:
+            name, channel, absolute = kind
+            if name == "wave":
+                previous = self._last_wave.get(channel)
+                if previous is not None and int(previous.get("time") or 1) > 1:
+                    self._drop(("wave", channel))
+                self._last_wave[channel] = message
+            elif name == "clear":
+                self._drop(("wave", channel), ("clear", channel))
+                self._last_wave.pop(channel, None)
+            elif absolute:
+                self._drop(("strength", channel))
+            self._indices.setdefault((name, channel), []).append(len(self._entries))
+        self._entries.append((message, update))
+
+    def discard(self) -> None:
+        """
+        丟棄所有尚未送出的指令，並將本地強度還原為批次開始時的值
+        """
+        self.open = False
+        self._entries.clear()
+        self._indices.clear()
+        self._last_wave.clear()
+        strength = self.owner.strength
+        strength.A = min(self._strength.A, strength.MAX_A)
+        strength.B = min(self._strength.B, strength.MAX_B)
+
+    def encode(self, client_id: Optional[str], target_id: Optional[str]) -> List[str]:
+        """
+        關閉批次並編碼剩下的指令
+
+        :param client_id: 客戶端ID
+        :param target_id: App ID
+        :return: JSON字串列表，依加入順序
+        """
+        self.open = False
+        texts = []
+        ids = {"clientId": client_id, "targetId": target_id}
+        for entry in self._entries:
+            if entry is None:
+                continue
+            message, update = entry
+            if update:
+                message.update(ids)
+            texts.append(json.dumps(message))
+        return texts
+
+
+# 目前協程所在的批次，背景任務會複製這個值，因此批次關閉後的指令會直接送出
+current_batch: ContextVar[Optional[CommandBatch]] = ContextVar("dglabv3_batch", default=None)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger("dglabv3.coalesce")
+
+__all__ = ["Debouncer", "EventCoalescer"]
+
+
+class EventCoalescer:
+    """
+    依事件類型限制派發頻率，間隔內只派發最新的值
+
+    間隔外的事件立即派發，間隔內的事件保留最後一個，於間隔結束時派發
+
+    :param callback: 派發函式，參數為事件名稱與值
+    """
+
+    def __init__(self, callback: Callable[[str, Any], Awaitable[None]]) -> None:
+        self.callback = callback
+        self.intervals: Dict[str, float] = {}
+        self._last: Dict[str, float] = {}
+        self._pending: Dict[str, Any] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def set_interval(self, event_name: str, seconds: float) -> None:
+        """
+        設定事件最小派發間隔
+
+        :param event_name: 事件名稱
+        :param seconds: 間隔(秒)，0 表示不合併
+        """
+        self.intervals[event_name] = seconds
+
+    async def push(self, event_name: str, value: Any) -> None:
+        """
+        送入事件
+
+        :param event_name: 事件名稱
+        :param value: 事件值
+        """
+        interval = self.intervals.get(event_name, 0)
+        if interval <= 0:
+            await self.callback(event_name, value)
+            return
+        if event_name in self._timers:
+            self._pending[event_name] = value
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        last = self._last.get(event_name)
+        if last is None or now - last >= interval:
+            self._last[event_name] = now
+            await self.callback(event_name, value)
+            return
+        self._pending[event_name] = value
+        self._timers[event_name] = loop.call_later(last + interval - now, self._flush, event_name)
+
+    def _flush(self, event_name: str) -> None:
+        self._timers.pop(event_name, None)
+        if event_name not in self._pending:
+            return
+        value = self._pending.pop(event_name)
+        loop = asyncio.get_running_loop()
+        self._last[event_name] = loop.time()
+        task = loop.create_task(self.callback(event_name, value))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def cancel(self) -> None:
+        """
+        取消所有待派發的事件
+        """
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+        self._last.clear()
+
+
+class Debouncer:
+    """
+    在間隔內忽略重複的事件
+
+    :param interval: 間隔(秒)
+    """
+
+    def __init__(self, interval: float = 0) -> None:
+        self.interval = interval
+        self._last: Dict[Hashable, float] = {}
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        檢查事件是否應該派發
+
+        :param key: 事件鍵，例如按鈕
+        :param now: 單調時鐘時間，預設為事件迴圈時間
+        :return: 是否派發
+        """
+        if self.interval <= 0:
+            return True
+        now = asyncio.get_running_loop().time() if now is None else now
+        last = self._last.get(key)
+        self._last[key] = now
+        return last is None or now - last >= self.interval
@@ -0,0 +1,178 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from dglabv3.scheduler import FRAME_SECONDS
+
+logger = logging.getLogger("dglabv3.compact")
+
+__all__ = ["CompactWave", "Segment", "compact_wave", "find_period"]
+
+# 中繼伺服器每秒重送一次波形訊息，重複區塊必須剛好是 1 秒
+BLOCK_FRAMES = round(1 / FRAME_SECONDS)
+# 單一訊息的幀數上限，避免超過中繼伺服器 1950 字元的限制
+MAX_CHUNK_FRAMES = 80
+HEX_CHARS_PER_FRAME = 16
+# 中繼伺服器重送間隔，以及等待最後一次重送的緩衝時間
+RESEND_INTERVAL = 1.0
+RESEND_MARGIN = 0.2
+
+
+@dataclass(slots=True, frozen=True)
+class Segment:
+    """
+    一次發送的波形片段
+
+    :param frames: 波形數據
+    :param repeat: 由中繼伺服器重送的次數，大於 1 時 frames 固定為 1 秒
+    """
+
+    frames: List[List[List[int]]]
+    repeat: int = 1
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames) * FRAME_SECONDS * self.repeat
+
+
+@dataclass(slots=True)
+class CompactWave:
+    """
+    壓縮後的波形，依序發送各片段即可重現原始的播放內容
+
+    :param segments: 片段列表
+    :param frames: 原始播放的總幀數
+    :param legacy_frames: 不壓縮時單一訊息包含的幀數
+    :param legacy: 壓縮後反而發送更多幀，應改用不壓縮的方式發送，此時 segments 為空
+    """
+
+    segments: List[Segment] = field(default_factory=list)
+    frames: int = 0
+    legacy_frames: int = 0
+    legacy: bool = False
+
+    @property
+    def sent_frames(self) -> int:
+        if self.legacy:
+            return self.legacy_frames
+        return sum(len(segment.frames) for segment in self.segments)
+
+    @property
+    def ratio(self) -> float:
+        """
+        壓縮比，不壓縮時發送的幀數與實際發送幀數的比例，小於等於 1 表示沒有節省
+        """
+        return self.legacy_frames / self.sent_frames if self.sent_frames else 1.0
+
+    def report(self) -> Dict[str, Any]:
+        """
+        壓縮統計
+
+        :return: 播放幀數、發送幀數、片段數、壓縮比、發送的十六進位字元數、不壓縮時單一訊息的幀數與是否改用不壓縮發送
+        """
+        return {
+            "frames": self.frames,
+            "sent_frames": self.sent_frames,
+            "segments": len(self.segments),
+            "ratio": self.ratio,
+            "hex_chars": self.sent_frames * HEX_CHARS_PER_FRAME,
+            "legacy_frames": self.legacy_frames,
+            "legacy": self.legacy,
+        }
+
+
+def _frame_keys(wave: List[List[List[int]]]) -> np.ndarray:
+    """
+    每幀 8 個位元組組成一個 uint64，方便向量化比較
+    """
+    data = np.asarray(wave, dtype=np.uint8).reshape(len(wave), 8)
+    return data.view(">u8")[:, 0]
+
+
+def find_period(wave: List[List[List[int]]]) -> int:
+    """
+    找出波形的最小循環週期
+
+    :param wave: 波形數據
+    :return: 週期(幀數)，沒有循環時為波形長度
+
+    Example:
+
+    >>> find_period(PULSES["呼吸"] * 3)
+    """
+    keys = _frame_keys(wave).tolist()
+    # KMP 前綴函數
+    prefix = [0] * len(keys)
+    for i in range(1, len(keys)):
+        k = prefix[i - 1]
+        while k and keys[i] != keys[k]:
+            k = prefix[k - 1]
+        if keys[i] == keys[k]:
+            k += 1
+        prefix[i] = k
+    period = len(keys) - prefix[-1] if keys else 0
+    return period if period and len(keys) % period == 0 else len(keys)
+
+
+def compact_wave(wave: List[List[List[int]]], time: Optional[float] = None) -> CompactWave:
+    """
+    將波形展開為播放時間軸後，把重複的 1 秒區塊交給中繼伺服器的 `time` 重送，
+    其餘幀合併成盡量少且不超過長度限制的訊息
+
+    週期是 1 秒因數的循環波形只需發送 1 秒，其他週期的波形需要展開整個時間軸；
+    展開後發送的幀數多於不壓縮的單一訊息時，返回 legacy 為 True 的結果
+
+    :param wave: 波形數據
+    :param time: 循環播放的時間(秒)，None 表示只播放一次
+    :return: CompactWave
+
+    Example:
+
+    >>> compacted = compact_wave(PULSES["呼吸"], 30)
+    >>> print(compacted.report())
+    """
+    if not wave:
+        raise ValueError("wave cannot be empty")
+    total = len(wave) if time is None else max(1, round(time / FRAME_SECONDS))
+    period = find_period(wave)
+    base = wave[:period]
+    keys = np.resize(_frame_keys(base), total)
+    legacy_frames = len(wave) * 2 if len(wave) <= 4 else len(wave)
+    result = CompactWave(frames=total, legacy_frames=legacy_frames)
+
+    # repeats[i]: 從 i 開始的 1 秒區塊與下一個 1 秒完全相同
+    if total >= BLOCK_FRAMES * 2:
+        same = np.concatenate([keys[BLOCK_FRAMES:] == keys[:-BLOCK_FRAMES], np.zeros(BLOCK_FRAMES, dtype=bool)])
+        window = np.concatenate([[0], np.cumsum(same)])
+        repeats = (window[BLOCK_FRAMES:] - window[:-BLOCK_FRAMES]) == BLOCK_FRAMES
+    else:
+        repeats = np.zeros(0, dtype=bool)
+
+    def frame(index: int) -> List[List[int]]:
+        return base[index % period]
+
+    pending: List[List[List[int]]] = []
+
+    def flush() -> None:
+        for start in range(0, len(pending), MAX_CHUNK_FRAMES):
+            result.segments.append(Segment(pending[start : start + MAX_CHUNK_FRAMES]))
+        pending.clear()
+
+    i = 0
+    while i < total:
+        if i < len(repeats) and repeats[i]:
+            count = 1
+            while i + count * BLOCK_FRAMES < len(repeats) and repeats[i + count * BLOCK_FRAMES]:
+                count += 1
+            flush()
+            result.segments.append(Segment([frame(j) for j in range(i, i + BLOCK_FRAMES)], count + 1))
+            i += (count + 1) * BLOCK_FRAMES
+        else:
+            pending.append(frame(i))
+            i += 1
+    flush()
+    if time is not None and result.sent_frames > legacy_frames:
+        return CompactWave(frames=total, legacy_frames=legacy_frames, legacy=True)
+    return result
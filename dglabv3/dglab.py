@@ -1,43 +1,72 @@
 import asyncio
+import functools
 import io
 import json
 import logging
-from threading import Event
-from typing import Optional
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
 
-import qrcode
 import websockets
-from websockets.asyncio.client import connect as ws_connect
 
+from dglabv3.batch import CommandBatch, current_batch
+from dglabv3.coalesce import Debouncer, EventCoalescer
+from dglabv3.compact import RESEND_INTERVAL, RESEND_MARGIN, Segment, compact_wave
 from dglabv3.dtype import Button, Channel, ChannelStrength, MessageType, Strength, StrengthMode, StrengthType
 from dglabv3.event import EventEmitter
-from dglabv3.music_to_wave import convert_audio_to_v3_protocol
+from dglabv3.log import SessionLogger
+from dglabv3.music_to_wave import convert_audio_to_v3_channels
+from dglabv3.qrcache import QRCodeCache, get_default_cache
+from dglabv3.transport import Transport, default_transport
+from dglabv3.wavescript import WaveScriptError, compile_wave
 from dglabv3.wsmessage import WSMessage, WStype
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("dglabv3")
 
+DEFAULT_URL = "wss://ws.dungeon-lab.cn/"
+QR_URL_PREFIX = "https://www.dungeon-lab.com/app-download.php#DGLAB-SOCKET#"
+
 
 class dglabv3(EventEmitter):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        qr_url: Optional[str] = None,
+        qr_cache: Optional[QRCodeCache] = None,
+        transport_factory: Optional[Callable[[str], Transport]] = None,
+    ) -> None:
+        """
+        :param url: 中繼伺服器網址，預設讀取環境變數 DGLAB_WS_URL，否則使用官方伺服器
+        :param qr_url: App掃描用的網址前綴，預設讀取環境變數 DGLAB_QR_URL，否則由 url 產生
+        :param qr_cache: QR code快取，預設使用行程共用快取
+        :param transport_factory: 以網址建立傳輸層的函式，預設為 WebSocketTransport，可用 set_default_transport 更改
+        """
         super().__init__()
         self.client = None
-        self.clienturl = "wss://ws.dungeon-lab.cn/"
+        self.clienturl = url or os.environ.get("DGLAB_WS_URL") or DEFAULT_URL
         self.client_id = None
         self.target_id = None
         self.pulse_name = None
-        self.clientqrurl = "https://www.dungeon-lab.com/app-download.php#DGLAB-SOCKET#wss://ws.dungeon-lab.cn/"
+        self.clientqrurl = qr_url or os.environ.get("DGLAB_QR_URL") or QR_URL_PREFIX + self.clienturl
         self.interval = 20
         self.maxInterval = 50
         self.disconnect_time = 30
         self.strength = ChannelStrength()
-        self._bind_event = Event()
-        self._app_connect_event = Event()
+        self._bind_event = asyncio.Event()
+        self._app_connect_event = asyncio.Event()
         self._disconnect_count = 0
         self._heartbeat_task = None
         self._listen_task = None
         self._closing = False
         self.bot = None
+        self.qr_cache = qr_cache if qr_cache is not None else get_default_cache()
+        self._qr_task = None
+        self._wave_tasks: dict[Channel, asyncio.Task] = {}
+        self._taps = []
+        self.transport_factory = transport_factory or default_transport
+        self._coalescer = EventCoalescer(self._dispatch_coalesced)
+        self._button_debouncer = Debouncer()
+        self._log = SessionLogger(logger, self)
 
     async def _dispatch_button(self, button: Button) -> None:
         """
@@ -45,7 +74,7 @@ class dglabv3(EventEmitter):
 
         :param button: 按鈕物件
         """
-        self.emit("button", button)
+        await self.emit_async("button", button)
         if self.bot:
             await self.bot.dispatch("dglab_button", button)
 
@@ -55,11 +84,50 @@ class dglabv3(EventEmitter):
 
         :param strength: 強度物件
         """
-        logger.debug(f"Dispatch strength: {strength}")
-        self.emit("strength", strength)
+        self._log.debug("Dispatch strength: %s", strength)
+        await self.emit_async("strength", strength)
         if self.bot:
             await self.bot.dispatch("dglab_strength", strength)
 
+    async def _dispatch_coalesced(self, event_name: str, value) -> None:
+        if event_name == "strength":
+            await self._dispatch_strength(value)
+
+    def set_event_interval(self, event_name: str, seconds: float) -> None:
+        """
+        設定事件最小派發間隔，間隔內只派發最新的值，強度狀態仍會立即更新
+
+        :param event_name: 事件名稱，目前支援 strength
+        :param seconds: 間隔(秒)，0 表示每次都派發
+
+        Example:
+
+        >>> client.set_event_interval("strength", 0.5)
+        """
+        self._coalescer.set_interval(event_name, seconds)
+
+    def set_button_debounce(self, seconds: float) -> None:
+        """
+        設定按鈕防抖時間，間隔內重複的同一按鈕會被忽略
+
+        :param seconds: 間隔(秒)，0 表示停用
+        """
+        self._button_debouncer.interval = seconds
+
+    def set_log_sampling(self, every: int) -> None:
+        """
+        設定收發訊息的 debug 記錄取樣，每 N 則訊息只記錄一則
+
+        :param every: 取樣間隔，1 表示全部記錄
+
+        Example:
+
+        >>> client.set_log_sampling(100)
+        """
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self._log.sample_every = every
+
     def set_bot(self, bot):
         """
         設置Discord Bot
@@ -68,6 +136,39 @@ class dglabv3(EventEmitter):
         """
         self.bot = bot
 
+    def add_tap(self, tap) -> None:
+        """
+        註冊訊息監聽器，收發的每個原始訊息都會傳給 `on_inbound` / `on_outbound`
+
+        :param tap: 監聽器，例如 TrafficRecorder
+        """
+        self._taps.append(tap)
+
+    def remove_tap(self, tap) -> None:
+        """
+        移除訊息監聽器
+
+        :param tap: 已註冊的監聽器
+        """
+        if tap in self._taps:
+            self._taps.remove(tap)
+
+    def _notify_taps(self, data: websockets.Data, outbound: bool) -> None:
+        """
+        把原始訊息傳給監聽器，監聽器的錯誤只記錄下來，不影響收發
+
+        :param data: 原始訊息
+        :param outbound: 是否為送出的訊息
+        """
+        for tap in self._taps:
+            try:
+                if outbound:
+                    tap.on_outbound(data)
+                else:
+                    tap.on_inbound(data)
+            except Exception as e:
+                self._log.error("Tap error: %s", e)
+
     def is_connected(self) -> bool:
         """
         檢查是否已連接到WebSocket伺服器
@@ -93,12 +194,9 @@ class dglabv3(EventEmitter):
         """
         await self.connect()
         try:
-            await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(None, self._bind_event.wait),
-                timeout,
-            )
+            await asyncio.wait_for(self._bind_event.wait(), timeout)
         except asyncio.TimeoutError:
-            logger.error("Bind timeout")
+            self._log.error("Bind timeout")
             await self.close()
             raise TimeoutError("Bind timeout")
 
@@ -110,15 +208,34 @@ class dglabv3(EventEmitter):
         :raises TimeoutError: 當App連接超時
         """
         try:
-            await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(None, self._app_connect_event.wait),
-                timeout,
-            )
+            await asyncio.wait_for(self._app_connect_event.wait(), timeout)
         except asyncio.TimeoutError:
-            logger.error("App connect timeout")
+            self._log.error("App connect timeout")
             await self.close()
             raise TimeoutError("App connect timeout")
 
+    async def resume(self, client_id: str, target_id: str, timeout: int = 10) -> None:
+        """
+        接手先前的客戶端ID並恢復與App的綁定，需要中繼伺服器支援(DGLabRelay 的 resume_grace)
+
+        :param client_id: 先前的客戶端ID
+        :param target_id: 先前綁定的App ID
+        :param timeout: 超時時間(秒)
+        :raises TimeoutError: 當中繼伺服器沒有接受時
+
+        Example:
+
+        >>> await client.connect_and_wait()
+        >>> await client.resume(snapshot.client_id, snapshot.target_id)
+        """
+        self._app_connect_event.clear()
+        await self._send_message({"type": "resume", "clientId": client_id, "targetId": target_id}, update=False)
+        try:
+            await asyncio.wait_for(self._app_connect_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            self._log.error("Resume timeout")
+            raise TimeoutError("Resume timeout")
+
     async def connect(self) -> None:
         """
         連接到WebSocket伺服器
@@ -126,11 +243,13 @@ class dglabv3(EventEmitter):
         :raises ConnectionError: 當連接失敗時
         """
         try:
-            self.client = await ws_connect(self.clienturl)
-            logger.debug("WebSocket connected")
+            transport = self.transport_factory(self.clienturl)
+            await transport.connect()
+            self.client = transport
+            self._log.debug("WebSocket connected")
             self._listen_task = asyncio.create_task(self._listen())
         except Exception as e:
-            logger.error(f"WebSocket connection error: {e}")
+            self._log.error("WebSocket connection error: %s", e)
             await self.close()
             raise ConnectionError("WebSocket connection error")
 
@@ -140,33 +259,46 @@ class dglabv3(EventEmitter):
         """
         try:
             if self.client is None:
-                logger.error("WebSocket client is None")
+                self._log.error("WebSocket client is None")
                 return
             async for message in self.client:
                 await self._handle_message(message)
         except websockets.ConnectionClosed:
-            logger.debug("WebSocket connection closed")
+            self._log.debug("WebSocket connection closed")
         except Exception as e:
-            logger.error(f"WebSocket error: {e}")
+            self._log.error("WebSocket error: %s", e)
             raise ConnectionError("WebSocket error")
 
+    def _qrcode_data(self) -> Optional[str]:
+        if self.client_id is None:
+            self._log.error("Client ID is empty, please connect to the server first")
+            return None
+        return self.clientqrurl + self.client_id
+
+    def _prerender_qrcode(self, previous_id: Optional[str]) -> None:
+        """
+        綁定後在執行緒池預先渲染QR code，並移除舊的client ID快取
+
+        :param previous_id: 重新綁定前的client ID
+        """
+        if previous_id is not None and previous_id != self.client_id:
+            self.qr_cache.invalidate(self.clientqrurl + previous_id)
+        if self.client_id is None:
+            return
+        data = self.clientqrurl + self.client_id
+        if self.qr_cache.get(data) is None:
+            self._qr_task = asyncio.create_task(self.qr_cache.render(data))
+
     def generate_qrcode(self) -> Optional[io.BytesIO]:
         """
         生成QR code圖片
 
         :return: QR code圖片的BytesIO物件，如果client_id為空則返回None
         """
-        if self.client_id is None:
-            logger.error("Client ID is empty, please connect to the server first")
+        data = self._qrcode_data()
+        if data is None:
             return
-        qr = qrcode.QRCode()
-        qr.add_data(self.clientqrurl + self.client_id)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        saveimg = io.BytesIO()
-        img.save(saveimg)
-        saveimg.seek(0)
-        return saveimg
+        return io.BytesIO(self.qr_cache.render_sync(data).png)
 
     def generate_qrcode_text(self) -> Optional[str]:
         """
@@ -174,14 +306,33 @@ class dglabv3(EventEmitter):
 
         :return: ASCII格式的QR code文字，如果client_id為空則返回None
         """
-        if self.client_id is None:
-            logger.error("Client ID is empty, please connect to the server first")
+        data = self._qrcode_data()
+        if data is None:
+            return
+        return self.qr_cache.render_sync(data).text
+
+    async def get_qrcode(self) -> Optional[io.BytesIO]:
+        """
+        取得QR code圖片，未命中快取時在執行緒池渲染
+
+        :return: QR code圖片的BytesIO物件，如果client_id為空則返回None
+        """
+        data = self._qrcode_data()
+        if data is None:
+            return
+        images = await self.qr_cache.render(data)
+        return io.BytesIO(images.png)
+
+    async def get_qrcode_text(self) -> Optional[str]:
+        """
+        取得QR code文字，未命中快取時在執行緒池渲染
+
+        :return: ASCII格式的QR code文字，如果client_id為空則返回None
+        """
+        data = self._qrcode_data()
+        if data is None:
             return
-        qr = qrcode.QRCode()
-        qr.add_data(self.clientqrurl + self.client_id)
-        f = io.StringIO()
-        qr.print_ascii(out=f)
-        return f.getvalue()
+        return (await self.qr_cache.render(data)).text
 
     async def _update_connects(self, message: WSMessage):
         """
@@ -208,7 +359,7 @@ class dglabv3(EventEmitter):
                 if self.target_id is None:
                     self._disconnect_count += 1
                     if self._disconnect_count >= self.disconnect_time:
-                        logger.error("Disconnected from app")
+                        self._log.error("Disconnected from app")
                         await self.close()
                         break
                 else:
@@ -217,17 +368,17 @@ class dglabv3(EventEmitter):
                 await asyncio.sleep(self.interval)
 
         except websockets.ConnectionClosed:
-            logger.info("WebSocket connection closed")
+            self._log.info("WebSocket connection closed")
             await self.close()
         except Exception as e:
-            logger.error(f"Heartbeat error: {e}")
+            self._log.error("Heartbeat error: %s", e)
 
     def _start_heartbeat(self):
         """
-        啟動心跳檢測任務
+        啟動心跳檢測任務，重新綁定時沿用執行中的任務
         """
-        if self._heartbeat_task:
-            self._heartbeat_task.cancel()
+        if self._heartbeat_task and not self._heartbeat_task.done():
+            return
         self._heartbeat_task = asyncio.create_task(self._heartbeat())
 
     async def _handle_message(self, data: websockets.Data):
@@ -236,11 +387,15 @@ class dglabv3(EventEmitter):
 
         :param data: WebSocket訊息資料
         """
+        self._notify_taps(data, outbound=False)
         try:
             message = json.loads(data)
             WSmsg = WSMessage(message)
             if WSmsg.type == WStype.BIND:
+                previous_id = self.client_id
                 self.client_id = WSmsg.clientID
+                if previous_id != self.client_id:
+                    self._prerender_qrcode(previous_id)
                 self._start_heartbeat()
                 await self._update_connects(WSmsg)
                 self._bind_event.set()
@@ -249,19 +404,21 @@ class dglabv3(EventEmitter):
                 if WSmsg.msg is not None:
                     if WSmsg.msg.startswith("feedback"):
                         button = WSmsg.feedback()
-                        await self._dispatch_button(button)
+                        if self._button_debouncer.allow(button):
+                            await self._dispatch_button(button)
                     elif WSmsg.msg.startswith("strength"):
-                        self.strength.set_strength(WSmsg.strength())
-                        await self._dispatch_strength(WSmsg.strength())
+                        strength = WSmsg.strength()
+                        self.strength.set_strength(strength)
+                        await self._coalescer.push("strength", strength)
                     else:
-                        logger.warning(f"Unknown message type: {WSmsg.msg}")
+                        self._log.warning("Unknown message type: %s", WSmsg.msg)
                 else:
-                    logger.warning("Received message with None content")
+                    self._log.warning("Received message with None content")
 
-            logger.debug(f"Received message: {message}")
+            self._log.sampled(logging.DEBUG, "received", "Received message: %s", message)
         except Exception as e:
-            logger.warning(f"Error: {e}")
-            logger.debug(f"Received raw message: {data}")
+            self._log.warning("Error: %s", e)
+            self._log.debug("Received raw message: %s", data)
 
     async def _send_message(self, message: dict, update: bool = True) -> None:
         """
@@ -270,18 +427,84 @@ class dglabv3(EventEmitter):
         :param message: 要發送的訊息字典
         :param update: 是否自動添加clientId和targetId
         """
+        batch = current_batch.get()
+        if batch is not None and batch.owner is self and batch.open:
+            batch.add(message, update)
+            return
         try:
             if self.client:
                 if update:
                     message.update({"clientId": self.client_id, "targetId": self.target_id})
-                await self.client.send(json.dumps(message))
-                logger.debug(f"Sent message: {json.dumps(message)}")
+                await self._send_raw(json.dumps(message))
             else:
-                logger.error("WebSocket not connected")
+                self._log.error("WebSocket not connected")
+        except websockets.ConnectionClosed:
+            self._log.debug("WebSocket connection closed")
+        except Exception as e:
+            self._log.error("Error on sending message: %s", e)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[CommandBatch]:
+        """
+        在區塊內收集指令，離開時合併被取代的指令並以 send_many 依序寫出，
+        讓多個步驟的操作同時到達App；區塊內發生例外時不會送出任何指令
+
+        本地的強度狀態仍會立即更新，發生例外時還原；巢狀使用時由最外層的區塊送出
+
+        :return: CommandBatch
+
+        Example:
+
+        >>> async with client.batch():
+        ...     await client.set_strength_value(Channel.BOTH, 30)
+        ...     await client.send_wave_message(PULSES["呼吸"], 10)
+        """
+        batch = current_batch.get()
+        if batch is not None and batch.owner is self and batch.open:
+            yield batch
+            return
+        batch = CommandBatch(self)
+        token = current_batch.set(batch)
+        try:
+            yield batch
+        except BaseException:
+            batch.discard()
+            raise
+        finally:
+            current_batch.reset(token)
+        await self._flush_batch(batch)
+
+    async def _flush_batch(self, batch: CommandBatch) -> None:
+        texts = batch.encode(self.client_id, self.target_id)
+        if batch.merged:
+            self._log.debug("Merged %s redundant commands", batch.merged)
+        if not texts:
+            return
+        try:
+            if self.client is None:
+                self._log.error("WebSocket not connected")
+                return
+            for text in texts:
+                self._notify_taps(text, outbound=True)
+            await self.client.send_many(texts)
+            self._log.sampled(logging.DEBUG, "sent", "Sent %s batched messages", len(texts))
         except websockets.ConnectionClosed:
-            logger.debug("WebSocket connection closed")
+            self._log.debug("WebSocket connection closed")
         except Exception as e:
-            logger.error(f"Error on sending message: {e}")
+            self._log.error("Error on sending message: %s", e)
+
+    async def _send_raw(self, text: str) -> None:
+        """
+        發送已編碼的WebSocket訊息，錯誤會直接拋出
+
+        :param text: JSON字串
+        :raises ConnectionError: 當尚未連接時
+        """
+        if self.client is None:
+            raise ConnectionError("WebSocket not connected")
+        self._notify_taps(text, outbound=True)
+        await self.client.send(text)
+        self._log.sampled(logging.DEBUG, "sent", "Sent message: %s", text)
 
     async def close(self):
         """
@@ -289,19 +512,29 @@ class dglabv3(EventEmitter):
         """
         self._closing = True
         try:
-            for task in [self._heartbeat_task, self._listen_task]:
-                if task and not task.done():
+            self._cancel_wave_task(Channel.BOTH)
+            self.cancel_handlers()
+            self.close_subscriptions()
+            if self.client_id is not None:
+                # 已關閉的連線不會再被掃描，釋放共用快取中的QR code
+                self.qr_cache.invalidate(self.clientqrurl + self.client_id)
+            # 心跳或監聽任務本身呼叫 close() 時不能取消自己，否則會中斷下面的關閉流程
+            current = asyncio.current_task()
+            for task in [self._heartbeat_task, self._listen_task, self._qr_task]:
+                if task and not task.done() and task is not current:
                     task.cancel()
             if self.client:
                 await self.client.close()
-                logger.debug("WebSocket closed")
+                self._log.debug("WebSocket closed")
         except Exception as e:
-            logger.error(f"Error on closing WebSocket: {e}")
+            self._log.error("Error on closing WebSocket: %s", e)
         finally:
             self.client = None
             self._heartbeat_task = None
             self._listen_task = None
+            self._qr_task = None
             self._closing = False
+            self._coalescer.cancel()
             self._app_connect_event.clear()
             self._bind_event.clear()
 
@@ -315,63 +548,176 @@ class dglabv3(EventEmitter):
         """
         return ["".join(format(num, "02X") for num in sum(item, [])) for item in data]
 
-    async def music_2_wave(self, mp3_file_path: str, channel: Channel = Channel.BOTH):
+    async def music_2_wave(
+        self,
+        mp3_file_path: str,
+        channel: Channel = Channel.BOTH,
+        mode: str = "dominant",
+        stereo: bool = False,
+        analysis_sr: Optional[int] = None,
+        backend: str = "librosa",
+        compact: bool = False,
+    ):
         """
         將音樂檔案轉換為波形並發送
 
         :param mp3_file_path: 音樂檔案路徑
         :param channel: 目標通道，預設為雙通道
+        :param mode: 特徵提取模式 dominant / onset / centroid / mel / bands，
+            bands 模式在雙通道時低頻給A通道、高頻給B通道
+        :param stereo: 雙通道時左聲道給A通道、右聲道給B通道
+        :param analysis_sr: 分析取樣率，None 表示使用原始取樣率，建議使用 ANALYSIS_SR
+        :param backend: 解碼器 librosa / auto / soundfile / audioread / ffmpeg
+        :param compact: 壓縮並分段發送，整首音樂只播放一次
 
         Example:
 
         >>> await client.music_2_wave("music.mp3", Channel.A)
+        >>> await client.music_2_wave("music.mp3", mode="bands")
+        >>> await client.music_2_wave("music.mp3", mode="onset", stereo=True)
+        >>> await client.music_2_wave("music.mp3", analysis_sr=ANALYSIS_SR, backend="auto")
         """
-        data = convert_audio_to_v3_protocol(mp3_file_path)
-        await self.send_wave_message(data, channel=channel)
+        wave_a, wave_b = convert_audio_to_v3_channels(
+            mp3_file_path, mode, stereo and channel == Channel.BOTH, analysis_sr, backend
+        )
+        time = None if compact else 10
+        if channel == Channel.BOTH and wave_a is not wave_b:
+            await self.send_wave_message(wave_a, time, Channel.A, compact)
+            await self.send_wave_message(wave_b, time, Channel.B, compact)
+            return
+        await self.send_wave_message(wave_b if channel == Channel.B else wave_a, time, channel, compact)
 
-    async def send_wave_message(self, wave: list[list[list[int]]], time: int = 10, channel: Channel = Channel.BOTH):
+    async def send_wave_script(
+        self,
+        source: str,
+        time: Optional[int] = 10,
+        channel: Channel = Channel.BOTH,
+        compact: bool = False,
+    ):
+        """
+        編譯波形腳本並發送，語法參見 `WaveCompiler`
+
+        :param source: 腳本原始碼
+        :param time: 波形持續時間(秒)
+        :param channel: 目標通道，腳本分別定義 A、B 通道時各自發送
+        :param compact: 壓縮波形，參見 `send_wave_message`
+        :raises WaveScriptError: 當腳本不合法，或指定的通道沒有任何片段
+
+        Example:
+
+        >>> await client.send_wave_script("[200ms f=10 i=0..100; 300ms i=100; rest 100ms]x3", 30)
+        """
+        program = compile_wave(source)
+        if channel != Channel.BOTH or program.shared:
+            wave = program.wave(channel)
+            if not wave:
+                raise WaveScriptError(f"script has no segments for channel {channel.name}")
+            await self.send_wave_message(wave, time, channel, compact)
+            return
+        for target in (Channel.A, Channel.B):
+            wave = program.wave(target)
+            if wave:
+                await self.send_wave_message(wave, time, target, compact)
+
+    async def send_wave_message(
+        self,
+        wave: list[list[list[int]]],
+        time: Optional[int] = 10,
+        channel: Channel = Channel.BOTH,
+        compact: bool = False,
+    ):
         """
         發送波形\n
 
         :param wave: 波形數據
-        :param time: 波形持續時間(秒)
+        :param time: 波形持續時間(秒)，compact 時 None 表示只播放一次
         :param channel: Channel.A or Channel.B or Channel.BOTH
+        :param compact: 壓縮波形，重複的 1 秒區塊交給中繼伺服器重送，其餘幀合併發送，
+            在 time 秒內連續循環播放波形，後續片段在背景依序發送
 
         Example:
 
         >>> await client.send_wave_message(PULSES["呼吸"], 30, Channel.A)
+        >>> await client.send_wave_message(music, None, compact=True)
 
         """
-        channel_str = ""
-        if channel == Channel.A:
-            channel_str = "A"
-        elif channel == Channel.B:
-            channel_str = "B"
-        elif channel == Channel.BOTH:
-            channel_str = "BOTH"
+        self._cancel_wave_task(channel)
+        if compact:
+            compacted = compact_wave(wave, time)
+            if not compacted.legacy:
+                await self._send_segments(compacted.segments, channel)
+                return
+        for message in self._build_wave_messages(wave, time, channel):
+            await self._send_message(message)
 
-        def _create_wave_message(ch_str: str, wave: list[list[list[int]]], time: int) -> dict:
-            if len(wave) <= 4:  # 避免波型過小
-                wave = wave * 2
-            return {
-                "type": MessageType.CLIENT_MSG,
-                "channel": ch_str,
-                "message": f"{ch_str}:{json.dumps(self._wave2hex(wave))}",
-                "time": time,
-            }
+    async def _send_segments(self, segments: list[Segment], channel: Channel) -> None:
+        """
+        依序發送壓縮片段，遇到中繼伺服器重送中的片段時，其餘片段在重送結束後於背景發送
+        """
+        for index, segment in enumerate(segments):
+            for message in self._build_wave_messages(segment.frames, segment.repeat, channel, pad=False):
+                await self._send_message(message)
+            if segment.repeat > 1 and index + 1 < len(segments):
+                # 重送期間同通道的新波形會讓中繼伺服器清除App佇列
+                delay = (segment.repeat - 1) * RESEND_INTERVAL + RESEND_MARGIN
+                task = asyncio.create_task(self._resume_segments(segments[index + 1 :], channel, delay))
+                self._wave_tasks[channel] = task
+                task.add_done_callback(functools.partial(self._discard_wave_task, channel))
+                return
+
+    async def _resume_segments(self, segments: list[Segment], channel: Channel, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._send_segments(segments, channel)
+
+    def _discard_wave_task(self, channel: Channel, task: asyncio.Task) -> None:
+        if self._wave_tasks.get(channel) is task:
+            del self._wave_tasks[channel]
+
+    def _cancel_wave_task(self, channel: Channel) -> None:
+        """
+        取消通道上尚未發送的壓縮片段
+        """
+        for key in list(self._wave_tasks):
+            if Channel.BOTH in (key, channel) or key == channel:
+                self._wave_tasks.pop(key).cancel()
+
+    @classmethod
+    def _build_wave_messages(
+        cls, wave: list[list[list[int]]], time: int, channel: Channel, pad: bool = True
+    ) -> list[dict]:
+        """
+        建立波形訊息，不含clientId和targetId
+
+        :param wave: 波形數據
+        :param time: 波形持續時間(秒)
+        :param channel: Channel.A or Channel.B or Channel.BOTH
+        :param pad: 波形過短時重複一次
+        :return: 訊息字典列表
+        """
+        if pad and len(wave) <= 4:  # 避免波型過小
+            wave = wave * 2
+        hex_wave = json.dumps(cls._wave2hex(wave))
 
         # type : clientMsg 固定不变
         # message : A通道波形数据(16进制HEX数组json,具体见上面的协议说明)
         # message2 : B通道波形数据(16进制HEX数组json,具体见上面的协议说明)
         # time1 : A通道波形数据持续发送时长
         # time2 : B通道波形数据持续发送时长
-        if channel_str == "BOTH":
-            for ch in ["A", "B"]:
-                message = _create_wave_message(ch, wave, time)
-                await self._send_message(message)
+        if channel == Channel.BOTH:
+            channels = ["A", "B"]
+        elif channel in (Channel.A, Channel.B):
+            channels = [channel.name]
         else:
-            message = _create_wave_message(channel_str, wave, time)
-            await self._send_message(message)
+            return []
+        return [
+            {
+                "type": MessageType.CLIENT_MSG,
+                "channel": ch_str,
+                "message": f"{ch_str}:{hex_wave}",
+                "time": time,
+            }
+            for ch_str in channels
+        ]
 
     async def clear_wave(self, channel: Channel):
         """
@@ -383,6 +729,7 @@ class dglabv3(EventEmitter):
 
         >>> await client.clear_wave(Channel.A)
         """
+        self._cancel_wave_task(channel)
         if channel == Channel.A:
             await self._send_message(
                 {
@@ -411,7 +758,7 @@ class dglabv3(EventEmitter):
                 }
             )
         else:
-            logger.error(f"Invalid channel: {channel}")
+            self._log.error("Invalid channel: %s", channel)
 
     async def clear_all_wave(self):
         """
@@ -423,6 +770,7 @@ class dglabv3(EventEmitter):
 
         >>> await client.clear_all_wave()
         """
+        self._cancel_wave_task(Channel.BOTH)
         # type : msg 固定不变
         # message: clear-1 -> 清除A通道波形队列; clear-2 -> 清除B通道波形队列
         await self._send_message(
@@ -437,7 +785,7 @@ class dglabv3(EventEmitter):
                 "message": "clear-2",
             }
         )
-        logger.debug("Cleared all waves")
+        self._log.debug("Cleared all waves")
         return True
 
     async def set_strength_value(self, channel: Channel, strength: int) -> None:
@@ -587,7 +935,7 @@ class dglabv3(EventEmitter):
                     )
 
         else:
-            logger.error(f"Invalid type id: {type_id}")
+            self._log.error("Invalid type id: %s", type_id)
             return
 
     def get_strength_value(self, channel: Channel) -> int:
@@ -640,7 +988,8 @@ if __name__ == "__main__":
             print(qr_code)
 
         except Exception as e:
-            logger.error(f"Error: {e}")
+            logger.error("Error: %s", e)
             await client.close()
 
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
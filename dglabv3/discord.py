@@ -0,0 +1,380 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+try:
+    import discord
+    from discord import app_commands
+    from discord.ext import commands
+except ImportError as e:  # pragma: no cover
+    raise ImportError("dglabv3.discord requires discord.py, install with: pip install dglabv3[discord]") from e
+
+from dglabv3.coalesce import EventCoalescer
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel
+from dglabv3.qrcache import QRCodeCache, get_default_cache
+from dglabv3.waves import ALL_PULSES, PULSES
+
+logger = logging.getLogger("dglabv3.discord")
+
+__all__ = ["DGLabCog", "DGLabSession", "DispatchBatcher", "SessionManager", "setup"]
+
+CHANNEL_NAMES = {Channel.A: "A通道", Channel.B: "B通道", Channel.BOTH: "全部"}
+
+
+class DGLabSession:
+    """
+    單一使用者的控制狀態
+
+    :param user_id: Discord 使用者ID
+    :param client: dglabv3 客戶端
+    :param embed_interval: 訊息編輯的最小間隔(秒)
+    """
+
+    def __init__(self, user_id: int, client: dglabv3, embed_interval: float = 1.0) -> None:
+        self.user_id = user_id
+        self.client = client
+        self.channel = Channel.BOTH
+        self.wave_name = ALL_PULSES[0]
+        self.log: Deque[str] = deque(maxlen=7)
+        self.message: Optional[Any] = None
+        self.last_active = time.monotonic()
+        self._editor = EventCoalescer(self._edit)
+        self._editor.set_interval("embed", embed_interval)
+
+    @property
+    def wave(self) -> List[List[List[int]]]:
+        return PULSES[self.wave_name]
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
+
+    def logadd(self, text: str) -> None:
+        self.log.append(text)
+
+    def build_embed(self, title: str = "已連接") -> "discord.Embed":
+        client = self.client
+        embed = discord.Embed(
+            title=title,
+            description=(
+                f"A通道強度: `{client.get_strength_value(Channel.A)}%`\n"
+                f"B通道強度: `{client.get_strength_value(Channel.B)}%`\n"
+                f"A通道最大強度: `{client.get_max_strength_value(Channel.A)}%`\n"
+                f"B通道最大強度: `{client.get_max_strength_value(Channel.B)}%`\n"
+                f"目前通道: `{CHANNEL_NAMES[self.channel]}`\n"
+                f"目前波形: `{self.wave_name}`"
+            ),
+        )
+        log = "\n".join(self.log) or "nothing"
+        embed.add_field(name="log", value=f"```{log}```")
+        return embed
+
+    async def refresh(self) -> None:
+        """
+        要求更新訊息，間隔內的多次要求只會編輯一次
+        """
+        await self._editor.push("embed", None)
+
+    async def _edit(self, event_name: str, value: Any) -> None:
+        if self.message is None:
+            return
+        try:
+            await self.message.edit(embed=self.build_embed())
+        except discord.HTTPException as e:
+            logger.warning("Embed edit failed for %s: %s", self.user_id, e)
+
+    async def close(self) -> None:
+        self._editor.cancel()
+        await self.client.close()
+
+
+class DispatchBatcher:
+    """
+    合併所有使用者的事件，定期以 `dglab_events` 一次派發給 bot
+
+    同一批次內每個使用者的強度事件只保留最新一筆
+
+    :param bot: Discord Bot
+    :param interval: 派發間隔(秒)
+    """
+
+    def __init__(self, bot: "commands.Bot", interval: float = 0.5) -> None:
+        self.bot = bot
+        self.interval = interval
+        self._pending: Dict[Tuple[Hashable, str], Any] = {}
+        self._buttons: List[Tuple[Hashable, str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def push(self, user_id: Hashable, event_name: str, value: Any) -> None:
+        if event_name == "button":
+            self._buttons.append((user_id, event_name, value))
+        else:
+            self._pending[(user_id, event_name)] = value
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.interval)
+        self.flush()
+
+    def flush(self) -> None:
+        events = [(user_id, name, value) for (user_id, name), value in self._pending.items()]
+        events.extend(self._buttons)
+        self._pending.clear()
+        self._buttons.clear()
+        if events:
+            self.bot.dispatch("dglab_events", events)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+
+
+class SessionManager:
+    """
+    管理所有使用者的 session，閒置或斷線的 session 會被自動關閉
+
+    :param bot: Discord Bot
+    :param idle_timeout: 閒置多久後關閉(秒)
+    :param max_sessions: 最大 session 數，None 表示不限制
+    :param qr_cache: 共用的QR code快取
+    :param embed_interval: 訊息編輯的最小間隔(秒)
+    :param dispatch_interval: 事件批次派發間隔(秒)
+    :param client_kwargs: 建立 dglabv3 時使用的參數
+    """
+
+    def __init__(
+        self,
+        bot: "commands.Bot",
+        idle_timeout: float = 900,
+        max_sessions: Optional[int] = None,
+        qr_cache: Optional[QRCodeCache] = None,
+        embed_interval: float = 1.0,
+        dispatch_interval: float = 0.5,
+        client_kwargs: Optional[dict] = None,
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.qr_cache = qr_cache if qr_cache is not None else get_default_cache()
+        self.embed_interval = embed_interval
+        self.client_kwargs = client_kwargs or {}
+        self.batcher = DispatchBatcher(bot, dispatch_interval)
+        self.sessions: Dict[int, DGLabSession] = {}
+        self._evict_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def get(self, user_id: int) -> Optional[DGLabSession]:
+        session = self.sessions.get(user_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    async def create(self, user_id: int) -> DGLabSession:
+        """
+        建立新的 session，已存在時先關閉舊的
+
+        :param user_id: Discord 使用者ID
+        :raises RuntimeError: 當 session 數已達上限
+        """
+        await self.remove(user_id)
+        if self.max_sessions is not None and len(self.sessions) >= self.max_sessions:
+            raise RuntimeError("Too many active sessions")
+        client = dglabv3(qr_cache=self.qr_cache, **self.client_kwargs)
+        session = DGLabSession(user_id, client, self.embed_interval)
+
+        async def on_strength(strength: Any) -> None:
+            self.batcher.push(user_id, "strength", strength)
+            await session.refresh()
+
+        def on_button(button: Any) -> None:
+            self.batcher.push(user_id, "button", button)
+
+        client.register_event("strength", on_strength)
+        client.register_event("button", on_button)
+        self.sessions[user_id] = session
+        return session
+
+    async def remove(self, user_id: int) -> None:
+        session = self.sessions.pop(user_id, None)
+        if session is not None:
+            await session.close()
+
+    async def evict(self, now: Optional[float] = None) -> int:
+        """
+        關閉閒置或已斷線的 session
+
+        :param now: 單調時鐘時間
+        :return: 關閉的 session 數
+        """
+        now = time.monotonic() if now is None else now
+        expired = [
+            user_id
+            for user_id, session in self.sessions.items()
+            if now - session.last_active > self.idle_timeout
+            or (session.message is not None and not session.client.is_connected())
+        ]
+        for user_id in expired:
+            await self.remove(user_id)
+        return len(expired)
+
+    def start(self, interval: float = 60) -> None:
+        """
+        啟動定期清理任務
+
+        :param interval: 清理間隔(秒)
+        """
+        if self._evict_task is None or self._evict_task.done():
+            self._evict_task = asyncio.create_task(self._evict_loop(interval))
+
+    async def _evict_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = await self.evict()
+                if evicted:
+                    logger.info("Evicted %s idle sessions", evicted)
+            except Exception as e:
+                logger.error("Session eviction error: %s", e)
+
+    async def close(self) -> None:
+        """
+        關閉所有 session
+        """
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            self._evict_task = None
+        await asyncio.gather(*(self.remove(user_id) for user_id in list(self.sessions)))
+        self.batcher.stop()
+
+
+class _WaveSelect(discord.ui.Select):
+    def __init__(self, manager: SessionManager, user_id: int) -> None:
+        options = [discord.SelectOption(label=pulse, value=pulse) for pulse in ALL_PULSES]
+        super().__init__(placeholder="請選擇波形", options=options)
+        self.manager = manager
+        self.user_id = user_id
+
+    async def callback(self, interaction: "discord.Interaction") -> None:
+        session = self.manager.get(self.user_id)
+        await interaction.response.defer()
+        if session is None:
+            return
+        session.wave_name = self.values[0]
+        await session.refresh()
+
+
+class ControlView(discord.ui.View):
+    """
+    控制面板，所有操作先 defer，訊息編輯由 session 合併
+    """
+
+    LEVELS = {"挑逗": (10, 30), "來點感覺": (30, 60), "電他": (60, 100)}
+
+    def __init__(self, manager: SessionManager, user_id: int, timeout: Optional[float] = None) -> None:
+        super().__init__(timeout=timeout)
+        self.manager = manager
+        self.user_id = user_id
+        self.add_item(_WaveSelect(manager, user_id))
+        for channel in (Channel.A, Channel.B, Channel.BOTH):
+            button = discord.ui.Button(label=CHANNEL_NAMES[channel], style=discord.ButtonStyle.primary)
+            button.callback = self._channel_callback(channel)
+            self.add_item(button)
+        for label, (low, high) in self.LEVELS.items():
+            button = discord.ui.Button(label=label, style=discord.ButtonStyle.green)
+            button.callback = self._level_callback(label, low, high)
+            self.add_item(button)
+        disconnect = discord.ui.Button(label="斷開連接", style=discord.ButtonStyle.red)
+        disconnect.callback = self._disconnect
+        self.add_item(disconnect)
+
+    def _channel_callback(self, channel: Channel):
+        async def callback(interaction: "discord.Interaction") -> None:
+            session = self.manager.get(self.user_id)
+            await interaction.response.defer()
+            if session is not None:
+                session.channel = channel
+                await session.refresh()
+
+        return callback
+
+    def _level_callback(self, label: str, low: int, high: int):
+        async def callback(interaction: "discord.Interaction") -> None:
+            session = self.manager.get(self.user_id)
+            await interaction.response.defer()
+            if session is None:
+                return
+            power = min(random.randint(low, high), session.client.get_max_strength_value(session.channel))
+            sec = random.randint(2, 15)
+            async with session.client.batch():
+                await session.client.set_strength_value(session.channel, power)
+                await session.client.send_wave_message(session.wave, sec, session.channel)
+            session.logadd(f"{interaction.user.name} {label} {power}%  {sec}秒")
+            await session.refresh()
+
+        return callback
+
+    async def _disconnect(self, interaction: "discord.Interaction") -> None:
+        # 先回應互動，關閉連線可能超過 Discord 3 秒的回應期限
+        await interaction.response.edit_message(embed=discord.Embed(title="已斷開連接"), view=None)
+        self.stop()
+        await self.manager.remove(self.user_id)
+
+    async def on_timeout(self) -> None:
+        await self.manager.remove(self.user_id)
+
+
+class DGLabCog(commands.Cog):
+    """
+    DG-LAB 控制器 Cog
+
+    :param bot: Discord Bot
+    :param manager: SessionManager，預設使用預設參數建立
+
+    Example:
+
+    >>> await bot.load_extension("dglabv3.discord")
+    """
+
+    def __init__(self, bot: "commands.Bot", manager: Optional[SessionManager] = None) -> None:
+        self.bot = bot
+        self.manager = manager or SessionManager(bot)
+
+    async def cog_load(self) -> None:
+        self.manager.start()
+
+    async def cog_unload(self) -> None:
+        await self.manager.close()
+
+    @app_commands.command(description="DG-LAB 控制器")
+    async def dglab(self, interaction: "discord.Interaction") -> None:
+        try:
+            session = await self.manager.create(interaction.user.id)
+        except RuntimeError as e:
+            await interaction.response.send_message(embed=discord.Embed(title=str(e)), ephemeral=True)
+            return
+        await interaction.response.send_message(embed=discord.Embed(title="連結APP", description="掃描qrcode"))
+        try:
+            await session.client.connect_and_wait()
+            qrcode = await session.client.get_qrcode()
+            qr_message = await interaction.followup.send(
+                file=discord.File(qrcode, filename="qrcode.png"), ephemeral=True, wait=True
+            )
+            await session.client.wait_for_app_connect()
+            await qr_message.delete()
+            session.message = await interaction.original_response()
+            view = ControlView(self.manager, interaction.user.id, timeout=self.manager.idle_timeout)
+            await interaction.edit_original_response(embed=session.build_embed(), view=view)
+        except Exception as e:
+            await self.manager.remove(interaction.user.id)
+            await interaction.followup.send(embed=discord.Embed(title=str(e)), ephemeral=True)
+
+
+async def setup(bot: "commands.Bot") -> None:
+    await bot.add_cog(DGLabCog(bot))
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from enum import Enum, IntEnum, StrEnum
 from typing import Final
 
-__all__ = ["ChannelStrength", "StrengthType", "StrengthMode", "MessageType", "Channel"]
+__all__ = ["Strength", "ChannelStrength", "StrengthType", "StrengthMode", "MessageType", "Channel"]
 
 
 class Channel(IntEnum):
@@ -15,15 +15,27 @@ MAX_STRENGTH: Final[int] = 200
 MIN_STRENGTH: Final[int] = 0
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Strength:
+    """
+    App回報的強度快照，建立時即完成驗證
+    """
+
     A: int
     B: int
     MAXA: int
     MAXB: int
 
+    def __post_init__(self):
+        if not MIN_STRENGTH <= self.MAXA <= MAX_STRENGTH or not MIN_STRENGTH <= self.MAXB <= MAX_STRENGTH:
+            raise ValueError(f"max strength must be between {MIN_STRENGTH} and {MAX_STRENGTH}")
+        if not MIN_STRENGTH <= self.A <= self.MAXA:
+            raise ValueError(f"strength A must be between {MIN_STRENGTH} and {self.MAXA}")
+        if not MIN_STRENGTH <= self.B <= self.MAXB:
+            raise ValueError(f"strength B must be between {MIN_STRENGTH} and {self.MAXB}")
+
 
-@dataclass
+@dataclass(slots=True)
 class ChannelStrength:
     _A: int = field(default=0, init=False)
     _B: int = field(default=0, init=False)
@@ -81,10 +93,14 @@ class ChannelStrength:
         self._MAX_B = value
 
     def set_strength(self, strength: Strength):
-        self.MAX_A = strength.MAXA
-        self.MAX_B = strength.MAXB
-        self.A = strength.A
-        self.B = strength.B
+        # Strength 建立時已驗證，直接寫入避免重複檢查
+        self._MAX_A = strength.MAXA
+        self._MAX_B = strength.MAXB
+        self._A = strength.A
+        self._B = strength.B
+
+    def snapshot(self) -> Strength:
+        return Strength(A=self._A, B=self._B, MAXA=self._MAX_A, MAXB=self._MAX_B)
 
 
 # 強度調整類型
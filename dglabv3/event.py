@@ -1,7 +1,9 @@
 import asyncio
 import functools
 import logging
-from typing import Any, Callable, Dict, List, Optional
+from collections import deque
+from enum import StrEnum
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
 
 logger = logging.getLogger("dglabv3.event")
 
@@ -32,29 +34,230 @@ def event(name: Optional[str] = None):
     return decorator
 
 
+class OverflowPolicy(StrEnum):
+    """
+    屬性:
+        DROP_OLDEST: 佇列已滿時丟棄最舊的事件
+        DROP_NEWEST: 佇列已滿時丟棄新事件
+        BLOCK: 佇列已滿時等待訂閱者消化 (僅 emit_async)
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+class EventItem(NamedTuple):
+    name: str
+    args: Tuple[Any, ...]
+
+
+class EventSubscription:
+    """
+    以 async for 取得事件的訂閱，每個訂閱有獨立的有界佇列
+    """
+
+    def __init__(
+        self,
+        emitter: "EventEmitter",
+        event_names: Tuple[str, ...],
+        maxsize: int = 100,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        if maxsize < 1:
+            raise ValueError("maxsize must be greater than 0")
+        self._emitter = emitter
+        self.event_names = frozenset(event_names)
+        self.maxsize = maxsize
+        self.overflow = OverflowPolicy(overflow)
+        self.dropped = 0
+        self._queue: Deque[EventItem] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._closed = False
+
+    def wants(self, event_name: str) -> bool:
+        return not self.event_names or event_name in self.event_names
+
+    def put_nowait(self, item: EventItem) -> None:
+        if self._closed:
+            return
+        if len(self._queue) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == OverflowPolicy.DROP_OLDEST:
+                self._queue.popleft()
+            else:
+                if self.overflow == OverflowPolicy.BLOCK:
+                    logger.warning("訂閱佇列已滿，丟棄事件: %s", item.name)
+                return
+        self._queue.append(item)
+        self._ready.set()
+        if len(self._queue) >= self.maxsize:
+            self._space.clear()
+
+    async def put(self, item: EventItem) -> None:
+        if self.overflow == OverflowPolicy.BLOCK:
+            while len(self._queue) >= self.maxsize and not self._closed:
+                await self._space.wait()
+        self.put_nowait(item)
+
+    def _taken(self) -> None:
+        if not self._queue:
+            self._ready.clear()
+        if len(self._queue) < self.maxsize:
+            self._space.set()
+
+    async def get(self) -> EventItem:
+        """
+        等待下一個事件
+
+        :raises StopAsyncIteration: 訂閱已關閉且沒有剩餘事件
+        """
+        while not self._queue:
+            if self._closed:
+                raise StopAsyncIteration
+            await self._ready.wait()
+        item = self._queue.popleft()
+        self._taken()
+        return item
+
+    async def get_batch(self, max_items: int = 100, timeout: Optional[float] = None) -> List[EventItem]:
+        """
+        等待至少一個事件後，一次取出佇列中最多 max_items 個事件
+
+        :param max_items: 最多取出的事件數
+        :param timeout: 等待超時(秒)，超時返回空列表
+        :return: 事件列表
+        :raises StopAsyncIteration: 訂閱已關閉且沒有剩餘事件
+        """
+        if not self._queue:
+            if self._closed:
+                raise StopAsyncIteration
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            if not self._queue:
+                raise StopAsyncIteration
+        items = [self._queue.popleft() for _ in range(min(max_items, len(self._queue)))]
+        self._taken()
+        return items
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __aiter__(self) -> "EventSubscription":
+        return self
+
+    async def __anext__(self) -> EventItem:
+        return await self.get()
+
+    def close(self) -> None:
+        """
+        取消訂閱，佇列中剩餘的事件仍可取出
+        """
+        self._closed = True
+        self._ready.set()
+        self._space.set()
+        self._emitter._unsubscribe(self)
+
+    def __enter__(self) -> "EventSubscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
 class EventEmitter:
     def __init__(self):
         self._events: Dict[str, List[Callable]] = {}
+        self._subscriptions: List[EventSubscription] = []
+        self._handler_tasks: Set[asyncio.Task] = set()
 
     def register_event(self, event_name: str, callback: Callable) -> None:
         if event_name not in self._events:
             self._events[event_name] = []
         self._events[event_name].append(callback)
-        logger.debug(f"已註冊事件 {event_name}")
+        logger.debug("已註冊事件 %s", event_name)
+
+    def events(
+        self, *event_names: str, maxsize: int = 100, overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+    ) -> EventSubscription:
+        """
+        訂閱事件，以 async for 取得
+
+        :param event_names: 事件名稱，未指定時訂閱所有事件
+        :param maxsize: 佇列大小
+        :param overflow: 佇列已滿時的處理方式
+
+        Example:
+
+        >>> with client.events("strength") as events:
+        ...     async for event in events:
+        ...         print(event.args[0])
+        """
+        subscription = EventSubscription(self, event_names, maxsize, overflow)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: EventSubscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def close_subscriptions(self) -> None:
+        """
+        關閉所有訂閱，等待中的 async for 會在取完剩餘事件後結束
+        """
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    async def emit_async(self, event_name: str, *args: Any, **kwargs: Any) -> None:
+        """
+        觸發事件，BLOCK 訂閱的佇列已滿時會等待
+        """
+        blocking = tuple(s for s in self._subscriptions if s.overflow == OverflowPolicy.BLOCK and s.wants(event_name))
+        self._emit(event_name, args, kwargs, skip=blocking)
+        for subscription in blocking:
+            await subscription.put(EventItem(event_name, args))
 
     def emit(self, event_name: str, *args: Any, **kwargs: Any) -> None:
-        logger.debug(f"觸發事件: {event_name}")
+        self._emit(event_name, args, kwargs)
+
+    def _emit(self, event_name: str, args: tuple, kwargs: dict, skip: Tuple[EventSubscription, ...] = ()) -> None:
+        logger.debug("觸發事件: %s", event_name)
+        if self._subscriptions:
+            item = EventItem(event_name, args)
+            for subscription in self._subscriptions:
+                if subscription not in skip and subscription.wants(event_name):
+                    subscription.put_nowait(item)
         if event_name in self._events:
             for callback in self._events[event_name]:
                 try:
                     if asyncio.iscoroutinefunction(callback):
-                        asyncio.create_task(callback(*args, **kwargs))
+                        task = asyncio.create_task(callback(*args, **kwargs))
+                        self._handler_tasks.add(task)
+                        task.add_done_callback(self._handler_done)
                     else:
                         callback(*args, **kwargs)
                 except Exception as e:
-                    logger.error(f"事件處理錯誤: {e}")
+                    logger.error("事件處理錯誤: %s", e)
         else:
-            logger.debug(f"沒有註冊的事件處理器: {event_name}")
+            logger.debug("沒有註冊的事件處理器: %s", event_name)
+
+    def _handler_done(self, task: asyncio.Task) -> None:
+        self._handler_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("事件處理錯誤: %s", task.exception())
+
+    def cancel_handlers(self) -> None:
+        """
+        取消仍在執行的非同步事件處理器，呼叫者本身所在的處理器除外
+        """
+        current = asyncio.current_task()
+        for task in list(self._handler_tasks):
+            if task is not current:
+                task.cancel()
 
     def event(self, name=None):
         def decorator(func):
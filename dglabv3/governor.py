@@ -0,0 +1,167 @@
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from dglabv3.dtype import MIN_STRENGTH, Channel, StrengthType
+from dglabv3.scheduler import SchedulerClock, get_clock
+
+if TYPE_CHECKING:
+    from dglabv3.dglab import dglabv3
+
+logger = logging.getLogger("dglabv3.governor")
+
+__all__ = ["StrengthGovernor"]
+
+
+class _ChannelRamp:
+    def __init__(self) -> None:
+        self.target: Optional[int] = None
+        self.current: Optional[int] = None
+        self.budget = 0.0  # 尚未用完的小數步進
+
+
+class StrengthGovernor:
+    """
+    強度安全調節器
+
+    限制每個通道的強度變化速率並夾在App回報的最大值內，
+    大幅跳動會展開為平滑的漸進序列，由共用時鐘在tick中發送，
+    新目標到達時直接取代尚未發送的中間步驟
+
+    :param client: dglabv3 客戶端
+    :param max_slew: 每秒最大強度變化量
+    :param ramp_down: 降低強度時是否也使用漸進，預設立即降低
+
+    Example:
+
+    >>> governor = StrengthGovernor(client, max_slew=20)
+    >>> governor.start()
+    >>> governor.set_target(Channel.A, 80)
+    """
+
+    def __init__(self, client: "dglabv3", max_slew: float = 20, ramp_down: bool = False) -> None:
+        if max_slew <= 0:
+            raise ValueError("max_slew must be greater than 0")
+        self.client = client
+        self.max_slew = max_slew
+        self.ramp_down = ramp_down
+        self._ramps: Dict[Channel, _ChannelRamp] = {Channel.A: _ChannelRamp(), Channel.B: _ChannelRamp()}
+        self._clock: Optional[SchedulerClock] = None
+        self._last_tick: Optional[float] = None
+
+    def start(self, clock: Optional[SchedulerClock] = None) -> None:
+        """
+        將調節器註冊到時鐘
+
+        :param clock: 使用的時鐘，預設為行程共用時鐘
+        """
+        self._clock = clock or get_clock()
+        self._clock.add(self)
+
+    def stop(self) -> None:
+        """
+        從時鐘移除調節器
+        """
+        if self._clock is not None:
+            self._clock.remove(self)
+            self._clock = None
+        self._last_tick = None
+
+    @staticmethod
+    def _channels(channel: Channel) -> List[Channel]:
+        return [Channel.A, Channel.B] if channel == Channel.BOTH else [channel]
+
+    def clamp(self, channel: Channel, strength: int) -> int:
+        """
+        將強度夾在 0 到App回報的最大值之間
+
+        :param channel: Channel.A or Channel.B
+        :param strength: 強度值
+        :return: 夾住後的強度值
+        """
+        return max(MIN_STRENGTH, min(self.client.get_max_strength_value(channel), int(strength)))
+
+    def set_target(self, channel: Channel, strength: int) -> None:
+        """
+        設定目標強度，不會立即發送
+
+        :param channel: 目標通道
+        :param strength: 目標強度值
+        """
+        for ch in self._channels(channel):
+            ramp = self._ramps[ch]
+            if ramp.target is None or ramp.current == ramp.target:
+                ramp.current = self.client.get_strength_value(ch)
+            ramp.target = self.clamp(ch, strength)
+
+    def add_target(self, channel: Channel, strength: int) -> None:
+        """
+        以目前目標為基準增減強度
+
+        :param channel: 目標通道
+        :param strength: 變化量，可為負數
+        """
+        for ch in self._channels(channel):
+            ramp = self._ramps[ch]
+            base = ramp.target if ramp.target is not None else self.client.get_strength_value(ch)
+            self.set_target(ch, base + strength)
+
+    def get_target(self, channel: Channel) -> Optional[int]:
+        """
+        取得目前目標強度
+
+        :param channel: Channel.A or Channel.B
+        :return: 目標強度，未設定時返回None
+        """
+        return self._ramps[channel].target
+
+    def settled(self, channel: Channel = Channel.BOTH) -> bool:
+        """
+        檢查通道是否已到達目標
+
+        :param channel: 目標通道
+        :return: 是否已到達目標
+        """
+        return all(self._ramps[ch].current == self._ramps[ch].target for ch in self._channels(channel))
+
+    async def stop_all(self) -> None:
+        """
+        立即歸零所有通道並清除目標
+        """
+        for ramp in self._ramps.values():
+            ramp.target = ramp.current = 0
+            ramp.budget = 0.0
+        await self.client.reset_strength_value(Channel.BOTH)
+
+    def _step(self, ramp: _ChannelRamp, elapsed: float) -> Optional[int]:
+        if ramp.target is None or ramp.current is None or ramp.current == ramp.target:
+            ramp.budget = 0.0
+            return None
+        if ramp.target < ramp.current and not self.ramp_down:
+            ramp.current = ramp.target
+            ramp.budget = 0.0
+            return ramp.current
+        ramp.budget += self.max_slew * elapsed
+        step = int(ramp.budget)
+        if step == 0:
+            return None
+        ramp.budget -= step
+        if ramp.target > ramp.current:
+            ramp.current = min(ramp.target, ramp.current + step)
+        else:
+            ramp.current = max(ramp.target, ramp.current - step)
+        return ramp.current
+
+    async def _tick(self, now: float) -> None:
+        elapsed = 0.0 if self._last_tick is None else now - self._last_tick
+        self._last_tick = now
+        if not self.client.is_connected() or self.client.target_id is None:
+            return
+        for ch, ramp in self._ramps.items():
+            if ramp.target is not None:
+                # App端最大值可能已降低
+                ramp.target = self.clamp(ch, ramp.target)
+            value = self._step(ramp, elapsed)
+            if value is not None and value != self.clamp(ch, value):
+                value = ramp.current = self.clamp(ch, value)
+            if value is not None:
+                await self.client.set_strength(ch, StrengthType.SPECIFIC, value)
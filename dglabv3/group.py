@@ -0,0 +1,180 @@
+import asyncio
+import copy
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel, StrengthMode, StrengthType
+
+logger = logging.getLogger("dglabv3.group")
+
+__all__ = ["GroupResult", "SessionGroup"]
+
+
+@dataclass(slots=True)
+class GroupResult:
+    """
+    群組指令結果
+
+    sent: 成功的成員數
+    failed: 失敗成員與錯誤
+    latencies: 每個成功成員的發送耗時(秒)
+    elapsed: 整體耗時(秒)
+    """
+
+    sent: int = 0
+    failed: Dict[dglabv3, Exception] = field(default_factory=dict)
+    latencies: List[float] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def max_latency(self) -> float:
+        return max(self.latencies, default=0.0)
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def _encode_template(body: dict) -> str:
+    # 只留下結尾的 "}"，每個成員補上自己的 clientId/targetId
+    return json.dumps(body)[:-1]
+
+
+class SessionGroup:
+    """
+    將同一指令廣播給多個 dglabv3 客戶端
+
+    訊息只編碼一次，發送時只替換每個成員的 clientId/targetId，
+    單一成員失敗不影響其他成員
+
+    :param members: 初始成員
+    :param concurrency: 同時發送的成員數上限
+
+    Example:
+
+    >>> group = SessionGroup([client1, client2])
+    >>> result = await group.send_wave_message(PULSES["呼吸"], 10)
+    >>> print(result.sent, result.mean_latency)
+    """
+
+    def __init__(self, members: Iterable[dglabv3] = (), concurrency: int = 32) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be greater than 0")
+        self.members: List[dglabv3] = list(members)
+        self.concurrency = concurrency
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self) -> Iterator[dglabv3]:
+        return iter(self.members)
+
+    def add(self, member: dglabv3) -> None:
+        if member not in self.members:
+            self.members.append(member)
+
+    def remove(self, member: dglabv3) -> None:
+        if member in self.members:
+            self.members.remove(member)
+
+    async def _send_to(self, member: dglabv3, templates: List[str]) -> None:
+        if member.target_id is None:
+            raise ConnectionError("App not connected")
+        ids = f', "clientId": {json.dumps(member.client_id)}, "targetId": {json.dumps(member.target_id)}}}'
+        for template in templates:
+            await member._send_raw(template + ids)
+
+    async def _broadcast(self, bodies: List[dict], members: List[dglabv3]) -> GroupResult:
+        templates = [_encode_template(body) for body in bodies]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        result = GroupResult()
+        start = time.perf_counter()
+
+        async def run(member: dglabv3) -> None:
+            async with semaphore:
+                member_start = time.perf_counter()
+                try:
+                    await self._send_to(member, templates)
+                except Exception as e:
+                    logger.warning("Group send failed for %s: %s", member.client_id, e)
+                    result.failed[member] = e
+                    return
+                result.latencies.append(time.perf_counter() - member_start)
+                result.sent += 1
+
+        await asyncio.gather(*(run(member) for member in members))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def send_wave_message(
+        self, wave: List[List[List[int]]], time: int = 10, channel: Channel = Channel.BOTH
+    ) -> GroupResult:
+        """
+        廣播波形
+
+        :param wave: 波形數據
+        :param time: 波形持續時間(秒)
+        :param channel: Channel.A or Channel.B or Channel.BOTH
+        :return: GroupResult
+        """
+        return await self._broadcast(dglabv3._build_wave_messages(wave, time, channel), list(self.members))
+
+    async def set_strength_value(self, channel: Channel, strength: int) -> GroupResult:
+        """
+        廣播指定強度，超過成員最大強度的成員會記為失敗
+
+        :param channel: 目標通道
+        :param strength: 強度值[0-200]
+        :return: GroupResult
+        """
+        channels = [Channel.A, Channel.B] if channel == Channel.BOTH else [channel]
+        bodies = [
+            {"type": StrengthType.SPECIFIC, "message": f"strength-{ch}+{StrengthMode.SPECIFIC}+{strength}"}
+            for ch in channels
+        ]
+        members = []
+        failed: Dict[dglabv3, Exception] = {}
+        for member in self.members:
+            # 先在副本上檢查所有通道，送出成功後才更新本地強度
+            pending = copy.copy(member.strength)
+            try:
+                for ch in channels:
+                    if ch == Channel.A:
+                        pending.A = strength
+                    else:
+                        pending.B = strength
+            except ValueError as e:
+                failed[member] = e
+                continue
+            members.append(member)
+        result = await self._broadcast(bodies, members)
+        for member in members:
+            if member not in result.failed:
+                for ch in channels:
+                    if ch == Channel.A:
+                        member.strength.A = strength
+                    else:
+                        member.strength.B = strength
+        result.failed.update(failed)
+        return result
+
+    async def clear_wave(self, channel: Channel = Channel.BOTH) -> GroupResult:
+        """
+        廣播清除波形
+
+        :param channel: 要清除的通道
+        :return: GroupResult
+        """
+        channels = [Channel.A, Channel.B] if channel == Channel.BOTH else [channel]
+        bodies = [{"type": "msg", "message": f"clear-{int(ch)}"} for ch in channels]
+        return await self._broadcast(bodies, list(self.members))
@@ -0,0 +1,52 @@
+import logging
+from typing import Any, Dict, MutableMapping, Tuple
+
+__all__ = ["SessionLogger"]
+
+
+class SessionLogger(logging.LoggerAdapter):
+    """
+    帶有連線資訊的 logger，訊息前加上 client ID，並在 `extra` 中提供 `client_id` / `target_id`
+
+    函式庫不設定任何 handler 或等級，輸出方式由應用程式決定。
+    訊息使用 % 格式延遲組合，等級未啟用時只需一次等級檢查
+
+    :param logger: 底層 logger
+    :param session: 擁有 `client_id` 與 `target_id` 屬性的物件，每次記錄時讀取目前的值
+    :param sample_every: 取樣記錄每 N 次只輸出一次，1 表示全部輸出
+
+    Example:
+
+    >>> logging.getLogger("dglabv3").setLevel(logging.DEBUG)
+    >>> client.set_log_sampling(100)
+    """
+
+    def __init__(self, logger: logging.Logger, session: Any, sample_every: int = 1) -> None:
+        super().__init__(logger, {})
+        self.session = session
+        self.sample_every = sample_every
+        self._counts: Dict[str, int] = {}
+
+    def process(self, msg: Any, kwargs: MutableMapping[str, Any]) -> Tuple[Any, MutableMapping[str, Any]]:
+        client_id = self.session.client_id
+        extra = {"client_id": client_id, "target_id": self.session.target_id}
+        if "extra" in kwargs:
+            extra.update(kwargs["extra"])
+        kwargs["extra"] = extra
+        return f"[{client_id}] {msg}", kwargs
+
+    def sampled(self, level: int, key: str, msg: str, *args: Any) -> None:
+        """
+        記錄高頻事件，同一個 key 每 `sample_every` 次只輸出第一次
+
+        :param level: 記錄等級
+        :param key: 取樣分組
+        :param msg: % 格式訊息
+        :param args: 訊息參數
+        """
+        if not self.isEnabledFor(level):
+            return
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.sample_every == 0:
+            self.log(level, msg, *args, extra={"sampled": self.sample_every, "sample_count": count + 1})
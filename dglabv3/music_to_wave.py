@@ -1,89 +1,401 @@
+import functools
 import math
+import shutil
+import subprocess
+from typing import Callable, Iterable, Optional
 
 import librosa
 import matplotlib.pyplot as plt
 import numpy as np
 
 
-def convert_audio_to_v3_protocol(mp3_file_path: str) -> list:
+MODES = ("dominant", "onset", "centroid", "mel", "bands")
+
+# 每 25ms 一個分析幀，每 100ms 的波形資料取 4 幀
+ANALYSIS_HOP = 0.025
+# 頻率映射範圍，越高的頻率對應越短的波形週期
+MIN_HZ = 60
+MAX_HZ = 8000
+# bands 模式的低頻/高頻分界
+BAND_SPLIT_HZ = 500
+MEL_BANDS = 16
+
+# 建議的分析取樣率，44.1kHz 的四分之一，dominant 模式的 FFT 大小剛好是 512
+ANALYSIS_SR = 11025
+BACKENDS = ("librosa", "auto", "soundfile", "audioread", "ffmpeg")
+
+
+def convert_audio_to_v3_protocol(
+    mp3_file_path: str, mode: str = "dominant", analysis_sr: Optional[int] = None, backend: str = "librosa"
+) -> list:
     """
     讀取MP3文件並將其轉換為V3協議格式的頻率和強度數據
     每100ms生成一組數據
 
+    :param mp3_file_path: 音樂檔案路徑
+    :param mode: 特徵提取模式，參見 `convert_samples`，bands 模式只返回A通道(低頻)
+    :param analysis_sr: 分析取樣率，None 表示使用原始取樣率，建議使用 ANALYSIS_SR
+    :param backend: 解碼器，參見 `load_audio`
 
     返回:
     list: 格式為 [[[頻率, 頻率, 頻率, 頻率], [強度, 強度, 強度, 強度]], ...] 的數據
     """
-    y, sr = librosa.load(mp3_file_path, sr=None)
+    y, sr = load_audio(mp3_file_path, analysis_sr, backend=backend)
+    return convert_samples(y, sr, mode)[0]
 
-    duration_sec = len(y) / sr
-    required_groups = math.ceil(duration_sec * 10)
-    hop_length = int(sr * 0.025)
-    n_fft = 2048
-    D = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
-    S_db = librosa.amplitude_to_db(np.abs(D), ref=np.max)
-    rms = librosa.feature.rms(y=y, hop_length=hop_length)[0]
-    result = []
-    total_frames = S_db.shape[1]
-    frames_per_group = total_frames / required_groups
 
-    for i in range(required_groups):
-        start_frame = int(i * frames_per_group)
-        end_frame = int(min((i + 1) * frames_per_group, total_frames))
-        if end_frame <= start_frame:
-            end_frame = start_frame + 1
+def convert_audio_to_v3_channels(
+    mp3_file_path: str,
+    mode: str = "bands",
+    stereo: bool = False,
+    analysis_sr: Optional[int] = None,
+    backend: str = "librosa",
+) -> tuple[list, list]:
+    """
+    讀取音樂文件並轉換為A、B通道的波形
 
-        frames_to_sample = []
-        if end_frame - start_frame >= 4:
-            for j in range(4):
-                frames_to_sample.append(start_frame + int(j * (end_frame - start_frame) / 4))
-        else:
-            while len(frames_to_sample) < 4:
-                for frame in range(start_frame, end_frame):
-                    frames_to_sample.append(frame)
-                    if len(frames_to_sample) >= 4:
-                        break
+    :param mp3_file_path: 音樂檔案路徑
+    :param mode: 特徵提取模式，參見 `convert_samples`
+    :param stereo: 左聲道給A通道、右聲道給B通道，只解碼一次
+    :param analysis_sr: 分析取樣率，None 表示使用原始取樣率，建議使用 ANALYSIS_SR
+    :param backend: 解碼器，參見 `load_audio`
+    :return: (A通道波形, B通道波形)
 
-        frames_to_sample = frames_to_sample[:4]
+    Example:
+
+    >>> wave_a, wave_b = convert_audio_to_v3_channels("music.mp3")
+    >>> wave_a, wave_b = convert_audio_to_v3_channels("music.mp3", "onset", stereo=True, analysis_sr=ANALYSIS_SR)
+    """
+    y, sr = load_audio(mp3_file_path, analysis_sr, mono=not stereo, backend=backend)
+    return convert_samples(y, sr, mode, stereo)
 
-        freq_data = []
-        intensity_data = []
 
-        for frame in frames_to_sample:
-            if frame < total_frames:
-                spectrum = S_db[:, frame]
+def load_audio(
+    path: str, sr: Optional[int] = None, mono: bool = True, backend: str = "librosa"
+) -> tuple[np.ndarray, int]:
+    """
+    解碼音訊檔案，需要降取樣時邊解碼邊重新取樣
 
-                dominant_freq_idx = np.argmax(spectrum)
-                dominant_freq = librosa.fft_frequencies(sr=sr, n_fft=n_fft)[dominant_freq_idx]
+    解碼器:
+    - librosa: librosa.load，與先前的結果完全相同
+    - soundfile: libsndfile 分段解碼 (wav / flac / ogg / mp3)
+    - audioread: 系統上可用的 audioread 後端
+    - ffmpeg: ffmpeg 子程序，由 ffmpeg 直接輸出目標取樣率
+    - auto: soundfile 可以讀取時使用 soundfile，否則 ffmpeg，最後 audioread
 
-                waveform_freq_ms = 1000 / dominant_freq if dominant_freq > 0 else 1000
+    :param path: 音訊檔案路徑
+    :param sr: 目標取樣率，None 表示使用原始取樣率
+    :param mono: 是否混合為單聲道，否則返回 [聲道, 取樣]，ffmpeg 固定輸出兩個聲道
+    :param backend: 解碼器
+    :return: (取樣, 取樣率)
 
-                waveform_freq_ms = max(10, min(1000, waveform_freq_ms))
+    Example:
 
-                v3_freq = convert_to_v3_frequency(waveform_freq_ms)
+    >>> y, sr = load_audio("music.mp3", ANALYSIS_SR, backend="auto")
+    """
+    if backend == "auto":
+        backend = _pick_backend(path)
+    match backend:
+        case "librosa":
+            return librosa.load(path, sr=sr, mono=mono, res_type="soxr_mq")
+        case "soundfile":
+            import soundfile
+
+            with soundfile.SoundFile(path) as file:
+                blocks = file.blocks(blocksize=65536, dtype="float32", always_2d=True)
+                return _resample_blocks(blocks, file.samplerate, sr, mono, file.channels)
+        case "audioread":
+            import audioread
+
+            with audioread.audio_open(path) as file:
+                blocks = (
+                    (np.frombuffer(buffer, "<i2").astype(np.float32) / 32768).reshape(-1, file.channels)
+                    for buffer in file
+                )
+                return _resample_blocks(blocks, file.samplerate, sr, mono, file.channels)
+        case "ffmpeg":
+            return _load_ffmpeg(path, sr, mono)
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+def _pick_backend(path: str) -> str:
+    try:
+        import soundfile
+
+        soundfile.info(path)
+        return "soundfile"
+    except Exception:
+        return "ffmpeg" if shutil.which("ffmpeg") else "audioread"
+
+
+def _resample_blocks(
+    blocks: Iterable[np.ndarray], native_sr: int, sr: Optional[int], mono: bool, channels: int
+) -> tuple[np.ndarray, int]:
+    """
+    將 [取樣, 聲道] 區塊先混合聲道再串流重新取樣，避免保留完整的原始取樣
+    """
+    import soxr
+
+    resampler = None
+    downmix = np.full((channels, 1), 1 / channels, dtype=np.float32)
+    if sr is not None and sr != native_sr:
+        resampler = soxr.ResampleStream(native_sr, sr, 1 if mono else channels, dtype="float32", quality="MQ")
+    out = []
+    for block in blocks:
+        # 以矩陣乘法混合聲道，比沿著短軸取平均快得多
+        block = block @ downmix if mono else block
+        out.append(resampler.resample_chunk(block) if resampler is not None else block)
+    if resampler is not None:
+        out.append(resampler.resample_chunk(np.zeros((0, 1 if mono else channels), np.float32), last=True))
+    y = np.concatenate(out) if out else np.zeros((0, 1 if mono else channels), np.float32)
+    return (y[:, 0] if mono else np.ascontiguousarray(y.T)), sr or native_sr
+
+
+def _load_ffmpeg(path: str, sr: Optional[int], mono: bool) -> tuple[np.ndarray, int]:
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg backend requires the ffmpeg executable on PATH")
+    if sr is None:
+        probe = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=sample_rate"]
+            + ["-of", "csv=p=0", path],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        sr = int(probe.stdout.strip())
+    channels = 1 if mono else 2
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-f", "f32le", "-ac", str(channels), "-ar", str(sr), "-"],
+        capture_output=True,
+        check=True,
+    )
+    y = np.frombuffer(result.stdout, dtype="<f4")
+    return (y if mono else y.reshape(-1, 2).T.copy()), sr
+
+
+def convert_samples(y: np.ndarray, sr: int, mode: str = "dominant", stereo: bool = False) -> tuple[list, list]:
+    """
+    將音訊取樣轉換為A、B通道的波形
+
+    模式:
+    - dominant: 最強頻率與RMS能量
+    - onset: 以頻譜通量偵測節拍，節拍越強強度越高、週期越短
+    - centroid: 頻譜質心決定頻率，RMS能量決定強度
+    - mel: mel 頻帶包絡，最活躍的頻帶決定頻率
+    - bands: 低頻能量給A通道，高頻能量給B通道
+
+    除了 bands 和立體聲以外，兩個通道返回同一個波形
+
+    :param y: 單聲道取樣，立體聲時為 [聲道, 取樣]
+    :param sr: 取樣率
+    :param mode: 特徵提取模式
+    :param stereo: 左右聲道在同一次運算中分別分析，左聲道給A通道、右聲道給B通道
+    :return: (A通道波形, B通道波形)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+    y = np.asarray(y)
+    if stereo:
+        if mode == "bands":
+            raise ValueError("bands mode already splits channels and cannot be combined with stereo")
+        # 單聲道檔案左右相同，超過兩個聲道只取前兩個
+        y = np.broadcast_to(y, (2, y.shape[-1])) if y.ndim == 1 else y[:2]
+    elif y.ndim > 1:
+        y = y.mean(axis=0)
+    if y.shape[-1] == 0:
+        return [], []
+    required_groups = math.ceil(y.shape[-1] / sr * 10)
+    hop_length = int(sr * ANALYSIS_HOP)
+    if mode == "dominant":
+        tracks = [_dominant_features(y, sr, hop_length)]
+    else:
+        n_fft = analysis_n_fft(sr)
+        magnitude, rms = _spectrum(y, n_fft, hop_length)
+        tracks = extract_features(magnitude, rms, sr, n_fft, mode)
+    if stereo:
+        ((period, intensity),) = tracks
+        tracks = [(period[0], intensity[0]), (period[1], intensity[1])]
+    waves = [_to_wave(period, intensity, required_groups) for period, intensity in tracks]
+    return waves[0], waves[-1]
+
+
+Normalizer = Callable[[str, np.ndarray], np.ndarray]
+Track = tuple[np.ndarray, np.ndarray]
+
+
+def analysis_n_fft(sr: int) -> int:
+    """
+    約等於一個分析幀長度的 FFT 大小
+
+    :param sr: 取樣率
+    :return: 2 的冪次
+    """
+    return 2 ** round(math.log2(int(sr * ANALYSIS_HOP)))
+
+
+def extract_features(
+    magnitude: np.ndarray,
+    rms: np.ndarray,
+    sr: int,
+    n_fft: int,
+    mode: str,
+    normalize: Optional[Normalizer] = None,
+) -> list[Track]:
+    """
+    由短時頻譜計算每個分析幀的波形週期與強度
+
+    :param magnitude: 振幅頻譜 [頻率, 幀]
+    :param rms: 每幀的RMS
+    :param sr: 取樣率
+    :param n_fft: FFT 大小
+    :param mode: 特徵提取模式
+    :param normalize: 正規化函式，參數為特徵名稱與數值，預設以整段資料的最小/最大值正規化
+    :return: 每個通道的 (週期(毫秒), 強度 0-100)，bands 模式返回兩個通道
+    """
+    normalize = normalize or _normalize
+    freqs = np.fft.rfftfreq(n_fft, 1 / sr)
+    match mode:
+        case "dominant":
+            dominant_freq = freqs[np.argmax(magnitude, axis=-2)]
+            with np.errstate(divide="ignore"):
+                period = np.where(dominant_freq > 0, 1000 / dominant_freq, 1000)
+            return [(period, normalize("rms", rms) * 100)]
+        case "onset":
+            return [_onset_features(magnitude, normalize)]
+        case "centroid":
+            return [_centroid_features(magnitude, rms, freqs, normalize)]
+        case "mel":
+            return [_mel_features(magnitude, sr, n_fft, normalize)]
+        case "bands":
+            return _band_features(magnitude, freqs, normalize)
+    raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+
+
+def _spectrum(y: np.ndarray, n_fft: int, hop_length: int, center: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """
+    以 25ms 為間隔的短時頻譜與RMS，一次計算所有幀
+
+    :param center: 是否在頭尾補零讓第一幀以第一個取樣為中心
+    :param y: 取樣，多聲道時最後一個維度為時間
+    :return: (振幅頻譜 [..., 頻率, 幀], RMS [..., 幀])
+    """
+    samples = np.asarray(y, dtype=np.float32)
+    if center:
+        samples = np.pad(samples, [(0, 0)] * (samples.ndim - 1) + [(n_fft // 2, n_fft // 2)])
+    frames = librosa.util.frame(samples, frame_length=n_fft, hop_length=hop_length, axis=-1)
+    rms = np.sqrt(np.mean(frames**2, axis=-2))
+    magnitude = np.abs(np.fft.rfft(frames * _window(n_fft)[:, None], axis=-2))
+    return magnitude, rms
 
-                frame_energy = rms[min(frame, len(rms) - 1)]
 
-                max_rms = np.max(rms)
-                min_rms = np.min(rms)
-                normalized_energy = (frame_energy - min_rms) / (max_rms - min_rms + 1e-10)
-                intensity = int(normalized_energy * 100)
-                intensity = max(0, min(100, intensity))
+@functools.lru_cache(maxsize=16)
+def _window(n_fft: int) -> np.ndarray:
+    return np.hanning(n_fft).astype(np.float32)
 
-                freq_data.append(v3_freq)
-                intensity_data.append(intensity)
-            else:
-                freq_data.append(0)
-                intensity_data.append(0)
 
-        while len(freq_data) < 4:
-            freq_data.append(0)
-        while len(intensity_data) < 4:
-            intensity_data.append(0)
+@functools.lru_cache(maxsize=16)
+def _mel_filters(sr: int, n_fft: int) -> tuple[np.ndarray, np.ndarray]:
+    filters = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=MEL_BANDS, fmin=MIN_HZ, fmax=min(MAX_HZ, sr / 2))
+    centers = librosa.mel_frequencies(n_mels=MEL_BANDS + 2, fmin=MIN_HZ, fmax=min(MAX_HZ, sr / 2))[1:-1]
+    return filters.astype(np.float32), centers
 
-        result.append([freq_data, intensity_data])
 
-    return result
+def _normalize(name: str, values: np.ndarray) -> np.ndarray:
+    """
+    沿最後一個維度正規化到 0-1
+    """
+    low = np.min(values, axis=-1, keepdims=True)
+    high = np.max(values, axis=-1, keepdims=True)
+    return (values - low) / (high - low + 1e-10)
+
+
+def _hz_to_period(hz: np.ndarray) -> np.ndarray:
+    """
+    以對數刻度將 MIN_HZ-MAX_HZ 映射到 1000ms-10ms
+    """
+    t = np.clip(np.log(np.maximum(hz, 1e-10) / MIN_HZ) / math.log(MAX_HZ / MIN_HZ), 0, 1)
+    return 1000 ** (1 - t) * 10**t
+
+
+def _dominant_features(y: np.ndarray, sr: int, hop_length: int) -> Track:
+    # 原始取樣率使用 2048，低分析取樣率時保持與 44.1kHz 相同的頻率解析度
+    n_fft = 2048 if sr >= 22050 else round(2048 * sr / 44100)
+    S_db = librosa.amplitude_to_db(np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length)), ref=np.max)
+    rms = librosa.feature.rms(y=y, frame_length=n_fft, hop_length=hop_length)[..., 0, :]
+    dominant_freq = librosa.fft_frequencies(sr=sr, n_fft=n_fft)[np.argmax(S_db, axis=-2)]
+    with np.errstate(divide="ignore"):
+        period = np.where(dominant_freq > 0, 1000 / dominant_freq, 1000)
+    # RMS 比頻譜少幀時沿用最後一幀
+    energy = rms[..., np.minimum(np.arange(S_db.shape[-1]), rms.shape[-1] - 1)]
+    return period, _normalize("rms", energy) * 100
+
+
+def _onset_features(magnitude: np.ndarray, normalize: Normalizer) -> Track:
+    log_magnitude = np.log1p(magnitude)
+    flux = np.maximum(np.diff(log_magnitude, axis=-1, prepend=log_magnitude[..., :1]), 0).sum(axis=-2)
+    strength = normalize("onset", flux)
+    return 1000 ** (1 - strength) * 10**strength, strength * 100
+
+
+def _centroid_features(magnitude: np.ndarray, rms: np.ndarray, freqs: np.ndarray, normalize: Normalizer) -> Track:
+    centroid = (freqs @ magnitude) / (magnitude.sum(axis=-2) + 1e-10)
+    return _hz_to_period(centroid), normalize("rms", rms) * 100
+
+
+def _mel_features(magnitude: np.ndarray, sr: int, n_fft: int, normalize: Normalizer) -> Track:
+    filters, centers = _mel_filters(sr, n_fft)
+    # 每個頻帶各自正規化
+    envelope = normalize("mel", np.log1p(filters @ magnitude**2))
+    return _hz_to_period(centers[np.argmax(envelope, axis=-2)]), normalize("mel_mean", envelope.mean(axis=-2)) * 100
+
+
+def _band_features(magnitude: np.ndarray, freqs: np.ndarray, normalize: Normalizer) -> list[Track]:
+    power = magnitude**2
+    # 以矩陣乘法一次取得兩個頻帶的能量與加權頻率
+    masks = np.stack([freqs < BAND_SPLIT_HZ, freqs >= BAND_SPLIT_HZ]).astype(power.dtype)
+    energy = masks @ power
+    centroid = ((masks * freqs) @ power) / (energy + 1e-10)
+    level = normalize("bands", np.sqrt(energy)) * 100
+    return [(_hz_to_period(centroid[i]), level[i]) for i in range(2)]
+
+
+def _to_wave(period: np.ndarray, intensity: np.ndarray, required_groups: int) -> list:
+    """
+    每 100ms 取 4 個分析幀組成V3波形
+
+    :param period: 每幀的波形週期(毫秒)
+    :param intensity: 每幀的強度 0-100
+    :param required_groups: 波形組數
+    :return: V3波形
+    """
+    total_frames = len(period)
+    frames_per_group = total_frames / required_groups
+    groups = np.arange(required_groups)
+    start = (groups * frames_per_group).astype(np.int64)
+    end = np.minimum((groups + 1) * frames_per_group, total_frames).astype(np.int64)
+    width = np.maximum(end, start + 1) - start
+    j = np.arange(4)
+    # 幀數不足 4 時重複使用
+    offset = np.where(width[:, None] >= 4, j * width[:, None] // 4, j % width[:, None])
+    frames = start[:, None] + offset
+    valid = frames < total_frames
+    frames = np.minimum(frames, total_frames - 1)
+
+    freq_data = np.where(valid, _v3_frequency(np.clip(period[frames], 10, 1000)), 0)
+    intensity_data = np.where(valid, np.clip(intensity[frames].astype(np.int64), 0, 100), 0)
+    return np.stack([freq_data, intensity_data], axis=1).tolist()
+
+
+def _v3_frequency(waveform_freq_ms: np.ndarray) -> np.ndarray:
+    """
+    `convert_to_v3_frequency` 的向量化版本
+    """
+    ms = np.clip(waveform_freq_ms, 10, 1000)
+    return np.where(
+        ms <= 100,
+        ms,
+        np.where(ms <= 150, 100 + (ms - 100) / 5, 110 + 130 * (np.log(ms / 150) / math.log(1000 / 150))),
+    ).astype(np.int64)
 
 
 def convert_to_v3_frequency(waveform_freq_ms: int) -> int:
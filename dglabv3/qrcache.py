@@ -0,0 +1,178 @@
+import asyncio
+import functools
+import io
+import logging
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import qrcode
+import qrcode.constants
+
+logger = logging.getLogger("dglabv3.qrcache")
+
+__all__ = ["QRCodeCache", "QRCodeImages", "get_default_cache"]
+
+ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+
+@dataclass(slots=True, frozen=True)
+class QRCodeImages:
+    png: bytes
+    text: str
+    svg: Optional[bytes] = None
+
+
+class QRCodeCache:
+    """
+    預先渲染的QR code快取，以QR code內容為鍵
+
+    :param box_size: 每個模組的像素大小
+    :param border: 邊框模組數
+    :param error_correction: 容錯等級 L/M/Q/H
+    :param svg: 是否同時渲染SVG
+    :param maxsize: 最多保留的項目數
+    :param executor: 渲染使用的執行器，預設為事件迴圈的預設執行器
+    """
+
+    def __init__(
+        self,
+        box_size: int = 10,
+        border: int = 4,
+        error_correction: str = "M",
+        svg: bool = False,
+        maxsize: int = 1024,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if error_correction not in ERROR_CORRECTION:
+            raise ValueError(f"Invalid error correction: {error_correction}")
+        self.box_size = box_size
+        self.border = border
+        self.error_correction = error_correction
+        self.svg = svg
+        self.maxsize = maxsize
+        self.executor = executor
+        self._items: "OrderedDict[str, QRCodeImages]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _make_qr(self, data: str) -> qrcode.QRCode:
+        qr = qrcode.QRCode(
+            error_correction=ERROR_CORRECTION[self.error_correction],
+            box_size=self.box_size,
+            border=self.border,
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+        return qr
+
+    def _render(self, data: str) -> QRCodeImages:
+        qr = self._make_qr(data)
+        img = qr.make_image(fill_color="black", back_color="white")
+        png = io.BytesIO()
+        img.save(png)
+        text = io.StringIO()
+        qr.print_ascii(out=text)
+        svg = None
+        if self.svg:
+            from qrcode.image.svg import SvgPathImage
+
+            svg = qr.make_image(image_factory=SvgPathImage).to_string()
+        return QRCodeImages(png=png.getvalue(), text=text.getvalue(), svg=svg)
+
+    def _store(self, data: str, images: QRCodeImages) -> None:
+        self._items[data] = images
+        self._items.move_to_end(data)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def get(self, data: str) -> Optional[QRCodeImages]:
+        """
+        取得已渲染的QR code
+
+        :param data: QR code內容
+        :return: QRCodeImages，尚未渲染時返回None
+        """
+        images = self._items.get(data)
+        if images is not None:
+            self._items.move_to_end(data)
+        return images
+
+    def render_sync(self, data: str) -> QRCodeImages:
+        """
+        同步取得QR code，未命中時在目前執行緒渲染
+
+        :param data: QR code內容
+        :return: QRCodeImages
+        """
+        images = self.get(data)
+        if images is None:
+            images = self._render(data)
+            self._store(data, images)
+        return images
+
+    async def render(self, data: str) -> QRCodeImages:
+        """
+        在執行緒池中渲染QR code，同一內容的並行請求只渲染一次，
+        取消其中一個請求不會影響其他等待同一內容的請求
+
+        :param data: QR code內容
+        :return: QRCodeImages
+        """
+        images = self.get(data)
+        if images is not None:
+            return images
+        pending = self._pending.get(data)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(self.executor, self._render, data)
+            self._pending[data] = pending
+            pending.add_done_callback(functools.partial(self._rendered, data))
+        return await asyncio.shield(pending)
+
+    def _rendered(self, data: str, future: asyncio.Future) -> None:
+        # 渲染期間被 invalidate / clear 時不存入快取
+        if self._pending.get(data) is not future:
+            return
+        del self._pending[data]
+        if not future.cancelled() and future.exception() is None:
+            self._store(data, future.result())
+
+    def invalidate(self, data: str) -> None:
+        """
+        移除快取中的QR code，渲染中的結果也不會存入
+
+        :param data: QR code內容
+        """
+        self._items.pop(data, None)
+        self._pending.pop(data, None)
+
+    def clear(self) -> None:
+        """
+        清除所有快取
+        """
+        self._items.clear()
+        self._pending.clear()
+
+
+_default_cache: Optional[QRCodeCache] = None
+
+
+def get_default_cache() -> QRCodeCache:
+    """
+    取得行程共用的QR code快取
+
+    :return: QRCodeCache
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = QRCodeCache()
+    return _default_cache
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import time
+from typing import IO, TYPE_CHECKING, Awaitable, Callable, Iterable, List, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    from dglabv3.dglab import dglabv3
+
+logger = logging.getLogger("dglabv3.record")
+
+__all__ = ["RecordedFrame", "TrafficRecorder", "TrafficReplayer", "load_recording"]
+
+INBOUND = "<"
+OUTBOUND = ">"
+
+
+class RecordedFrame(NamedTuple):
+    time: float
+    direction: str
+    data: str
+
+
+class TrafficRecorder:
+    """
+    記錄WebSocket收發訊息，每行一筆 `[時間, 方向, 資料]` JSON
+
+    :param output: 檔案路徑或文字串流，None 表示只保留在記憶體
+
+    Example:
+
+    >>> recorder = TrafficRecorder("traffic.jsonl")
+    >>> recorder.attach(client)
+    """
+
+    def __init__(self, output: Union[str, IO[str], None] = None) -> None:
+        self._start = time.monotonic()
+        self._owned = isinstance(output, str)
+        self._stream: Optional[IO[str]] = open(output, "w", encoding="utf-8") if isinstance(output, str) else output
+        self.frames: List[RecordedFrame] = []
+        self._clients: List["dglabv3"] = []
+
+    def attach(self, client: "dglabv3") -> None:
+        """
+        開始記錄客戶端的收發訊息
+
+        :param client: dglabv3 客戶端
+        """
+        client.add_tap(self)
+        self._clients.append(client)
+
+    def detach(self, client: "dglabv3") -> None:
+        """
+        停止記錄客戶端
+
+        :param client: dglabv3 客戶端
+        """
+        client.remove_tap(self)
+        if client in self._clients:
+            self._clients.remove(client)
+
+    def _record(self, direction: str, data: Union[str, bytes]) -> None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+        frame = RecordedFrame(round(time.monotonic() - self._start, 6), direction, data)
+        if self._stream is None:
+            self.frames.append(frame)
+        else:
+            self._stream.write(json.dumps(frame, ensure_ascii=False, separators=(",", ":")))
+            self._stream.write("\n")
+
+    def on_inbound(self, data: Union[str, bytes]) -> None:
+        self._record(INBOUND, data)
+
+    def on_outbound(self, data: str) -> None:
+        self._record(OUTBOUND, data)
+
+    def close(self) -> None:
+        """
+        解除所有客戶端並關閉輸出
+        """
+        for client in list(self._clients):
+            self.detach(client)
+        if self._stream is not None:
+            if self._owned:
+                self._stream.close()
+            else:
+                self._stream.flush()
+            self._stream = None
+
+
+def load_recording(source: Union[str, IO[str]]) -> List[RecordedFrame]:
+    """
+    讀取記錄檔
+
+    :param source: 檔案路徑或文字串流
+    :return: RecordedFrame 列表
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            return load_recording(f)
+    return [RecordedFrame(*json.loads(line)) for line in source if line.strip()]
+
+
+class TrafficReplayer:
+    """
+    依照原始時間間隔重播記錄
+
+    :param frames: 記錄的訊息
+    :param speed: 播放倍速，0 表示不等待直接送出
+
+    Example:
+
+    >>> replayer = TrafficReplayer(load_recording("traffic.jsonl"), speed=10)
+    >>> await replayer.replay_to_client(client)
+    """
+
+    def __init__(self, frames: Iterable[RecordedFrame], speed: float = 1.0) -> None:
+        if speed < 0:
+            raise ValueError("speed cannot be less than 0")
+        self.frames = list(frames)
+        self.speed = speed
+
+    async def _replay(self, direction: str, handler: Callable[[str], Awaitable[None]]) -> int:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        count = 0
+        for frame in self.frames:
+            if frame.direction != direction:
+                continue
+            if self.speed:
+                delay = start + frame.time / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await handler(frame.data)
+            count += 1
+        return count
+
+    async def replay_to_client(self, client: "dglabv3") -> int:
+        """
+        將收到的訊息重新送入客戶端的 `_handle_message`
+
+        :param client: dglabv3 客戶端
+        :return: 重播的訊息數
+        """
+        return await self._replay(INBOUND, client._handle_message)
+
+    async def replay_outbound(self, send: Callable[[str], Awaitable[None]]) -> int:
+        """
+        將送出的訊息重新發送，例如送往假的中繼伺服器
+
+        :param send: 發送函式，例如 websocket.send
+        :return: 重播的訊息數
+        """
+        return await self._replay(OUTBOUND, send)
@@ -0,0 +1,433 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import Counter
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import websockets
+from websockets.asyncio.server import ServerConnection, serve
+
+logger = logging.getLogger("dglabv3.relay")
+
+__all__ = ["DGLabRelay"]
+
+MAX_MESSAGE_LENGTH = 1950
+# 清除App佇列後等待多久才發送新的波形(秒)
+CLEAR_DELAY = 0.15
+
+# 與官方中繼伺服器相同的錯誤碼
+CODE_OK = "200"
+CODE_BREAK = "209"
+CODE_ALREADY_BOUND = "400"
+CODE_TARGET_NOT_FOUND = "401"
+CODE_NOT_BOUND = "402"
+CODE_INVALID_JSON = "403"
+CODE_NOT_FOUND = "404"
+CODE_TOO_LONG = "405"
+CODE_NO_CHANNEL = "406"
+CODE_SERVER_ERROR = "500"
+
+
+class _Peer:
+    """
+    中繼伺服器上的一個端點，可以是獨立連線或多工連線中的虛擬連線
+    """
+
+    __slots__ = ("id", "_send", "_close")
+
+    def __init__(
+        self, peer_id: str, send: Callable[[str], Awaitable[None]], close: Callable[[], Awaitable[None]]
+    ) -> None:
+        self.id = peer_id
+        self._send = send
+        self._close = close
+
+    async def send(self, data: dict) -> bool:
+        try:
+            await self._send(json.dumps(data))
+            return True
+        except websockets.ConnectionClosed:
+            return False
+
+    async def close(self) -> None:
+        try:
+            await self._close()
+        except websockets.ConnectionClosed:
+            pass
+
+
+class DGLabRelay:
+    """
+    可自架的DG-LAB中繼伺服器，實作 bind / msg / heartbeat 配對協議
+
+    App 與客戶端連到同一個位址，`/mux` 端點提供 MultiplexTransport 使用的多工連線，
+    `/metrics` 以文字格式回傳統計數據
+
+    :param host: 監聽位址
+    :param port: 監聽埠，0 表示自動分配
+    :param heartbeat_interval: 伺服器心跳間隔(秒)
+    :param pulse_interval: 波形重送間隔(秒)
+    :param resume_grace: 客戶端斷線後保留綁定的時間(秒)，期間可以用 `resume` 訊息接回原本的App，0 表示立即斷開
+
+    Example:
+
+    >>> relay = DGLabRelay(port=9999)
+    >>> await relay.start()
+    >>> client = dglabv3(url=relay.url)
+    """
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 9999,
+        heartbeat_interval: float = 60,
+        pulse_interval: float = 1.0,
+        resume_grace: float = 0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = heartbeat_interval
+        self.pulse_interval = pulse_interval
+        self.resume_grace = resume_grace
+        self.clients: Dict[str, _Peer] = {}
+        self.relations: Dict[str, str] = {}
+        self._peers: Dict[str, str] = {}
+        self._pulses: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._server: Any = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._detached: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.counters: Counter = Counter()
+
+    @property
+    def url(self) -> str:
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        return f"ws://{host}:{self.port}/"
+
+    async def start(self) -> None:
+        """
+        開始監聽
+        """
+        self._server = await serve(
+            self._handler, self.host, self.port, process_request=self._process_request, max_size=2**16
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        logger.info("Relay listening on %s", self.url)
+
+    async def stop(self) -> None:
+        """
+        停止伺服器並關閉所有連線
+        """
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for task in self._pulses.values():
+            task.cancel()
+        self._pulses.clear()
+        for timer in self._detached.values():
+            timer.cancel()
+        self._detached.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        """
+        啟動並持續運行
+        """
+        await self.start()
+        try:
+            await asyncio.Future()
+        finally:
+            await self.stop()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        取得統計數據
+
+        :return: 統計名稱與數值
+        """
+        return {
+            "connections_current": len(self.clients),
+            "bindings_current": len(self.relations),
+            "pulse_tasks_current": len(self._pulses),
+            "detached_current": len(self._detached),
+            **self.counters,
+        }
+
+    def metrics_text(self) -> str:
+        """
+        以 Prometheus 文字格式輸出統計數據
+
+        :return: 統計文字
+        """
+        return "".join(f"dglab_relay_{name} {value}\n" for name, value in sorted(self.metrics().items()))
+
+    def _process_request(self, connection: ServerConnection, request: Any) -> Any:
+        if request.path == "/metrics":
+            return connection.respond(HTTPStatus.OK, self.metrics_text())
+        return None
+
+    async def _handler(self, ws: ServerConnection) -> None:
+        if ws.request is not None and ws.request.path.rstrip("/") == "/mux":
+            await self._handle_mux(ws)
+            return
+        peer = _Peer(str(uuid.uuid4()), ws.send, ws.close)
+        await self._register(peer)
+        try:
+            async for raw in ws:
+                await self._on_message(peer, raw)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            await self._unregister(peer)
+
+    async def _handle_mux(self, ws: ServerConnection) -> None:
+        self.counters["mux_connections_total"] += 1
+        channels: Dict[int, _Peer] = {}
+
+        def make_peer(channel_id: int) -> _Peer:
+            async def send(text: str) -> None:
+                await ws.send(json.dumps({"mux": channel_id, "data": text}))
+
+            async def close() -> None:
+                await ws.send(json.dumps({"mux": channel_id, "close": True}))
+
+            return _Peer(str(uuid.uuid4()), send, close)
+
+        try:
+            async for raw in ws:
+                try:
+                    envelope = json.loads(raw)
+                    channel_id = envelope["mux"]
+                except (ValueError, KeyError, TypeError):
+                    self.counters["errors_total"] += 1
+                    continue
+                if envelope.get("open"):
+                    channels[channel_id] = make_peer(channel_id)
+                    await self._register(channels[channel_id])
+                elif envelope.get("close"):
+                    peer = channels.pop(channel_id, None)
+                    if peer is not None:
+                        await self._unregister(peer)
+                elif channel_id in channels and "data" in envelope:
+                    await self._on_message(channels[channel_id], envelope["data"])
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for peer in channels.values():
+                await self._unregister(peer)
+
+    async def _register(self, peer: _Peer) -> None:
+        self.clients[peer.id] = peer
+        self.counters["connections_total"] += 1
+        await self._send(peer, {"type": "bind", "clientId": peer.id, "targetId": "", "message": "targetId"})
+
+    async def _unregister(self, peer: _Peer) -> None:
+        if self.clients.get(peer.id) is not peer:
+            return
+        del self.clients[peer.id]
+        for key in [key for key in self._pulses if key[0] == peer.id]:
+            self._pulses.pop(key).cancel()
+        if self.resume_grace > 0 and peer.id in self.relations and self.relations[peer.id] in self.clients:
+            # 保留綁定，讓重新啟動的客戶端可以接回App
+            loop = asyncio.get_running_loop()
+            self._detached[peer.id] = loop.call_later(self.resume_grace, self._expire, peer.id)
+            return
+        await self._break(peer.id)
+
+    def _expire(self, client_id: str) -> None:
+        if self._detached.pop(client_id, None) is None:
+            return
+        self.counters["resume_expired_total"] += 1
+        task = asyncio.create_task(self._break(client_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _break(self, peer_id: str) -> None:
+        """
+        解除綁定並通知另一端
+        """
+        other_id = self._peers.pop(peer_id, None)
+        if other_id is None:
+            return
+        self._peers.pop(other_id, None)
+        if other_id in self._detached:
+            self._detached.pop(other_id).cancel()
+        if peer_id in self.relations:
+            client_id, target_id = peer_id, self.relations.pop(peer_id)
+        else:
+            client_id, target_id = other_id, peer_id
+            self.relations.pop(other_id, None)
+        other = self.clients.get(other_id)
+        if other is not None:
+            message = {"type": "break", "clientId": client_id, "targetId": target_id, "message": CODE_BREAK}
+            await self._send(other, message)
+            await other.close()
+
+    async def _send(self, peer: _Peer, data: dict) -> None:
+        if await peer.send(data):
+            self.counters["messages_out_total"] += 1
+
+    async def _error(self, peer: _Peer, code: str, data: Optional[dict] = None) -> None:
+        self.counters[f"errors_{code}_total"] += 1
+        data = data or {}
+        client_id, target_id = data.get("clientId", ""), data.get("targetId", "")
+        await self._send(peer, {"type": "error", "clientId": client_id, "targetId": target_id, "message": code})
+
+    def _is_bound(self, client_id: Optional[str], target_id: Optional[str]) -> bool:
+        return client_id is not None and self.relations.get(client_id) == target_id
+
+    async def _on_message(self, peer: _Peer, raw: Any) -> None:
+        self.counters["messages_in_total"] += 1
+        if len(raw) > MAX_MESSAGE_LENGTH:
+            await self._error(peer, CODE_TOO_LONG)
+            return
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError("message must be an object")
+        except ValueError:
+            await self._error(peer, CODE_INVALID_JSON)
+            return
+
+        type_ = data.get("type")
+        client_id = data.get("clientId")
+        target_id = data.get("targetId")
+        if type_ == "resume":
+            await self._resume(peer, client_id, target_id, data)
+            return
+        if peer.id not in (client_id, target_id):
+            await self._error(peer, CODE_NOT_FOUND, data)
+            return
+        if type_ == "heartbeat":
+            return
+        if type_ == "bind":
+            await self._bind(peer, client_id, target_id, data)
+            return
+        if not self._is_bound(client_id, target_id):
+            await self._error(peer, CODE_NOT_BOUND, data)
+            return
+
+        other = self.clients.get(target_id if peer.id == client_id else client_id)
+        if other is None:
+            if client_id in self._detached:
+                # 客戶端重新啟動中，App的訊息直接丟棄
+                self.counters["messages_dropped_total"] += 1
+                return
+            await self._error(peer, CODE_NOT_FOUND, data)
+            return
+        if type_ in (1, 2, 3):
+            channel = data.get("channel", 1)
+            mode, strength = {1: (0, 1), 2: (1, 1), 3: (2, 0)}[type_]
+            message = f"strength-{channel}+{mode}+{strength}"
+            await self._send(other, {"type": "msg", "clientId": client_id, "targetId": target_id, "message": message})
+        elif type_ == 4:
+            await self._send(
+                other, {"type": "msg", "clientId": client_id, "targetId": target_id, "message": data.get("message")}
+            )
+        elif type_ == "clientMsg":
+            await self._pulse(peer, other, data)
+        else:
+            await self._send(
+                other, {"type": type_, "clientId": client_id, "targetId": target_id, "message": data.get("message")}
+            )
+
+    async def _bind(self, peer: _Peer, client_id: Optional[str], target_id: Optional[str], data: dict) -> None:
+        if client_id not in self.clients or target_id not in self.clients:
+            await self._error(peer, CODE_TARGET_NOT_FOUND, data)
+            return
+        if client_id in self._peers or target_id in self._peers:
+            await self._error(peer, CODE_ALREADY_BOUND, data)
+            return
+        self.relations[client_id] = target_id
+        self._peers[client_id] = target_id
+        self._peers[target_id] = client_id
+        self.counters["bindings_total"] += 1
+        reply = {"type": "bind", "clientId": client_id, "targetId": target_id, "message": CODE_OK}
+        for side in (client_id, target_id):
+            await self._send(self.clients[side], reply)
+
+    async def _resume(self, peer: _Peer, client_id: Optional[str], target_id: Optional[str], data: dict) -> None:
+        """
+        新連線接手斷線中的客戶端ID，App端不會察覺客戶端重新連線
+        """
+        if client_id not in self._detached or self.relations.get(client_id) != target_id or peer.id in self._peers:
+            await self._error(peer, CODE_NOT_BOUND, data)
+            return
+        self._detached.pop(client_id).cancel()
+        del self.clients[peer.id]
+        peer.id = client_id
+        self.clients[client_id] = peer
+        self.counters["resumes_total"] += 1
+        await self._send(peer, {"type": "bind", "clientId": client_id, "targetId": target_id, "message": CODE_OK})
+
+    async def _pulse(self, peer: _Peer, other: _Peer, data: dict) -> None:
+        channel = data.get("channel")
+        if not channel:
+            await self._error(peer, CODE_NO_CHANNEL, data)
+            return
+        message = {
+            "type": "msg",
+            "clientId": data.get("clientId"),
+            "targetId": data.get("targetId"),
+            "message": f"pulse-{data.get('message')}",
+        }
+        total = max(1, int(data.get("time", 5) or 1))
+        key = (peer.id, str(channel))
+        previous = self._pulses.pop(key, None)
+        if previous is not None:
+            # 同通道已有波形在發送，先清除App佇列，新波形在背景延遲發送，不阻塞這條連線的讀取
+            previous.cancel()
+            clear = "clear-1" if channel == "A" else "clear-2"
+            await self._send(other, dict(message, message=clear))
+            self._pulses[key] = asyncio.create_task(self._repeat(key, other, message, total, CLEAR_DELAY))
+            return
+        await self._send(other, message)
+        self.counters["pulses_total"] += 1
+        if total > 1:
+            self._pulses[key] = asyncio.create_task(self._repeat(key, other, message, total - 1))
+
+    async def _repeat(
+        self, key: Tuple[str, str], other: _Peer, message: dict, remaining: int, delay: Optional[float] = None
+    ) -> None:
+        """
+        :param delay: 清除App佇列後等待多久才發送第一次，None 表示第一次已經發送
+        """
+        try:
+            if delay is not None:
+                await asyncio.sleep(delay)
+                await self._send(other, message)
+                self.counters["pulses_total"] += 1
+                remaining -= 1
+            for _ in range(remaining):
+                await asyncio.sleep(self.pulse_interval)
+                await self._send(other, message)
+        finally:
+            if self._pulses.get(key) is asyncio.current_task():
+                del self._pulses[key]
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            # 同時送出，單一緩慢的連線不會延遲其他連線的心跳
+            messages = [
+                (peer, {"type": "heartbeat", "clientId": peer.id, "targetId": self._peers.get(peer.id, "")})
+                for peer in list(self.clients.values())
+            ]
+            await asyncio.gather(*(self._send(peer, dict(message, message=CODE_OK)) for peer, message in messages))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DG-LAB relay server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9999)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(DGLabRelay(args.host, args.port).serve_forever())
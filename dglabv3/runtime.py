@@ -0,0 +1,141 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import os
+import weakref
+from dataclasses import dataclass
+from typing import Any, Coroutine, Optional, TypeVar
+
+from dglabv3.transport import WebSocketTransport, set_default_transport
+
+logger = logging.getLogger("dglabv3.runtime")
+
+__all__ = ["DEFAULT", "PRODUCTION", "RuntimeProfile", "apply_profile", "configure_loop", "run", "use_uvloop"]
+
+T = TypeVar("T")
+
+# configure_loop 為各事件迴圈建立的執行器，uvloop 沒有公開 _default_executor
+_executors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, concurrent.futures.Executor]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@dataclass(slots=True, frozen=True)
+class RuntimeProfile:
+    """
+    事件迴圈與連線設定
+
+    :param uvloop: 有安裝 uvloop 時使用 uvloop 事件迴圈
+    :param executor_workers: 預設執行器的執行緒數，None 使用 asyncio 預設值
+    :param max_size: 單一WebSocket訊息最大位元組數
+    :param max_queue: WebSocket讀取緩衝的訊息數上限
+    :param write_limit: WebSocket寫入緩衝上限(位元組)
+    :param compression: "deflate" 或 None 停用壓縮
+    """
+
+    uvloop: bool = False
+    executor_workers: Optional[int] = None
+    max_size: Optional[int] = 2**20
+    max_queue: Optional[int] = 16
+    write_limit: int = 2**15
+    compression: Optional[str] = "deflate"
+
+
+DEFAULT = RuntimeProfile()
+
+# 中繼伺服器的訊息上限為 1950 字元，8KiB 已足夠；
+# 訊息很短，停用壓縮可省下每條連線的 zlib 緩衝；
+# 預設執行器只用於QR code渲染等短暫的CPU工作，執行緒數與核心數相同即可
+PRODUCTION = RuntimeProfile(
+    uvloop=True,
+    executor_workers=os.cpu_count() or 1,
+    max_size=2**13,
+    max_queue=4,
+    write_limit=2**14,
+    compression=None,
+)
+
+
+def use_uvloop() -> bool:
+    """
+    之後建立的事件迴圈改用 uvloop
+
+    :return: 是否已安裝 uvloop
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("uvloop is not installed, using the default asyncio event loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def configure_loop(loop: asyncio.AbstractEventLoop, profile: RuntimeProfile) -> None:
+    """
+    依設定調整已建立的事件迴圈，取代預設執行器時會關閉原本的執行器
+
+    :param loop: 事件迴圈
+    :param profile: RuntimeProfile
+    """
+    if profile.executor_workers is not None:
+        previous = _executors.get(loop) or getattr(loop, "_default_executor", None)
+        executor = concurrent.futures.ThreadPoolExecutor(profile.executor_workers, thread_name_prefix="dglabv3")
+        loop.set_default_executor(executor)
+        _executors[loop] = executor
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+
+def apply_profile(profile: RuntimeProfile = PRODUCTION) -> None:
+    """
+    套用設定，需在 `asyncio.run` 之前呼叫才會使用 uvloop；
+    未要求 uvloop 時不會更動應用程式設定的事件迴圈策略；
+    在事件迴圈中呼叫時同時設定目前迴圈的預設執行器
+
+    :param profile: RuntimeProfile
+
+    Example:
+
+    >>> apply_profile(PRODUCTION)
+    >>> asyncio.run(main())
+    """
+    if profile.uvloop:
+        use_uvloop()
+    set_default_transport(
+        functools.partial(
+            WebSocketTransport,
+            max_size=profile.max_size,
+            max_queue=profile.max_queue,
+            write_limit=profile.write_limit,
+            compression=profile.compression,
+        )
+    )
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    configure_loop(loop, profile)
+
+
+async def _configured(main: Coroutine[Any, Any, T], profile: RuntimeProfile) -> T:
+    configure_loop(asyncio.get_running_loop(), profile)
+    return await main
+
+
+def run(main: Coroutine[Any, Any, T], profile: RuntimeProfile = PRODUCTION) -> T:
+    """
+    以指定設定執行協程，取代 `asyncio.run`
+
+    :param main: 主協程
+    :param profile: RuntimeProfile
+    :return: 協程的回傳值
+
+    Example:
+
+    >>> from dglabv3 import runtime
+    >>> runtime.run(main())
+    """
+    apply_profile(profile)
+    return asyncio.run(_configured(main, profile))
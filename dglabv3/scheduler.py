@@ -0,0 +1,342 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from enum import StrEnum
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Protocol, Set
+
+from dglabv3.dtype import Channel, MessageType
+
+if TYPE_CHECKING:
+    from dglabv3.dglab import dglabv3
+
+logger = logging.getLogger("dglabv3.scheduler")
+
+__all__ = ["PlayMode", "ScheduledWave", "SchedulerClock", "WaveScheduler", "get_clock"]
+
+FRAME_SECONDS = 0.1  # 協議固定每幀 100ms
+
+
+class PlayMode(StrEnum):
+    """
+    屬性:
+        QUEUED: 排在目前波形之後播放
+        INTERRUPT: 清除App佇列並立即播放
+        CROSSFADE: 由目前波形漸變到新波形
+    """
+
+    QUEUED = "queued"
+    INTERRUPT = "interrupt"
+    CROSSFADE = "crossfade"
+
+
+class Tickable(Protocol):
+    async def _tick(self, now: float) -> None: ...
+
+
+class SchedulerClock:
+    """
+    行程內共用的單調時鐘，每個tick呼叫所有已註冊物件的 `_tick`
+    """
+
+    def __init__(self, interval: float = FRAME_SECONDS) -> None:
+        self.interval = interval
+        self._subscribers: Set[Tickable] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, subscriber: Tickable) -> None:
+        """
+        註冊tick物件，必要時啟動時鐘任務
+
+        :param subscriber: 具有 `_tick(now)` 的物件
+        """
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._task = asyncio.create_task(self._run())
+
+    def remove(self, subscriber: Tickable) -> None:
+        """
+        移除tick物件，沒有物件時停止時鐘任務
+
+        :param subscriber: 已註冊的物件
+        """
+        self._subscribers.discard(subscriber)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while self._subscribers:
+            now = loop.time()
+            results = await asyncio.gather(*(s._tick(now) for s in list(self._subscribers)), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Scheduler tick error: %s", result)
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # 落後時不補跑，直接對齊到目前時間
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+
+_clock: Optional[SchedulerClock] = None
+
+
+def get_clock() -> SchedulerClock:
+    """
+    取得行程共用的時鐘
+
+    :return: SchedulerClock
+    """
+    global _clock
+    if _clock is None:
+        _clock = SchedulerClock()
+    return _clock
+
+
+class ScheduledWave:
+    """
+    排程中的波形
+
+    :param wave: 波形數據
+    :param time: 持續時間(秒)，None 表示只播放一次
+    """
+
+    def __init__(self, wave: List[List[List[int]]], time: Optional[float] = None) -> None:
+        if not wave:
+            raise ValueError("wave cannot be empty")
+        self.wave = wave
+        self.total = len(wave) if time is None else max(1, round(time / FRAME_SECONDS))
+        self.pos = 0
+
+    @property
+    def done(self) -> bool:
+        return self.pos >= self.total
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.pos
+
+    def next_frame(self) -> List[List[int]]:
+        frame = self.wave[self.pos % len(self.wave)]
+        self.pos += 1
+        return frame
+
+
+def _blend(old: List[List[int]], new: List[List[int]], t: float) -> List[List[int]]:
+    freq = new[0] if t >= 0.5 else old[0]
+    intensity = [round(a + (b - a) * t) for a, b in zip(old[1], new[1])]
+    return [list(freq), intensity]
+
+
+class _ChannelTimeline:
+    def __init__(self) -> None:
+        self.queue: Deque[ScheduledWave] = deque()
+        self.current: Optional[ScheduledWave] = None
+        self.fading_from: Optional[ScheduledWave] = None
+        self.fade_pos = 0
+        self.fade_total = 0
+        self.device_until = 0.0  # App端已排入幀的預估播放結束時間
+
+    def _advance(self) -> Optional[ScheduledWave]:
+        while self.current is None or self.current.done:
+            if not self.queue:
+                self.current = None
+                return None
+            self.current = self.queue.popleft()
+        return self.current
+
+    def take(self, count: int) -> List[List[List[int]]]:
+        frames = []
+        while len(frames) < count:
+            current = self._advance()
+            if current is None:
+                break
+            frame = current.next_frame()
+            if self.fading_from is not None:
+                if self.fade_pos < self.fade_total and not self.fading_from.done:
+                    self.fade_pos += 1
+                    frame = _blend(self.fading_from.next_frame(), frame, self.fade_pos / (self.fade_total + 1))
+                else:
+                    self.fading_from = None
+            frames.append(frame)
+        return frames
+
+    def buffered(self, now: float) -> float:
+        return max(0.0, self.device_until - now)
+
+    def clear(self) -> None:
+        self.queue.clear()
+        self.current = None
+        self.fading_from = None
+
+
+class WaveScheduler:
+    """
+    單一連線的波形時間軸排程器
+
+    依照播放時鐘即時餵送波形，App端只保留少量幀，新指令可以更快生效
+
+    :param client: dglabv3 客戶端
+    :param lead_frames: App端預先保留的幀數
+    :param chunk_frames: 每次發送的幀數上限
+    :param crossfade_frames: 漸變模式使用的幀數
+
+    Example:
+
+    >>> scheduler = WaveScheduler(client)
+    >>> scheduler.start()
+    >>> await scheduler.play(PULSES["呼吸"], 10, Channel.A)
+    """
+
+    def __init__(
+        self,
+        client: "dglabv3",
+        lead_frames: int = 5,
+        chunk_frames: int = 5,
+        crossfade_frames: int = 5,
+    ) -> None:
+        if chunk_frames < 1 or chunk_frames > 100:
+            raise ValueError("chunk_frames must be between 1 and 100")
+        self.client = client
+        self.lead_frames = lead_frames
+        self.chunk_frames = chunk_frames
+        self.crossfade_frames = crossfade_frames
+        self._timelines: Dict[Channel, _ChannelTimeline] = {
+            Channel.A: _ChannelTimeline(),
+            Channel.B: _ChannelTimeline(),
+        }
+        self._clock: Optional[SchedulerClock] = None
+
+    def start(self, clock: Optional[SchedulerClock] = None) -> None:
+        """
+        將排程器註冊到時鐘
+
+        :param clock: 使用的時鐘，預設為行程共用時鐘
+        """
+        self._clock = clock or get_clock()
+        self._clock.add(self)
+
+    def stop(self) -> None:
+        """
+        從時鐘移除排程器
+        """
+        if self._clock is not None:
+            self._clock.remove(self)
+            self._clock = None
+
+    @staticmethod
+    def _channels(channel: Channel) -> List[Channel]:
+        return [Channel.A, Channel.B] if channel == Channel.BOTH else [channel]
+
+    async def play(
+        self,
+        wave: List[List[List[int]]],
+        time: Optional[float] = None,
+        channel: Channel = Channel.BOTH,
+        mode: PlayMode = PlayMode.QUEUED,
+    ) -> None:
+        """
+        將波形加入時間軸
+
+        :param wave: 波形數據
+        :param time: 持續時間(秒)，None 表示只播放一次
+        :param channel: Channel.A or Channel.B or Channel.BOTH
+        :param mode: 播放模式
+
+        Example:
+
+        >>> await scheduler.play(PULSES["潮汐"], 5, Channel.A, PlayMode.CROSSFADE)
+        """
+        for ch in self._channels(channel):
+            timeline = self._timelines[ch]
+            item = ScheduledWave(wave, time)
+            if mode == PlayMode.QUEUED:
+                timeline.queue.append(item)
+            elif mode == PlayMode.INTERRUPT:
+                timeline.clear()
+                timeline.queue.append(item)
+                timeline.device_until = 0.0
+                await self.client.clear_wave(ch)
+            elif mode == PlayMode.CROSSFADE:
+                previous = timeline._advance()
+                timeline.clear()
+                timeline.current = item
+                if previous is not None and self.crossfade_frames > 0:
+                    timeline.fading_from = previous
+                    timeline.fade_pos = 0
+                    timeline.fade_total = self.crossfade_frames
+
+    async def clear(self, channel: Channel = Channel.BOTH) -> None:
+        """
+        清除時間軸與App端佇列
+
+        :param channel: 要清除的通道
+        """
+        for ch in self._channels(channel):
+            self._timelines[ch].clear()
+            self._timelines[ch].device_until = 0.0
+        await self.client.clear_wave(channel)
+
+    def now_playing(self, channel: Channel) -> Optional[ScheduledWave]:
+        """
+        取得目前播放中的波形
+
+        :param channel: Channel.A or Channel.B
+        :return: ScheduledWave，沒有波形時返回None
+        """
+        return self._timelines[channel].current
+
+    def position(self, channel: Channel, now: Optional[float] = None) -> Optional[float]:
+        """
+        估計目前波形的播放位置
+
+        :param channel: Channel.A or Channel.B
+        :param now: 單調時鐘時間，預設為事件迴圈時間
+        :return: 播放位置(秒)，沒有波形時返回None
+        """
+        timeline = self._timelines[channel]
+        if timeline.current is None:
+            return None
+        now = asyncio.get_running_loop().time() if now is None else now
+        return max(0.0, timeline.current.pos * FRAME_SECONDS - timeline.buffered(now))
+
+    def remaining(self, channel: Channel, now: Optional[float] = None) -> float:
+        """
+        估計通道剩餘播放時間，包含App端已排入的幀
+
+        :param channel: Channel.A or Channel.B
+        :param now: 單調時鐘時間，預設為事件迴圈時間
+        :return: 剩餘時間(秒)
+        """
+        timeline = self._timelines[channel]
+        now = asyncio.get_running_loop().time() if now is None else now
+        frames = sum(item.remaining for item in timeline.queue)
+        if timeline.current is not None:
+            frames += timeline.current.remaining
+        return frames * FRAME_SECONDS + timeline.buffered(now)
+
+    async def _tick(self, now: float) -> None:
+        if not self.client.is_connected() or self.client.target_id is None:
+            return
+        lead = self.lead_frames * FRAME_SECONDS
+        for ch, timeline in self._timelines.items():
+            if timeline.buffered(now) >= lead:
+                continue
+            frames = timeline.take(self.chunk_frames)
+            if not frames:
+                continue
+            timeline.device_until = max(timeline.device_until, now) + len(frames) * FRAME_SECONDS
+            ch_str = ch.name
+            await self.client._send_message(
+                {
+                    "type": MessageType.CLIENT_MSG,
+                    "channel": ch_str,
+                    "message": f"{ch_str}:{json.dumps(self.client._wave2hex(frames))}",
+                    "time": 1,
+                }
+            )
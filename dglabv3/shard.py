@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import zlib
+from itertools import count
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Hashable, List, Optional, Set
+
+from dglabv3.dtype import Channel, StrengthType
+from dglabv3.event import EventEmitter
+
+logger = logging.getLogger("dglabv3.shard")
+
+__all__ = ["ShardedSessionHost"]
+
+# 可由前端呼叫的 dglabv3 方法
+ALLOWED_METHODS = frozenset(
+    {
+        "send_wave_message",
+        "clear_wave",
+        "clear_all_wave",
+        "set_strength",
+        "set_strength_value",
+        "add_strength_value",
+        "decrease_strength_value",
+        "reset_strength_value",
+        "wait_for_app_connect",
+        "get_strength_value",
+        "get_max_strength_value",
+        "is_connected",
+        "is_linked_to_app",
+        "generate_qrcode_text",
+    }
+)
+FORWARD_EVENTS = ("strength", "button")
+
+
+def shard_for(key: Hashable, workers: int) -> int:
+    """
+    以穩定雜湊決定使用者所在的工作行程
+
+    :param key: 使用者鍵
+    :param workers: 工作行程數
+    :return: 工作行程索引
+    """
+    return zlib.crc32(repr(key).encode()) % workers
+
+
+class _Worker:
+    """
+    工作行程內的 session 管理
+    """
+
+    def __init__(self, conn: Connection, client_kwargs: dict) -> None:
+        self.conn = conn
+        self.client_kwargs = client_kwargs
+        self.sessions: Dict[Hashable, Any] = {}
+        self.loop = asyncio.new_event_loop()
+
+    def run(self) -> None:
+        threading.Thread(target=self._read, daemon=True).start()
+        self.loop.run_forever()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                command = self.conn.recv()
+            except (EOFError, OSError):
+                command = None
+            if command is None:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                return
+            self.loop.call_soon_threadsafe(self.loop.create_task, self._execute(*command))
+
+    def _forward(self, key: Hashable, event_name: str):
+        def callback(*args: Any) -> None:
+            self.conn.send(("event", key, event_name, args))
+
+        return callback
+
+    async def _open(self, key: Hashable, timeout: int) -> Optional[str]:
+        from dglabv3.dglab import dglabv3
+
+        if key in self.sessions:
+            await self.sessions.pop(key).close()
+        client = dglabv3(**self.client_kwargs)
+        for event_name in FORWARD_EVENTS:
+            client.register_event(event_name, self._forward(key, event_name))
+        try:
+            await client.connect_and_wait(timeout)
+        except BaseException:
+            await client.close()
+            raise
+        self.sessions[key] = client
+        return client._qrcode_data()
+
+    async def _close(self, key: Hashable) -> None:
+        client = self.sessions.pop(key, None)
+        if client is not None:
+            await client.close()
+
+    async def _execute(self, request_id: int, key: Hashable, method: str, args: tuple, kwargs: dict) -> None:
+        try:
+            if method == "open":
+                result = await self._open(key, *args, **kwargs)
+            elif method == "close":
+                result = await self._close(key)
+            elif method == "sessions":
+                result = list(self.sessions)
+            elif method in ALLOWED_METHODS:
+                client = self.sessions.get(key)
+                if client is None:
+                    raise KeyError(f"Session not found: {key!r}")
+                result = getattr(client, method)(*args, **kwargs)
+                if asyncio.iscoroutine(result):
+                    result = await result
+            else:
+                raise AttributeError(f"Method not allowed: {method}")
+            self._reply(request_id, True, result)
+        except Exception as e:
+            self._reply(request_id, False, e)
+
+    def _reply(self, request_id: int, ok: bool, value: Any) -> None:
+        try:
+            self.conn.send(("result", request_id, ok, value))
+        except Exception as e:
+            # 結果或例外無法序列化時改送可序列化的錯誤，避免前端永遠等待
+            error = RuntimeError(f"Unpicklable result: {e!r}") if ok else RuntimeError(repr(value))
+            self.conn.send(("result", request_id, False, error))
+
+
+def _worker_main(conn: Connection, client_kwargs: dict) -> None:
+    _Worker(conn, client_kwargs).run()
+
+
+class ShardedSessionHost(EventEmitter):
+    """
+    將 dglabv3 session 依使用者鍵分散到多個工作行程
+
+    前端只負責路由指令，JSON與波形編碼在工作行程內完成，
+    工作行程的事件會以 `(key, ...)` 參數重新觸發，例如 `strength(key, strength)`；
+    工作行程意外結束時，等待中的呼叫會收到 ConnectionError，
+    該行程上的 session 會以 `session_lost(key)` 事件通知
+
+    :param workers: 工作行程數，預設為CPU核心數
+    :param client_kwargs: 建立 dglabv3 時使用的參數
+    :param mp_context: multiprocessing 啟動方式
+
+    Example:
+
+    >>> host = ShardedSessionHost(workers=4)
+    >>> await host.start()
+    >>> qr_data = await host.open_session(user_id)
+    >>> await host.set_strength_value(user_id, Channel.A, 20)
+    """
+
+    def __init__(
+        self, workers: Optional[int] = None, client_kwargs: Optional[dict] = None, mp_context: str = "spawn"
+    ) -> None:
+        super().__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self.client_kwargs = client_kwargs or {}
+        self._context = multiprocessing.get_context(mp_context)
+        self._processes: List[Any] = []
+        self._conns: List[Connection] = []
+        self._outboxes: List[asyncio.Queue] = []
+        self._writers: List[asyncio.Task] = []
+        self._alive: List[bool] = []
+        self._requests: List[Set[int]] = []
+        self._sessions: List[Set[Hashable]] = []
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._ids = count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        """
+        啟動工作行程
+        """
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.workers):
+            parent, child = self._context.Pipe()
+            process = self._context.Process(
+                target=_worker_main, args=(child, self.client_kwargs), name=f"dglabv3-shard-{index}", daemon=True
+            )
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._conns.append(parent)
+            self._outboxes.append(asyncio.Queue())
+            self._alive.append(True)
+            self._requests.append(set())
+            self._sessions.append(set())
+            self._writers.append(asyncio.create_task(self._write(index)))
+            threading.Thread(target=self._read, args=(index, parent), daemon=True).start()
+
+    async def _write(self, index: int) -> None:
+        """
+        依序把指令寫入工作行程，序列化與寫入在執行緒池進行，管道已滿時不會阻塞事件迴圈
+        """
+        loop = asyncio.get_running_loop()
+        outbox, conn = self._outboxes[index], self._conns[index]
+        while True:
+            request_id, command = await outbox.get()
+            try:
+                await loop.run_in_executor(None, conn.send, command)
+            except Exception as e:
+                if request_id is not None:
+                    self._fail(request_id, e if isinstance(e, OSError) else RuntimeError(f"Cannot send command: {e!r}"))
+            if command is None:
+                return
+
+    def _read(self, index: int, conn: Connection) -> None:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                if self._loop is not None and not self._loop.is_closed():
+                    self._loop.call_soon_threadsafe(self._lost, index)
+                return
+            if self._loop is None or self._loop.is_closed():
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, index, message)
+
+    def _lost(self, index: int) -> None:
+        """
+        工作行程已結束，讓等待中的呼叫失敗並移除該行程上的 session
+        """
+        if index >= len(self._alive) or not self._alive[index]:
+            return
+        self._alive[index] = False
+        logger.error("Shard %s exited", index)
+        for request_id in list(self._requests[index]):
+            self._fail(request_id, ConnectionError(f"Shard {index} exited"))
+        sessions = list(self._sessions[index])
+        self._sessions[index].clear()
+        for key in sessions:
+            self.emit("session_lost", key)
+
+    def _fail(self, request_id: int, error: BaseException) -> None:
+        future = self._futures.pop(request_id, None)
+        for requests in self._requests:
+            requests.discard(request_id)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def _dispatch(self, index: int, message: tuple) -> None:
+        if message[0] == "result":
+            _, request_id, ok, value = message
+            self._requests[index].discard(request_id)
+            future = self._futures.pop(request_id, None)
+            if future is None or future.done():
+                return
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        elif message[0] == "event":
+            _, key, event_name, args = message
+            self.emit(event_name, key, *args)
+
+    async def call(self, key: Hashable, method: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        在使用者所在的工作行程呼叫 dglabv3 方法
+
+        :param key: 使用者鍵
+        :param method: 方法名稱
+        :return: 方法的返回值
+        """
+        if not self._conns or self._loop is None:
+            raise RuntimeError("Host is not started")
+        index = shard_for(key, self.workers)
+        if not self._alive[index]:
+            raise ConnectionError(f"Shard {index} exited")
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._futures[request_id] = future
+        self._requests[index].add(request_id)
+        self._outboxes[index].put_nowait((request_id, (request_id, key, method, args, kwargs)))
+        result = await future
+        if method == "open":
+            self._sessions[index].add(key)
+        elif method == "close":
+            self._sessions[index].discard(key)
+        return result
+
+    async def open_session(self, key: Hashable, timeout: int = 30) -> Optional[str]:
+        """
+        建立 session 並等待綁定
+
+        :param key: 使用者鍵
+        :param timeout: 超時時間(秒)
+        :return: QR code內容，可交給 QRCodeCache 渲染
+        """
+        return await self.call(key, "open", timeout)
+
+    async def close_session(self, key: Hashable) -> None:
+        """
+        關閉 session
+
+        :param key: 使用者鍵
+        """
+        await self.call(key, "close")
+
+    async def set_strength(self, key: Hashable, channel: Channel, type_id: StrengthType, strength: int) -> None:
+        await self.call(key, "set_strength", channel, type_id, strength)
+
+    async def set_strength_value(self, key: Hashable, channel: Channel, strength: int) -> None:
+        await self.call(key, "set_strength_value", channel, strength)
+
+    async def send_wave_message(
+        self, key: Hashable, wave: List[List[List[int]]], time: int = 10, channel: Channel = Channel.BOTH
+    ) -> None:
+        await self.call(key, "send_wave_message", wave, time, channel)
+
+    async def stop(self) -> None:
+        """
+        停止所有工作行程
+        """
+        for outbox in self._outboxes:
+            outbox.put_nowait((None, None))
+        if self._writers:
+            await asyncio.wait(self._writers, timeout=5)
+        for writer in self._writers:
+            writer.cancel()
+        self._alive = [False] * len(self._alive)
+        for process in self._processes:
+            await asyncio.get_running_loop().run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Host stopped"))
+        self._futures.clear()
+        self._processes.clear()
+        self._conns.clear()
+        self._outboxes.clear()
+        self._writers.clear()
+        self._alive.clear()
+        self._requests.clear()
+        self._sessions.clear()
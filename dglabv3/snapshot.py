@@ -0,0 +1,388 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import math
+import sqlite3
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Union
+
+from dglabv3.dtype import MessageType, Strength
+from dglabv3.scheduler import FRAME_SECONDS
+
+if TYPE_CHECKING:
+    from dglabv3.dglab import dglabv3
+
+logger = logging.getLogger("dglabv3.snapshot")
+
+__all__ = ["SessionSnapshot", "SessionSnapshotter", "SnapshotStore", "WaveState", "restore_sessions"]
+
+
+@dataclass(slots=True)
+class WaveState:
+    """
+    通道上正在由中繼伺服器重送的波形
+
+    :param hex_wave: 16進制波形
+    :param time: 持續時間(秒)
+    :param started: 開始發送的時間(Unix 時間)
+    """
+
+    hex_wave: List[str]
+    time: int
+    started: float
+
+    def remaining(self, now: float) -> float:
+        return self.time - (now - self.started)
+
+    def rotated(self, now: float) -> List[str]:
+        """
+        依目前的播放位置旋轉波形，讓恢復後從中斷處接續
+        """
+        offset = int((now - self.started) / FRAME_SECONDS) % len(self.hex_wave)
+        return self.hex_wave[offset:] + self.hex_wave[:offset]
+
+
+@dataclass(slots=True)
+class SessionSnapshot:
+    """
+    可序列化的連線狀態
+
+    :param key: 識別連線的鍵，例如使用者ID
+    :param url: 中繼伺服器網址
+    :param client_id: 客戶端ID
+    :param target_id: App ID
+    :param strength: 最後的強度與上限
+    :param waves: 各通道正在播放的波形
+    :param saved_at: 儲存時間(Unix 時間)
+    """
+
+    key: str
+    url: str
+    client_id: Optional[str]
+    target_id: Optional[str]
+    strength: Strength
+    waves: Dict[str, WaveState] = field(default_factory=dict)
+    saved_at: float = 0.0
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        strength = self.strength
+        data["strength"] = {"A": strength.A, "B": strength.B, "MAXA": strength.MAXA, "MAXB": strength.MAXB}
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "SessionSnapshot":
+        data = json.loads(text)
+        data["strength"] = Strength(**data["strength"])
+        data["waves"] = {channel: WaveState(**wave) for channel, wave in data["waves"].items()}
+        return cls(**data)
+
+
+class SnapshotStore:
+    """
+    SQLite 快照儲存，所有資料庫操作都在單一背景執行緒中執行
+
+    :param path: 資料庫檔案路徑
+
+    Example:
+
+    >>> store = SnapshotStore("sessions.db")
+    >>> await store.save([snapshot])
+    >>> snapshots = await store.load_all()
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="dglabv3-snapshot")
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, data TEXT NOT NULL, saved_at REAL NOT NULL)"
+            )
+        return self._connection
+
+    def _save(self, snapshots: List[SessionSnapshot]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO sessions (key, data, saved_at) VALUES (?, ?, ?)",
+                [(snapshot.key, snapshot.to_json(), snapshot.saved_at) for snapshot in snapshots],
+            )
+
+    def _delete(self, keys: List[str]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany("DELETE FROM sessions WHERE key = ?", [(key,) for key in keys])
+
+    def _load_all(self, max_age: Optional[float]) -> List[SessionSnapshot]:
+        query = "SELECT data FROM sessions"
+        params: tuple = ()
+        if max_age is not None:
+            query += " WHERE saved_at >= ?"
+            params = (time.time() - max_age,)
+        return [SessionSnapshot.from_json(row[0]) for row in self._connect().execute(query, params)]
+
+    async def _run(self, func: Any, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def save(self, snapshots: List[SessionSnapshot]) -> None:
+        """
+        在同一個交易中寫入快照
+
+        :param snapshots: 快照列表
+        """
+        if snapshots:
+            await self._run(self._save, snapshots)
+
+    async def delete(self, *keys: str) -> None:
+        """
+        刪除快照
+
+        :param keys: 連線鍵
+        """
+        if keys:
+            await self._run(self._delete, list(keys))
+
+    async def load_all(self, max_age: Optional[float] = None) -> List[SessionSnapshot]:
+        """
+        讀取所有快照
+
+        :param max_age: 只讀取這段時間(秒)內儲存的快照
+        :return: 快照列表
+        """
+        return await self._run(self._load_all, max_age)
+
+    def close(self) -> None:
+        """
+        關閉資料庫
+        """
+
+        def close() -> None:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        self._executor.submit(close).result()
+        self._executor.shutdown()
+
+
+class _WaveTap:
+    """
+    由發送的訊息記錄正在播放的波形，收到強度回報時標記需要儲存
+    """
+
+    def __init__(self, snapshotter: "SessionSnapshotter", key: str) -> None:
+        self.snapshotter = snapshotter
+        self.key = key
+        self.waves: Dict[str, WaveState] = {}
+
+    def on_inbound(self, data: Union[str, bytes]) -> None:
+        if isinstance(data, bytes):
+            data = data.decode(errors="ignore")
+        if "strength-" in data or '"bind"' in data:
+            self.snapshotter._dirty.add(self.key)
+
+    def on_outbound(self, text: str) -> None:
+        if MessageType.CLIENT_MSG in text:
+            try:
+                message = json.loads(text)
+                channel, hex_wave = message["message"].split(":", 1)
+                self.waves[channel] = WaveState(json.loads(hex_wave), int(message.get("time", 1)), time.time())
+            except (ValueError, KeyError, AttributeError):
+                return
+        elif "clear-1" in text:
+            self.waves.pop("A", None)
+        elif "clear-2" in text:
+            self.waves.pop("B", None)
+        else:
+            return
+        self.snapshotter._dirty.add(self.key)
+
+
+class SessionSnapshotter:
+    """
+    在背景定期將有變動的連線狀態寫入快照儲存
+
+    :param store: 快照儲存
+    :param interval: 寫入間隔(秒)
+
+    Example:
+
+    >>> snapshotter = SessionSnapshotter(SnapshotStore("sessions.db"))
+    >>> snapshotter.start()
+    >>> snapshotter.track(str(user.id), client)
+    """
+
+    def __init__(self, store: SnapshotStore, interval: float = 1.0) -> None:
+        self.store = store
+        self.interval = interval
+        self._sessions: Dict[str, "dglabv3"] = {}
+        self._taps: Dict[str, _WaveTap] = {}
+        self._dirty: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._forgotten: Set[str] = set()
+
+    def track(self, key: str, client: "dglabv3") -> None:
+        """
+        開始追蹤連線
+
+        :param key: 識別連線的鍵
+        :param client: dglabv3 客戶端
+        """
+        self.untrack(key, forget=False)
+        self._forgotten.discard(key)
+        tap = _WaveTap(self, key)
+        client.add_tap(tap)
+        self._sessions[key] = client
+        self._taps[key] = tap
+        self._dirty.add(key)
+
+    def untrack(self, key: str, forget: bool = True) -> None:
+        """
+        停止追蹤連線
+
+        :param key: 識別連線的鍵
+        :param forget: 是否在下次寫入時刪除已儲存的快照
+        """
+        client = self._sessions.pop(key, None)
+        tap = self._taps.pop(key, None)
+        if client is not None and tap is not None:
+            client.remove_tap(tap)
+        self._dirty.discard(key)
+        if forget:
+            self._forgotten.add(key)
+
+    def snapshot(self, key: str) -> SessionSnapshot:
+        """
+        建立連線目前的快照
+
+        :param key: 識別連線的鍵
+        :return: SessionSnapshot
+        """
+        client = self._sessions[key]
+        now = time.time()
+        waves = {channel: wave for channel, wave in self._taps[key].waves.items() if wave.remaining(now) > 0}
+        return SessionSnapshot(
+            key=key,
+            url=client.clienturl,
+            client_id=client.client_id,
+            target_id=client.target_id,
+            strength=client.strength.snapshot(),
+            waves=waves,
+            saved_at=now,
+        )
+
+    async def flush(self) -> None:
+        """
+        立即寫入所有有變動的連線，並刪除已停止追蹤的快照
+        """
+        forgotten, self._forgotten = self._forgotten, set()
+        try:
+            await self.store.delete(*forgotten)
+        except Exception as e:
+            logger.error("Failed to delete snapshots: %s", e)
+            self._forgotten |= forgotten
+        keys, self._dirty = self._dirty, set()
+        snapshots = [self.snapshot(key) for key in keys if key in self._sessions]
+        try:
+            await self.store.save(snapshots)
+        except Exception as e:
+            logger.error("Failed to save snapshots: %s", e)
+            self._dirty |= keys
+
+    def start(self) -> None:
+        """
+        啟動背景寫入任務
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._dirty or self._forgotten:
+                await self.flush()
+
+    async def close(self) -> None:
+        """
+        停止背景任務並寫入剩下的變動
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+async def _restore_one(snapshot: SessionSnapshot, timeout: float, client_kwargs: Dict[str, Any]) -> "dglabv3":
+    from dglabv3.dglab import dglabv3
+
+    client = dglabv3(url=snapshot.url, **client_kwargs)
+    # 綁定後會將強度同步回App
+    client.strength.set_strength(snapshot.strength)
+    try:
+        await client.connect_and_wait(int(timeout))
+        await client.resume(snapshot.client_id, snapshot.target_id, int(timeout))
+        now = time.time()
+        for channel, wave in snapshot.waves.items():
+            remaining = wave.remaining(now)
+            if remaining <= 0:
+                continue
+            await client._send_message(
+                {
+                    "type": MessageType.CLIENT_MSG,
+                    "channel": channel,
+                    "message": f"{channel}:{json.dumps(wave.rotated(now))}",
+                    "time": math.ceil(remaining),
+                }
+            )
+    except BaseException:
+        await client.close()
+        raise
+    return client
+
+
+async def restore_sessions(
+    store: SnapshotStore,
+    concurrency: int = 32,
+    max_age: Optional[float] = None,
+    timeout: float = 10,
+    **client_kwargs: Any,
+) -> Dict[str, "dglabv3"]:
+    """
+    以有限的並行數重新連接所有快照中的連線，並接回原本的App
+
+    無法恢復的快照會被刪除，需要重新掃描QR code
+
+    :param store: 快照儲存
+    :param concurrency: 同時恢復的連線數
+    :param max_age: 忽略超過這段時間(秒)的快照，應與中繼伺服器的 resume_grace 相同
+    :param timeout: 每個連線的超時時間(秒)
+    :param client_kwargs: 建立 dglabv3 的其他參數
+    :return: 連線鍵與已恢復的客戶端
+
+    Example:
+
+    >>> clients = await restore_sessions(SnapshotStore("sessions.db"), max_age=60)
+    """
+    snapshots = [s for s in await store.load_all(max_age) if s.client_id and s.target_id]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def restore(snapshot: SessionSnapshot) -> Optional["dglabv3"]:
+        async with semaphore:
+            try:
+                return await _restore_one(snapshot, timeout, client_kwargs)
+            except Exception as e:
+                logger.warning("Failed to restore session %s: %r", snapshot.key, e)
+                return None
+
+    results = await asyncio.gather(*(restore(snapshot) for snapshot in snapshots))
+    restored = {snapshot.key: client for snapshot, client in zip(snapshots, results) if client is not None}
+    await store.delete(*(snapshot.key for snapshot in snapshots if snapshot.key not in restored))
+    logger.info("Restored %s/%s sessions", len(restored), len(snapshots))
+    return restored
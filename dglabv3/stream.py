@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import wave
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Dict, List, Union
+
+import numpy as np
+
+from dglabv3.dtype import Channel, MessageType
+from dglabv3.music_to_wave import (
+    ANALYSIS_HOP,
+    MODES,
+    _spectrum,
+    _v3_frequency,
+    analysis_n_fft,
+    extract_features,
+)
+from dglabv3.scheduler import FRAME_SECONDS
+from dglabv3.tracer import LatencyHistogram
+
+if TYPE_CHECKING:
+    from dglabv3.dglab import dglabv3
+
+logger = logging.getLogger("dglabv3.stream")
+
+__all__ = ["AudioStream", "wav_source"]
+
+SAMPLE_FORMATS = {"s16le": np.dtype("<i2"), "s32le": np.dtype("<i4"), "f32le": np.dtype("<f4")}
+
+
+class _RunningNormalizer:
+    """
+    即時串流使用的正規化，以緩慢衰減的最小/最大值追蹤音量範圍
+
+    :param release: 每次更新時範圍向目前數值收斂的比例
+    """
+
+    def __init__(self, release: float = 0.01) -> None:
+        self.release = release
+        self._ranges: Dict[str, List[np.ndarray]] = {}
+
+    def __call__(self, name: str, values: np.ndarray) -> np.ndarray:
+        current_low = np.min(values, axis=-1, keepdims=True)
+        current_high = np.max(values, axis=-1, keepdims=True)
+        bounds = self._ranges.get(name)
+        if bounds is None:
+            bounds = self._ranges[name] = [current_low, current_high]
+        else:
+            low, high = bounds
+            span = (high - low) * self.release
+            bounds[0] = np.minimum(current_low, low + span)
+            bounds[1] = np.maximum(current_high, high - span)
+        low, high = bounds
+        return np.clip((values - low) / (high - low + 1e-10), 0, 1)
+
+
+class AudioStream:
+    """
+    即時音訊串流轉換，將原始PCM資料每 100ms 分析一次並持續發送到App
+
+    資料來源可以是任何非同步位元組來源(管線、socket)，也可以用 `write` 直接餵入，
+    App端累積的幀超過延遲預算時會丟棄新幀
+
+    :param client: dglabv3 客戶端
+    :param sample_rate: 取樣率
+    :param channels: 聲道數，多聲道會混合為單聲道
+    :param stereo: 左聲道給A通道、右聲道給B通道
+    :param sample_format: 取樣格式 s16le / s32le / f32le
+    :param mode: 特徵提取模式，參見 `convert_samples`
+    :param channel: 目標通道
+    :param max_latency: App端最多累積的播放時間(秒)
+    :param frames_per_send: 每次發送的幀數
+
+    Example:
+
+    >>> stream = AudioStream(client, 48000, channels=2, mode="onset")
+    >>> reader, _ = await asyncio.open_connection("127.0.0.1", 7000)
+    >>> await stream.run(reader)
+    """
+
+    def __init__(
+        self,
+        client: "dglabv3",
+        sample_rate: int = 44100,
+        channels: int = 1,
+        stereo: bool = False,
+        sample_format: str = "s16le",
+        mode: str = "onset",
+        channel: Channel = Channel.BOTH,
+        max_latency: float = 0.3,
+        frames_per_send: int = 1,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unknown sample format {sample_format!r}, expected one of {tuple(SAMPLE_FORMATS)}")
+        if stereo and mode == "bands":
+            raise ValueError("bands mode already splits channels and cannot be combined with stereo")
+        self.client = client
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.stereo = stereo
+        self.dtype = SAMPLE_FORMATS[sample_format]
+        self.mode = mode
+        self.channel = channel
+        self.max_latency = max_latency
+        self.frames_per_send = frames_per_send
+        self.hop_length = int(sample_rate * ANALYSIS_HOP)
+        self.n_fft = analysis_n_fft(sample_rate)
+        self.chunk_samples = self.hop_length * 4
+        self.latency = LatencyHistogram()
+        self.frames = 0
+        self.dropped = 0
+        self._scale = 1 / np.iinfo(self.dtype).max if self.dtype.kind == "i" else 1.0
+        self._normalize = _RunningNormalizer()
+        self._remainder = b""
+        # 保留一幀額外的歷史，讓 onset 模式可以和前一幀比較
+        shape = (2,) if stereo else ()
+        self._history = np.zeros((*shape, self.n_fft), dtype=np.float32)
+        self._pending = np.zeros((*shape, 0), dtype=np.float32)
+        self._outbox: Dict[Channel, List[List[List[int]]]] = {Channel.A: [], Channel.B: []}
+        self._arrivals: List[float] = []
+        self._device_until: Dict[Channel, float] = {Channel.A: 0.0, Channel.B: 0.0}
+
+    def _decode(self, data: bytes) -> np.ndarray:
+        data = self._remainder + data
+        frame_size = self.dtype.itemsize * self.channels
+        usable = len(data) - len(data) % frame_size
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype).astype(np.float32) * self._scale
+        samples = samples.reshape(-1, self.channels)
+        if self.stereo:
+            # 單聲道來源左右相同
+            return samples[:, [0, min(1, self.channels - 1)]].T
+        return samples.mean(axis=1)
+
+    def _analyze(self, chunk: np.ndarray) -> List[List[List[int]]]:
+        """
+        分析 100ms 的取樣
+
+        :return: 每個通道一幀，bands 模式A、B不同
+        """
+        window = np.concatenate([self._history, chunk], axis=-1)
+        self._history = window[..., -self.n_fft :]
+        magnitude, rms = _spectrum(window, self.n_fft, self.hop_length, center=False)
+        tracks = extract_features(magnitude, rms, self.sample_rate, self.n_fft, self.mode, self._normalize)
+        if self.stereo:
+            ((period, intensity),) = tracks
+            tracks = [(period[0], intensity[0]), (period[1], intensity[1])]
+        frames = []
+        for period, intensity in tracks:
+            freq = _v3_frequency(np.clip(period[-4:], 10, 1000))
+            strength = np.clip(intensity[-4:].astype(np.int64), 0, 100)
+            frames.append([freq.tolist(), strength.tolist()])
+        return frames
+
+    async def write(self, data: bytes) -> None:
+        """
+        餵入PCM資料，每累積 100ms 就分析並發送
+
+        :param data: 原始PCM位元組
+        """
+        samples = self._decode(data)
+        if not samples.shape[-1]:
+            return
+        pending = np.concatenate([self._pending, samples], axis=-1) if self._pending.shape[-1] else samples
+        loop = asyncio.get_running_loop()
+        offset = 0
+        while pending.shape[-1] - offset >= self.chunk_samples:
+            frames = self._analyze(pending[..., offset : offset + self.chunk_samples])
+            offset += self.chunk_samples
+            self._arrivals.append(loop.time())
+            self._outbox[Channel.A].append(frames[0])
+            self._outbox[Channel.B].append(frames[-1])
+            if len(self._arrivals) >= self.frames_per_send:
+                await self._flush()
+        self._pending = pending[..., offset:]
+
+    async def _flush(self) -> None:
+        arrivals, self._arrivals = self._arrivals, []
+        outbox, self._outbox = self._outbox, {Channel.A: [], Channel.B: []}
+        if not arrivals:
+            return
+        self.frames += len(arrivals)
+        if not self.client.is_connected() or self.client.target_id is None:
+            self.dropped += len(arrivals)
+            return
+        now = asyncio.get_running_loop().time()
+        channels = [Channel.A, Channel.B] if self.channel == Channel.BOTH else [self.channel]
+        buffered = max(self._device_until[ch] for ch in channels) - now
+        if buffered > self.max_latency:
+            self.dropped += len(arrivals)
+            logger.debug("Dropping %s frames, %.3fs already buffered", len(arrivals), buffered)
+            return
+        for ch in channels:
+            frames = outbox[ch]
+            self._device_until[ch] = max(self._device_until[ch], now) + len(frames) * FRAME_SECONDS
+            await self.client._send_message(
+                {
+                    "type": MessageType.CLIENT_MSG,
+                    "channel": ch.name,
+                    "message": f"{ch.name}:{json.dumps(self.client._wave2hex(frames))}",
+                    "time": 1,
+                }
+            )
+        # 由取樣到齊到App開始播放該幀的預估延遲，不含網路
+        sent = asyncio.get_running_loop().time()
+        for index, arrival in enumerate(arrivals):
+            self.latency.record((sent - arrival + max(0.0, buffered) + index * FRAME_SECONDS) * 1000)
+
+    async def run(self, source: Union[AsyncIterable[bytes], asyncio.StreamReader], chunk_size: int = 4096) -> None:
+        """
+        持續讀取資料來源直到結束
+
+        :param source: 非同步位元組來源或 asyncio.StreamReader
+        :param chunk_size: 從 StreamReader 每次讀取的位元組數
+        """
+        iterator = _read_stream(source, chunk_size) if isinstance(source, asyncio.StreamReader) else source
+        async for data in iterator:
+            await self.write(data)
+        await self._flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        串流統計
+
+        :return: 已處理幀數、丟棄幀數與延遲統計
+        """
+        return {"frames": self.frames, "dropped": self.dropped, "latency": self.latency.to_dict()}
+
+
+async def _read_stream(reader: asyncio.StreamReader, chunk_size: int) -> AsyncIterator[bytes]:
+    while data := await reader.read(chunk_size):
+        yield data
+
+
+async def wav_source(path: str, speed: float = 1.0, chunk_seconds: float = 0.02) -> AsyncIterator[bytes]:
+    """
+    以即時速度讀取WAV檔案的PCM資料，用於測試串流
+
+    :param path: WAV檔案路徑，需為 16 位元 PCM
+    :param speed: 播放速度倍率，0 表示不等待
+    :param chunk_seconds: 每次讀取的時間長度(秒)
+
+    Example:
+
+    >>> await stream.run(wav_source("music.wav"))
+    """
+    with wave.open(path, "rb") as file:
+        if file.getsampwidth() != 2:
+            raise ValueError("only 16-bit PCM WAV files are supported")
+        frames_per_chunk = max(1, int(file.getframerate() * chunk_seconds))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        position = 0
+        while data := file.readframes(frames_per_chunk):
+            position += len(data) // (2 * file.getnchannels())
+            if speed > 0:
+                delay = start + position / file.getframerate() / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield data
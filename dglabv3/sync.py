@@ -0,0 +1,225 @@
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import io
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Tuple, Union
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel, StrengthType
+
+logger = logging.getLogger("dglabv3.sync")
+
+__all__ = ["SyncDGLab"]
+
+_Command = Tuple[Any, Callable[..., Coroutine], tuple, dict, concurrent.futures.Future]
+
+
+class _LoopThread:
+    """
+    所有 SyncDGLab 共用的背景事件迴圈執行緒
+
+    跨執行緒提交的指令先放入佇列，每批只喚醒事件迴圈一次，
+    同一個擁有者的指令依提交順序執行，新的一批會等同一擁有者上一批完成後才開始
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._lock = threading.Lock()
+        self._pending: Deque[_Command] = deque()
+        self._scheduled = False
+        self._tails: Dict[int, asyncio.Task] = {}
+        self._thread = threading.Thread(target=self._run, name="dglabv3-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(
+        self, owner: Any, func: Callable[..., Coroutine], *args: Any, **kwargs: Any
+    ) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._pending.append((owner, func, args, kwargs, future))
+            wake = not self._scheduled
+            self._scheduled = True
+        if wake:
+            self.loop.call_soon_threadsafe(self._drain)
+        return future
+
+    def _drain(self) -> None:
+        with self._lock:
+            commands = list(self._pending)
+            self._pending.clear()
+            self._scheduled = False
+        groups: Dict[int, List[_Command]] = {}
+        for command in commands:
+            groups.setdefault(id(command[0]), []).append(command)
+        for key, group in groups.items():
+            task = self.loop.create_task(self._run_group(group, self._tails.get(key)))
+            self._tails[key] = task
+            task.add_done_callback(functools.partial(self._release, key))
+
+    def _release(self, key: int, task: asyncio.Task) -> None:
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    @staticmethod
+    async def _run_group(commands: List[_Command], previous: Optional[asyncio.Task] = None) -> None:
+        if previous is not None:
+            await asyncio.wait((previous,))
+        for _, func, args, kwargs, future in commands:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(await func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+                if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                    raise
+
+    def stop(self) -> None:
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+
+_loop_thread: Optional[_LoopThread] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop_thread() -> _LoopThread:
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None:
+            _loop_thread = _LoopThread()
+            atexit.register(_loop_thread.stop)
+        return _loop_thread
+
+
+class SyncDGLab:
+    """
+    dglabv3 的同步介面，可在任意執行緒中呼叫
+
+    所有實例共用一個背景事件迴圈執行緒，
+    指令方法預設等待完成，`wait=False` 時返回 concurrent.futures.Future
+
+    :param timeout: 等待指令完成的預設超時時間(秒)
+
+    Example:
+
+    >>> client = SyncDGLab()
+    >>> client.connect_and_wait()
+    >>> print(client.generate_qrcode_text())
+    >>> client.wait_for_app_connect()
+    >>> client.set_strength_value(Channel.A, 20)
+    """
+
+    def __init__(self, timeout: Optional[float] = 60, **kwargs: Any) -> None:
+        self.timeout = timeout
+        self._runner = _get_loop_thread()
+        self.client = dglabv3(**kwargs)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._runner.loop
+
+    def _call(
+        self, func: Callable[..., Coroutine], *args: Any, wait: bool = True
+    ) -> Union[Any, concurrent.futures.Future]:
+        future = self._runner.submit(self, func, *args)
+        if not wait:
+            return future
+        return future.result(self.timeout)
+
+    def submit(self, coro_func: Callable[..., Coroutine], *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+        """
+        在背景事件迴圈執行任意協程函式
+
+        :param coro_func: 協程函式
+        :return: concurrent.futures.Future
+        """
+        return self._runner.submit(self, coro_func, *args, **kwargs)
+
+    def on(self, event_name: str, callback: Callable) -> None:
+        """
+        註冊事件，回呼會在背景事件迴圈執行緒中執行
+
+        :param event_name: 事件名稱，例如 strength / button
+        :param callback: 回呼函式
+        """
+        self.loop.call_soon_threadsafe(self.client.register_event, event_name, callback)
+
+    def connect_and_wait(self, timeout: int = 30) -> None:
+        """
+        連接WebSocket並等待綁定完成
+
+        等待期間會佔用這個實例的指令佇列，之後提交的指令最多等待 timeout 秒才執行
+
+        :param timeout: 超時時間(秒)
+        """
+        self._runner.submit(self, self.client.connect_and_wait, timeout).result()
+
+    def wait_for_app_connect(self, timeout: int = 30) -> None:
+        """
+        等待App連接，不佔用指令佇列，等待期間其他執行緒仍可發送指令
+
+        :param timeout: 超時時間(秒)
+        """
+        asyncio.run_coroutine_threadsafe(self.client.wait_for_app_connect(timeout), self.loop).result()
+
+    def close(self, wait: bool = True):
+        return self._call(self.client.close, wait=wait)
+
+    def is_connected(self) -> bool:
+        return self.client.is_connected()
+
+    def is_linked_to_app(self) -> bool:
+        return self.client.is_linked_to_app()
+
+    def generate_qrcode(self) -> Optional[io.BytesIO]:
+        return self._call(self.client.get_qrcode)
+
+    def generate_qrcode_text(self) -> Optional[str]:
+        return self._call(self.client.get_qrcode_text)
+
+    def send_wave_message(
+        self,
+        wave: list,
+        time: Optional[int] = 10,
+        channel: Channel = Channel.BOTH,
+        compact: bool = False,
+        wait: bool = True,
+    ) -> Union[None, concurrent.futures.Future]:
+        return self._call(self.client.send_wave_message, wave, time, channel, compact, wait=wait)
+
+    def clear_wave(self, channel: Channel, wait: bool = True):
+        return self._call(self.client.clear_wave, channel, wait=wait)
+
+    def clear_all_wave(self, wait: bool = True):
+        return self._call(self.client.clear_all_wave, wait=wait)
+
+    def set_strength(self, channel: Channel, type_id: StrengthType, strength: int, wait: bool = True):
+        return self._call(self.client.set_strength, channel, type_id, strength, wait=wait)
+
+    def set_strength_value(self, channel: Channel, strength: int, wait: bool = True):
+        return self._call(self.client.set_strength_value, channel, strength, wait=wait)
+
+    def add_strength_value(self, channel: Channel, strength: int, wait: bool = True):
+        return self._call(self.client.add_strength_value, channel, strength, wait=wait)
+
+    def decrease_strength_value(self, channel: Channel, strength: int, wait: bool = True):
+        return self._call(self.client.decrease_strength_value, channel, strength, wait=wait)
+
+    def reset_strength_value(self, channel: Channel, wait: bool = True):
+        return self._call(self.client.reset_strength_value, channel, wait=wait)
+
+    def get_strength_value(self, channel: Channel) -> int:
+        return self.client.get_strength_value(channel)
+
+    def get_max_strength_value(self, channel: Channel) -> int:
+        return self.client.get_max_strength_value(channel)
@@ -0,0 +1,295 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from dglabv3.dglab import dglabv3
+
+logger = logging.getLogger("dglabv3.tracer")
+
+__all__ = ["LatencyHistogram", "LatencyTracer", "ProfileHooks"]
+
+# 毫秒
+DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """
+    固定區間的延遲直方圖
+
+    :param buckets: 區間上限(毫秒)
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, ms: float) -> None:
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """
+        估計百分位數，返回所在區間的上限
+
+        :param p: 百分位 0-100
+        :return: 延遲(毫秒)
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else float(self.max or 0)
+        return float(self.max or 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([*map(str, self.buckets), "inf"], self.counts)),
+        }
+
+
+class _SessionTap:
+    def __init__(self, tracer: "LatencyTracer") -> None:
+        self.tracer = tracer
+        self.histogram = LatencyHistogram(tracer.buckets)
+        self.pending: Dict[int, Deque[Tuple[int, float]]] = defaultdict(deque)
+
+    def on_outbound(self, text: str) -> None:
+        if not self.tracer.enabled or "strength-" not in text:
+            return
+        try:
+            message = json.loads(text).get("message", "")
+            channel, mode, value = message[9:].split("+") if message.startswith("strength-") else ("", "", "")
+            if mode != "2":
+                return
+            channel, value = int(channel), int(value)
+        except (ValueError, AttributeError):
+            return
+        pending = self.pending[channel]
+        pending.append((value, time.perf_counter()))
+        while len(pending) > self.tracer.max_pending:
+            pending.popleft()
+
+    def on_inbound(self, data: Union[str, bytes]) -> None:
+        if not self.tracer.enabled or not any(self.pending.values()):
+            return
+        try:
+            message = json.loads(data).get("message", "")
+            if not isinstance(message, str) or not message.startswith("strength-"):
+                return
+            values = message[9:].split("+")
+            reports = ((1, int(values[0])), (2, int(values[1])))
+        except (ValueError, AttributeError, IndexError):
+            return
+        now = time.perf_counter()
+        for channel, reported in reports:
+            pending = self.pending.get(channel)
+            if not pending:
+                continue
+            # 與回報值相符的最早指令視為完成，更早的指令已被覆蓋
+            for index, (value, sent) in enumerate(pending):
+                if value == reported:
+                    self.histogram.record((now - sent) * 1000)
+                    for _ in range(index + 1):
+                        pending.popleft()
+                    break
+
+
+class LatencyTracer:
+    """
+    追蹤強度指令到App回報強度的往返延遲，每個 session 一個直方圖
+
+    :param buckets: 直方圖區間(毫秒)
+    :param max_pending: 每個通道最多等待配對的指令數
+
+    Example:
+
+    >>> tracer = LatencyTracer()
+    >>> tracer.attach(client)
+    >>> await client.set_strength_value(Channel.A, 20)
+    >>> print(tracer.histogram(client).to_dict())
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_pending: int = 64) -> None:
+        self.buckets = buckets
+        self.max_pending = max_pending
+        self.enabled = True
+        self._taps: Dict[int, Tuple["dglabv3", _SessionTap]] = {}
+
+    def attach(self, client: "dglabv3") -> None:
+        """
+        開始追蹤客戶端
+
+        :param client: dglabv3 客戶端
+        """
+        if id(client) in self._taps:
+            return
+        tap = _SessionTap(self)
+        client.add_tap(tap)
+        self._taps[id(client)] = (client, tap)
+
+    def detach(self, client: "dglabv3") -> None:
+        """
+        停止追蹤客戶端
+
+        :param client: dglabv3 客戶端
+        """
+        entry = self._taps.pop(id(client), None)
+        if entry is not None:
+            client.remove_tap(entry[1])
+
+    def histogram(self, client: "dglabv3") -> LatencyHistogram:
+        """
+        取得客戶端的延遲直方圖
+
+        :param client: dglabv3 客戶端
+        :return: LatencyHistogram
+        """
+        return self._taps[id(client)][1].histogram
+
+    def summary(self) -> Dict[Optional[str], Dict[str, Any]]:
+        """
+        所有 session 的延遲統計，以 client ID 為鍵
+
+        :return: 統計字典
+        """
+        return {client.client_id: tap.histogram.to_dict() for client, tap in self._taps.values()}
+
+
+class ProfileHooks:
+    """
+    在 `_handle_message` / `_send_message` / 波形編碼前後呼叫的分析掛鉤
+
+    預設累計各階段耗時，也可以傳入 cProfile 或 yappi 的開始/停止函式；
+    階段會互相巢狀(例如 `_handle_message` 內的 `_send_message`)，
+    on_enter / on_exit 只在每個任務最外層的階段進入與離開時呼叫
+
+    :param on_enter: 進入時呼叫，參數為階段名稱
+    :param on_exit: 離開時呼叫，參數為階段名稱
+
+    Example:
+
+    >>> profiler = cProfile.Profile()
+    >>> hooks = ProfileHooks(lambda name: profiler.enable(), lambda name: profiler.disable())
+    >>> hooks.install(client)
+    """
+
+    TARGETS = ("_handle_message", "_send_message", "_build_wave_messages")
+
+    def __init__(
+        self,
+        on_enter: Optional[Callable[[str], None]] = None,
+        on_exit: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.enabled = True
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self._installed: List["dglabv3"] = []
+        # 每個任務各自計算巢狀深度，並行的任務與客戶端互不影響
+        self._depth: ContextVar[int] = ContextVar(f"dglabv3_profile_depth_{id(self)}", default=0)
+
+    def _enter(self, name: str) -> float:
+        depth = self._depth.get() + 1
+        self._depth.set(depth)
+        if depth == 1 and self.on_enter is not None:
+            self.on_enter(name)
+        return time.perf_counter()
+
+    def _exit(self, name: str, start: float) -> None:
+        self.calls[name] += 1
+        self.seconds[name] += time.perf_counter() - start
+        depth = self._depth.get() - 1
+        self._depth.set(depth)
+        if depth == 0 and self.on_exit is not None:
+            self.on_exit(name)
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                start = self._enter(name)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._exit(name, start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = self._enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(name, start)
+
+        return wrapper
+
+    def install(self, client: "dglabv3") -> None:
+        """
+        在客戶端安裝掛鉤，不需重新啟動
+
+        :param client: dglabv3 客戶端
+        """
+        if client in self._installed:
+            return
+        for name in self.TARGETS:
+            setattr(client, name, self._wrap(name, getattr(client, name)))
+        self._installed.append(client)
+
+    def uninstall(self, client: "dglabv3") -> None:
+        """
+        移除客戶端上的掛鉤
+
+        :param client: dglabv3 客戶端
+        """
+        if client not in self._installed:
+            return
+        for name in self.TARGETS:
+            client.__dict__.pop(name, None)
+        self._installed.remove(client)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        各階段的呼叫次數與平均耗時
+
+        :return: 統計字典
+        """
+        return {
+            name: {"calls": calls, "seconds": self.seconds[name], "mean": self.seconds[name] / calls}
+            for name, calls in self.calls.items()
+        }
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import logging
+import ssl
+from abc import ABC, abstractmethod
+from itertools import count
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+import websockets
+from websockets.asyncio.client import connect as ws_connect
+
+logger = logging.getLogger("dglabv3.transport")
+
+__all__ = [
+    "Transport",
+    "WebSocketTransport",
+    "MultiplexTransport",
+    "default_transport",
+    "set_default_transport",
+    "shared_ssl_context",
+]
+
+_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def shared_ssl_context() -> ssl.SSLContext:
+    """
+    行程共用的TLS設定，避免每個連線重新載入CA憑證
+
+    :return: ssl.SSLContext
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+class Transport(ABC):
+    """
+    dglabv3 使用的傳輸層介面
+
+    實作需提供 `connect` / `send` / `close`，並可用 `async for` 取得收到的訊息
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+    @abstractmethod
+    async def connect(self) -> None: ...
+
+    @abstractmethod
+    async def send(self, text: str) -> None: ...
+
+    @abstractmethod
+    async def close(self) -> None: ...
+
+    async def send_many(self, texts: List[str]) -> None:
+        """
+        依序寫出多則訊息，預設逐則呼叫 send，等待寫入時其他協程的訊息仍可能插入其間，
+        子類別可覆寫為一次寫出
+        """
+        for text in texts:
+            await self.send(text)
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[Union[str, bytes]]: ...
+
+
+class WebSocketTransport(Transport):
+    """
+    預設傳輸層，每個客戶端一條WebSocket連線
+
+    :param url: 中繼伺服器網址
+    :param compression: "deflate" 或 None 停用壓縮
+    :param ping_interval: ping間隔(秒)，None 停用
+    :param ping_timeout: ping超時(秒)
+    :param max_size: 單一訊息最大位元組數
+    :param max_queue: 讀取緩衝的訊息數上限，滿了之後暫停從socket讀取
+    :param write_limit: 寫入緩衝上限(位元組)
+    :param open_timeout: 連線超時(秒)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        compression: Optional[str] = "deflate",
+        ping_interval: Optional[float] = 20,
+        ping_timeout: Optional[float] = 20,
+        max_size: Optional[int] = 2**20,
+        max_queue: Optional[int] = 16,
+        write_limit: int = 2**15,
+        open_timeout: Optional[float] = 10,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(url)
+        self.options: Dict[str, Any] = {
+            "compression": compression,
+            "ping_interval": ping_interval,
+            "ping_timeout": ping_timeout,
+            "max_size": max_size,
+            "max_queue": max_queue,
+            "write_limit": write_limit,
+            "open_timeout": open_timeout,
+            **kwargs,
+        }
+        if url.startswith("wss://"):
+            self.options.setdefault("ssl", shared_ssl_context())
+        self._ws: Any = None
+
+    async def connect(self) -> None:
+        self._ws = await ws_connect(self.url, **self.options)
+
+    async def send(self, text: str) -> None:
+        if self._ws is None:
+            raise ConnectionError("WebSocket not connected")
+        await self._ws.send(text)
+
+    async def send_many(self, texts: List[str]) -> None:
+        """
+        將多則訊息寫入同一個寫入緩衝，最後只排空一次，其他協程的訊息不會插入其間
+        """
+        if self._ws is None:
+            raise ConnectionError("WebSocket not connected")
+        ws = self._ws
+        # 與 send() 相同，等待進行中的分段訊息送完
+        while ws.send_in_progress is not None:
+            await asyncio.shield(ws.send_in_progress)
+        async with ws.send_context():
+            for text in texts:
+                ws.protocol.send_text(text.encode())
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+
+    def __aiter__(self) -> AsyncIterator[Union[str, bytes]]:
+        if self._ws is None:
+            raise ConnectionError("WebSocket not connected")
+        return self._ws.__aiter__()
+
+
+_default_factory: Callable[[str], Transport] = WebSocketTransport
+
+
+def set_default_transport(factory: Optional[Callable[[str], Transport]]) -> None:
+    """
+    設定沒有指定 transport_factory 的客戶端所使用的傳輸層
+
+    :param factory: 以網址建立傳輸層的函式，None 恢復為 WebSocketTransport
+
+    Example:
+
+    >>> set_default_transport(functools.partial(WebSocketTransport, compression=None))
+    """
+    global _default_factory
+    _default_factory = factory or WebSocketTransport
+
+
+def default_transport(url: str) -> Transport:
+    """
+    以目前的預設傳輸層建立連線
+
+    :param url: 中繼伺服器網址
+    :return: Transport
+    """
+    return _default_factory(url)
+
+
+class _MuxConnection:
+    """
+    多個虛擬連線共用的WebSocket
+
+    每個訊息包在 `{"mux": id, "data": ...}` 中，
+    `{"mux": id, "open": true}` / `{"mux": id, "close": true}` 開啟或關閉虛擬連線
+    """
+
+    def __init__(self, url: str, options: Dict[str, Any]) -> None:
+        self.url = url
+        self.options = options
+        self.channels: Dict[int, "MultiplexTransport"] = {}
+        self._ids = count(1)
+        self._ws: Any = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self, transport: "MultiplexTransport") -> int:
+        async with self._lock:
+            if self._ws is None:
+                self._ws = await ws_connect(self.url, **self.options)
+                self._reader = asyncio.create_task(self._read())
+                # 最後一個虛擬連線關閉後會從共用表移除，重新連線時再登記回去
+                _mux_connections.setdefault((self.url, id(asyncio.get_running_loop())), self)
+            channel_id = next(self._ids)
+            self.channels[channel_id] = transport
+            ws = self._ws
+        await ws.send(json.dumps({"mux": channel_id, "open": True}))
+        return channel_id
+
+    async def send(self, channel_id: int, text: str) -> None:
+        if self._ws is None:
+            raise ConnectionError("WebSocket not connected")
+        await self._ws.send(json.dumps({"mux": channel_id, "data": text}))
+
+    async def release(self, channel_id: int) -> None:
+        async with self._lock:
+            self.channels.pop(channel_id, None)
+            if self._ws is None:
+                return
+            try:
+                await self._ws.send(json.dumps({"mux": channel_id, "close": True}))
+            except websockets.ConnectionClosed:
+                pass
+            if not self.channels:
+                await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        ws, self._ws = self._ws, None
+        if self._reader is not None and self._reader is not asyncio.current_task():
+            self._reader.cancel()
+        self._reader = None
+        if ws is not None:
+            await ws.close()
+        self._forget()
+
+    def _forget(self) -> None:
+        key = (self.url, id(asyncio.get_running_loop()))
+        if _mux_connections.get(key) is self:
+            del _mux_connections[key]
+
+    async def _read(self) -> None:
+        try:
+            async for raw in self._ws:
+                envelope = json.loads(raw)
+                transport = self.channels.get(envelope.get("mux"))
+                if transport is None:
+                    continue
+                if envelope.get("close"):
+                    transport._feed(None)
+                elif "data" in envelope:
+                    transport._feed(envelope["data"])
+        except websockets.ConnectionClosed:
+            logger.debug("Multiplexed WebSocket closed")
+        except Exception as e:
+            logger.error("Multiplexed WebSocket error: %s", e)
+        finally:
+            for transport in self.channels.values():
+                transport._feed(None)
+            self.channels.clear()
+            self._ws = None
+            self._forget()
+
+
+_mux_connections: Dict[tuple, _MuxConnection] = {}
+
+
+class MultiplexTransport(Transport):
+    """
+    多個客戶端共用一條WebSocket的傳輸層，需要支援多工的自架中繼伺服器
+
+    :param url: 中繼伺服器的多工端點，例如 ws://relay:9999/mux
+    :param options: 傳給 websockets connect 的參數
+
+    Example:
+
+    >>> client = dglabv3(transport_factory=lambda url: MultiplexTransport("ws://relay:9999/mux"))
+    """
+
+    def __init__(self, url: str, **options: Any) -> None:
+        super().__init__(url)
+        self.options = options
+        if url.startswith("wss://"):
+            self.options.setdefault("ssl", shared_ssl_context())
+        self._queue: "asyncio.Queue[Optional[Union[str, bytes]]]" = asyncio.Queue()
+        self._conn: Optional[_MuxConnection] = None
+        self._channel_id: Optional[int] = None
+
+    def _feed(self, data: Optional[Union[str, bytes]]) -> None:
+        self._queue.put_nowait(data)
+
+    async def connect(self) -> None:
+        key = (self.url, id(asyncio.get_running_loop()))
+        conn = _mux_connections.get(key)
+        if conn is None:
+            conn = _mux_connections[key] = _MuxConnection(self.url, self.options)
+        self._conn = conn
+        self._channel_id = await conn.open(self)
+
+    async def send(self, text: str) -> None:
+        if self._conn is None or self._channel_id is None:
+            raise ConnectionError("Transport not connected")
+        await self._conn.send(self._channel_id, text)
+
+    async def close(self) -> None:
+        if self._conn is not None and self._channel_id is not None:
+            conn, channel_id = self._conn, self._channel_id
+            self._conn = self._channel_id = None
+            await conn.release(channel_id)
+        self._feed(None)
+
+    def __aiter__(self) -> AsyncIterator[Union[str, bytes]]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[Union[str, bytes]]:
+        while True:
+            data = await self._queue.get()
+            if data is None:
+                return
+            yield data
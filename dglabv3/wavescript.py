@@ -0,0 +1,493 @@
+import ast
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from dglabv3.dtype import Channel
+from dglabv3.scheduler import FRAME_SECONDS
+
+logger = logging.getLogger("dglabv3.wavescript")
+
+__all__ = ["WaveCompiler", "WaveProgram", "WaveScriptError", "compile_wave", "get_default_compiler"]
+
+# 每幀 4 個 25ms 的取樣
+SAMPLES_PER_FRAME = 4
+SAMPLE_SECONDS = FRAME_SECONDS / SAMPLES_PER_FRAME
+MAX_SOURCE_LENGTH = 8192
+MAX_EXPRESSION_NODES = 64
+MAX_DEPTH = 16
+MIN_FREQUENCY, MAX_FREQUENCY = 10, 240
+MAX_INTENSITY = 100
+
+_TOKEN = re.compile(
+    r"""
+    (?P<space>[ \t\r]+|\#[^\n]*)
+  | (?P<sep>[;\n])
+  | (?P<track>(?:AB|A|B):)
+  | (?P<open>\[)
+  | (?P<close>\](?:[ \t]*[x*][ \t]*(?P<count>\d+))?)
+  | (?P<rest>rest\b)
+  | (?P<duration>\d+(?:\.\d+)?(?:ms|s)\b)
+  | (?P<param>(?P<key>[fi])=(?P<expr>[^\s;\]]+))
+    """,
+    re.VERBOSE,
+)
+_RANGE = re.compile(r"(-?\d+(?:\.\d+)?)\.\.(-?\d+(?:\.\d+)?)")
+
+Env = Dict[str, np.ndarray]
+Expression = Callable[[Env], Union[np.ndarray, np.float64]]
+
+
+class WaveScriptError(ValueError):
+    """
+    波形腳本語法或內容錯誤
+
+    :param message: 錯誤訊息
+    :param source: 腳本原始碼
+    :param offset: 錯誤位置
+    """
+
+    def __init__(self, message: str, source: str = "", offset: Optional[int] = None) -> None:
+        if offset is not None:
+            line = source.count("\n", 0, offset) + 1
+            column = offset - (source.rfind("\n", 0, offset) + 1) + 1
+            message = f"{message} (line {line}, column {column})"
+        super().__init__(message)
+
+
+def _tri(x: np.ndarray) -> np.ndarray:
+    return 1 - np.abs(2 * np.mod(x, 1) - 1)
+
+
+def _square(x: np.ndarray) -> np.ndarray:
+    return (np.mod(x, 1) < 0.5).astype(np.float64)
+
+
+# 函式名稱: (實作, 參數數量)
+FUNCTIONS: Dict[str, Tuple[Callable, int]] = {
+    "sin": (np.sin, 1),
+    "cos": (np.cos, 1),
+    "abs": (np.abs, 1),
+    "sqrt": (np.sqrt, 1),
+    "exp": (np.exp, 1),
+    "floor": (np.floor, 1),
+    "min": (np.minimum, 2),
+    "max": (np.maximum, 2),
+    "clip": (np.clip, 3),
+    "tri": (_tri, 1),
+    "saw": (lambda x: np.mod(x, 1), 1),
+    "square": (_square, 1),
+}
+CONSTANTS = {"pi": np.float64(np.pi), "e": np.float64(np.e)}
+# t: 片段開始後的秒數，p: 片段進度 0-1，d: 片段長度(秒)
+VARIABLES = ("t", "p", "d")
+_BINARY = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+    ast.Pow: np.power,
+}
+_UNARY = {ast.USub: np.negative, ast.UAdd: np.positive}
+
+
+def _build(node: ast.AST, text: str) -> Expression:
+    """
+    將白名單內的語法樹轉為向量化的閉包
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        # 常數一律轉為 float64，避免 Python 整數的大數運算
+        value = np.float64(node.value)
+        return lambda env: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return lambda env: value
+        if name in VARIABLES:
+            return lambda env: env[name]
+        raise ValueError(f"unknown name {name!r} in {text!r}")
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        op, left, right = _BINARY[type(node.op)], _build(node.left, text), _build(node.right, text)
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        op, operand = _UNARY[type(node.op)], _build(node.operand, text)
+        return lambda env: op(operand(env))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        if node.func.id not in FUNCTIONS:
+            raise ValueError(f"unknown function {node.func.id!r} in {text!r}")
+        func, arity = FUNCTIONS[node.func.id]
+        if len(node.args) != arity:
+            raise ValueError(f"{node.func.id}() takes {arity} argument(s) in {text!r}")
+        args = [_build(arg, text) for arg in node.args]
+        return lambda env: func(*[arg(env) for arg in args])
+    raise ValueError(f"unsupported syntax in {text!r}")
+
+
+@lru_cache(maxsize=4096)
+def _compile_expression(text: str) -> Expression:
+    """
+    編譯數值、範圍 `a..b` 或運算式，相同的運算式只編譯一次
+
+    :raises ValueError: 當運算式不合法
+    """
+    match = _RANGE.fullmatch(text)
+    if match:
+        start, end = np.float64(match.group(1)), np.float64(match.group(2))
+        return lambda env: start + (end - start) * env["p"]
+    try:
+        value = np.float64(float(text))
+        return lambda env: value
+    except ValueError:
+        pass
+    try:
+        tree = ast.parse(text, mode="eval")
+    except (SyntaxError, RecursionError, MemoryError):
+        raise ValueError(f"invalid expression {text!r}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+        raise ValueError(f"expression {text!r} is too long")
+    return _build(tree.body, text)
+
+
+@dataclass(slots=True)
+class _Segment:
+    samples: int
+    frequency: Optional[Expression]
+    intensity: Optional[Expression]
+
+
+@dataclass(slots=True)
+class _Group:
+    items: List[Union["_Segment", "_Group"]]
+    count: int
+    samples: int = 0
+
+
+_Item = Union[_Segment, _Group]
+
+
+class _Parser:
+    """
+    將單一通道的語句解析為片段樹，省略的 f / i 在解析時就沿用前一個片段的運算式，
+    因此重複區塊的每次重複內容完全相同
+    """
+
+    def __init__(self, source: str, tokens: List[re.Match]) -> None:
+        self.source = source
+        self.tokens = tokens
+        self.index = 0
+        self.depth = 0
+        self.frequency: Expression = _compile_expression(str(MIN_FREQUENCY))
+        self.intensity: Expression = _compile_expression("0")
+
+    def error(self, message: str, token: Optional[re.Match] = None) -> WaveScriptError:
+        offset = token.start() if token is not None else len(self.source)
+        return WaveScriptError(message, self.source, offset)
+
+    def peek(self) -> Optional[re.Match]:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def parse(self, closing: bool = False) -> List[_Item]:
+        items: List[_Item] = []
+        while (token := self.peek()) is not None:
+            kind = token.lastgroup
+            if kind == "close":
+                if not closing:
+                    raise self.error("unmatched ']'", token)
+                return items
+            self.index += 1
+            if kind in ("sep", "track"):
+                continue
+            if kind == "open":
+                items.append(self.parse_group(token))
+            elif kind == "rest":
+                items.append(_Segment(self.duration(token), None, None))
+            elif kind == "duration":
+                self.index -= 1
+                items.append(self.parse_segment())
+            else:
+                raise self.error(f"unexpected {token.group()!r}", token)
+        if closing:
+            raise self.error("missing ']'")
+        return items
+
+    def parse_group(self, start: re.Match) -> _Group:
+        if self.depth >= MAX_DEPTH:
+            raise self.error(f"repeat blocks nested deeper than {MAX_DEPTH}", start)
+        self.depth += 1
+        items = self.parse(closing=True)
+        self.depth -= 1
+        close = self.tokens[self.index]
+        self.index += 1
+        count = int(close.group("count") or 1)
+        if count < 1:
+            raise self.error("repeat count must be at least 1", close)
+        if not items:
+            raise self.error("empty repeat block", start)
+        return _Group(items, count)
+
+    def duration(self, token: re.Match) -> int:
+        duration = self.peek()
+        if duration is None or duration.lastgroup != "duration":
+            raise self.error("expected a duration such as 100ms or 1.5s", duration or token)
+        self.index += 1
+        text = duration.group()
+        seconds = float(text[:-2]) / 1000 if text.endswith("ms") else float(text[:-1])
+        samples = round(seconds / SAMPLE_SECONDS)
+        if samples <= 0 or abs(samples * SAMPLE_SECONDS - seconds) > 1e-9:
+            raise self.error(f"duration must be a positive multiple of {SAMPLE_SECONDS * 1000:.0f}ms", duration)
+        return samples
+
+    def parse_segment(self) -> _Segment:
+        samples = self.duration(self.tokens[self.index])
+        while (token := self.peek()) is not None and token.lastgroup == "param":
+            self.index += 1
+            try:
+                expression = _compile_expression(token.group("expr"))
+            except ValueError as e:
+                raise self.error(str(e), token) from None
+            if token.group("key") == "f":
+                self.frequency = expression
+            else:
+                self.intensity = expression
+        return _Segment(samples, self.frequency, self.intensity)
+
+
+def _count(items: List[_Item]) -> int:
+    total = 0
+    for item in items:
+        if isinstance(item, _Group):
+            item.samples = _count(item.items)
+            total += item.samples * item.count
+        else:
+            total += item.samples
+    return total
+
+
+def _render(items: List[_Item], out: np.ndarray, offset: int) -> int:
+    """
+    依序寫入取樣，重複區塊只計算一次後複製
+
+    :return: 寫入後的位置
+    """
+    for item in items:
+        if isinstance(item, _Group):
+            start = offset
+            offset = _render(item.items, out, offset)
+            block = out[:, start:offset]
+            for _ in range(item.count - 1):
+                out[:, offset : offset + item.samples] = block
+                offset += item.samples
+            continue
+        end = offset + item.samples
+        if item.frequency is not None:
+            seconds = item.samples * SAMPLE_SECONDS
+            t = np.arange(item.samples) * SAMPLE_SECONDS
+            p = np.arange(item.samples) / max(item.samples - 1, 1)
+            env = {"t": t, "p": p, "d": np.float64(seconds)}
+            for row, expression, low, high in (
+                (0, item.frequency, MIN_FREQUENCY, MAX_FREQUENCY),
+                (1, item.intensity, 0, MAX_INTENSITY),
+            ):
+                values = np.nan_to_num(np.broadcast_to(expression(env), t.shape), nan=low, posinf=high, neginf=low)
+                out[row, offset:end] = np.clip(np.rint(values), low, high)
+        offset = end
+    return offset
+
+
+def _compile_track(source: str, tokens: List[re.Match], max_samples: int) -> np.ndarray:
+    parser = _Parser(source, tokens)
+    items = parser.parse()
+    total = _count(items)
+    if total > max_samples:
+        raise WaveScriptError(f"script is longer than {max_samples * SAMPLE_SECONDS:g}s")
+    frames = -(-total // SAMPLES_PER_FRAME)
+    # 不足一幀的部分補靜音
+    samples = np.zeros((2, frames * SAMPLES_PER_FRAME), dtype=np.uint8)
+    with np.errstate(all="ignore"):
+        _render(items, samples, 0)
+    data = samples.reshape(2, frames, SAMPLES_PER_FRAME).transpose(1, 0, 2).copy()
+    data.flags.writeable = False
+    return data
+
+
+@dataclass(slots=True, frozen=True)
+class WaveProgram:
+    """
+    編譯完成的波形，各通道為 (幀數, 2, 4) 的 uint8 陣列，內容為頻率與強度
+
+    快取中的物件會被共用，`wave` / `hex` 每次都回傳新的列表
+
+    :param digest: 原始碼雜湊
+    :param a: A通道
+    :param b: B通道，兩通道相同時與 a 為同一個陣列
+    """
+
+    digest: str
+    a: np.ndarray
+    b: np.ndarray
+
+    @property
+    def shared(self) -> bool:
+        return self.a is self.b
+
+    @property
+    def duration(self) -> float:
+        return max(len(self.a), len(self.b)) * FRAME_SECONDS
+
+    def track(self, channel: Channel) -> np.ndarray:
+        return self.b if channel == Channel.B else self.a
+
+    def wave(self, channel: Channel = Channel.A) -> List[List[List[int]]]:
+        """
+        取得可直接傳給 `send_wave_message` 的波形
+
+        :param channel: Channel.A or Channel.B
+        :return: 波形數據
+        """
+        return self.track(channel).tolist()
+
+    def hex(self, channel: Channel = Channel.A) -> List[str]:
+        """
+        取得16進制波形，與 `dglabv3._wave2hex` 的結果相同
+
+        :param channel: Channel.A or Channel.B
+        :return: 16進制字串列表
+        """
+        text = self.track(channel).tobytes().hex().upper()
+        step = SAMPLES_PER_FRAME * 4
+        return [text[i : i + step] for i in range(0, len(text), step)]
+
+
+def _compile(source: str, digest: str, max_samples: int) -> WaveProgram:
+    tracks: Dict[str, List[re.Match]] = {"A": [], "B": []}
+    targets = ("A", "B")
+    headers = False
+    position = 0
+    while position < len(source):
+        token = _TOKEN.match(source, position)
+        if token is None:
+            raise WaveScriptError(f"unexpected character {source[position]!r}", source, position)
+        position = token.end()
+        kind = token.lastgroup
+        if kind == "space":
+            continue
+        if kind == "track":
+            headers = True
+            targets = tuple(token.group()[:-1])
+            # 通道標頭同時結束兩個通道目前的語句
+            for tokens in tracks.values():
+                tokens.append(token)
+            continue
+        for name in targets:
+            tracks[name].append(token)
+
+    if not any(token.lastgroup in ("duration", "rest") for tokens in tracks.values() for token in tokens):
+        raise WaveScriptError("script has no segments")
+    a = _compile_track(source, tracks["A"], max_samples)
+    if not headers:
+        return WaveProgram(digest, a, a)
+    return WaveProgram(digest, a, _compile_track(source, tracks["B"], max_samples))
+
+
+class WaveCompiler:
+    """
+    波形腳本編譯器，以原始碼雜湊快取編譯結果
+
+    腳本由片段組成，片段之間以換行或 `;` 分隔:
+
+    - `<長度> f=<頻率> i=<強度>`: 長度為 25ms 的倍數，例如 `100ms`、`1.5s`；
+      f / i 可以是數值、範圍 `0..100` 或以 t(秒)、p(進度 0-1)、d(片段長度)
+      組成的運算式，例如 `i=50+50*sin(2*pi*t)`，省略時沿用前一個片段
+    - `rest <長度>`: 靜音
+    - `[ ... ]x3`: 重複區塊
+    - `A:` / `B:` / `AB:`: 之後的片段屬於哪個通道，沒有標頭時兩通道相同
+    - `#` 之後為註解
+
+    :param maxsize: 最多快取的程式數
+    :param max_seconds: 單一通道的最長播放時間(秒)
+
+    Example:
+
+    >>> compiler = WaveCompiler()
+    >>> program = compiler.compile("[200ms f=10 i=0..100; 300ms i=100; rest 100ms]x3")
+    >>> await client.send_wave_message(program.wave(), 30)
+    """
+
+    def __init__(self, maxsize: int = 1024, max_seconds: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.max_seconds = max_seconds
+        self._max_samples = round(max_seconds / SAMPLE_SECONDS)
+        self._items: "OrderedDict[str, WaveProgram]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def compile(self, source: str) -> WaveProgram:
+        """
+        編譯腳本，相同的原始碼直接回傳快取
+
+        :param source: 腳本原始碼
+        :return: WaveProgram
+        :raises WaveScriptError: 當腳本不合法
+        """
+        if len(source) > MAX_SOURCE_LENGTH:
+            raise WaveScriptError(f"script is longer than {MAX_SOURCE_LENGTH} characters")
+        digest = hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+        program = self._items.get(digest)
+        if program is not None:
+            self.hits += 1
+            self._items.move_to_end(digest)
+            return program
+        self.misses += 1
+        program = _compile(source, digest, self._max_samples)
+        self._items[digest] = program
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return program
+
+    def clear(self) -> None:
+        """
+        清除所有快取
+        """
+        self._items.clear()
+
+
+_default_compiler: Optional[WaveCompiler] = None
+
+
+def get_default_compiler() -> WaveCompiler:
+    """
+    取得行程共用的編譯器
+
+    :return: WaveCompiler
+    """
+    global _default_compiler
+    if _default_compiler is None:
+        _default_compiler = WaveCompiler()
+    return _default_compiler
+
+
+def compile_wave(source: str) -> WaveProgram:
+    """
+    以行程共用的編譯器編譯腳本
+
+    :param source: 腳本原始碼
+    :return: WaveProgram
+
+    Example:
+
+    >>> program = compile_wave("A: [100ms i=100; 100ms i=0]x5\\nB: 1s f=10..100 i=60")
+    >>> await client.send_wave_message(program.wave(Channel.A), 10, Channel.A)
+    """
+    return get_default_compiler().compile(source)
@@ -13,6 +13,8 @@ class WStype(Enum):
 
 
 class WSMessage:
+    __slots__ = ("type", "msg", "targetID", "clientID")
+
     def __init__(self, data: dict):
         self.type: WStype = WStype(data.get("type"))
         self.msg: Optional[str] = data.get("message", None)  # 將型別從 dict 改為 str
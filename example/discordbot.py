@@ -21,7 +21,7 @@ class dglab:
             return None
 
     def del_dg(self, userid):
-        del self.dungeon[userid]
+        self.dungeon.pop(userid, None)
 
 
 _dg = dglab()
@@ -52,8 +52,9 @@ class dglab_input_class(discord.ui.Modal, title="手動輸入數值"):
             power = dg.client.get_max_strength_value(dg.channel)
         if sec > 20:
             sec = 20
-        await dg.client.set_strength_value(dg.channel, power)
-        await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
+        async with dg.client.batch():
+            await dg.client.set_strength_value(dg.channel, power)
+            await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
         dg.logadd(f"{interaction.user.name} 手動輸入了 {power}%  {sec}秒")
         await interaction.response.edit_message(embed=dg.embed)
 
@@ -156,8 +157,9 @@ class control_view(discord.ui.View):
             dg.logadd(f"設定強度 {power} 超過最大值，已調整為最大值")
             power = dg.client.get_max_strength_value(dg.channel)
         sec = random.randint(2, 15)
-        await dg.client.set_strength_value(dg.channel, power)
-        await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
+        async with dg.client.batch():
+            await dg.client.set_strength_value(dg.channel, power)
+            await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
         dg.logadd(f"{interaction.user.name} 開啟了挑逗 {power}%  {sec}秒")
         await interaction.response.edit_message(embed=dg.embed)
 
@@ -169,8 +171,9 @@ class control_view(discord.ui.View):
             dg.logadd(f"設定強度 {power} 超過最大值，已調整為最大值")
             power = dg.client.get_max_strength_value(dg.channel)
         sec = random.randint(2, 15)
-        await dg.client.set_strength_value(dg.channel, power)
-        await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
+        async with dg.client.batch():
+            await dg.client.set_strength_value(dg.channel, power)
+            await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
         dg.logadd(f"{interaction.user.name} 開啟了快感 {power}%  {sec}秒")
         await interaction.response.edit_message(embed=dg.embed)
 
@@ -182,8 +185,9 @@ class control_view(discord.ui.View):
             dg.logadd(f"設定強度 {power} 超過最大值，已調整為最大值")
             power = dg.client.get_max_strength_value(dg.channel)
         sec = random.randint(2, 15)
-        await dg.client.set_strength_value(dg.channel, power)
-        await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
+        async with dg.client.batch():
+            await dg.client.set_strength_value(dg.channel, power)
+            await dg.client.send_wave_message(dg.now_wave, sec, dg.channel)
         dg.logadd(f"{interaction.user.name} 開啟了懲罰 {power}%  {sec}秒")
         await interaction.response.edit_message(embed=dg.embed)
 
@@ -210,6 +214,10 @@ class dglabv3class(commands.Cog):
     async def start_a_cakev3(self, interaction: discord.Interaction):
         embed = discord.Embed(title="連結APP", description="掃描qrcode")
         embed.add_field(name="log", value="nothing")
+        previous: dglab_conteol_class = _dg.get_dg(interaction.user.id)
+        if previous:
+            # 重複執行指令時先關閉舊的連線，否則舊的客戶端會一直留在記憶體中
+            await previous.client.close()
         dg_class = dglab_conteol_class(embed)
         _dg.add_dg(interaction.user.id, dg_class)
         try:
@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import pytest
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel, StrengthType
+from dglabv3.transport import Transport
+from dglabv3.waves import PULSES
+
+
+class FakeTransport(Transport):
+    def __init__(self):
+        super().__init__("fake://")
+        self.writes = []
+
+    async def connect(self):
+        pass
+
+    async def send(self, text):
+        self.writes.append([json.loads(text)])
+
+    async def send_many(self, texts):
+        self.writes.append([json.loads(text) for text in texts])
+
+    async def close(self):
+        pass
+
+    def __aiter__(self):
+        raise NotImplementedError
+
+
+def make_client():
+    client = dglabv3()
+    client.client = FakeTransport()
+    client.client_id, client.target_id = "client", "app"
+    return client
+
+
+def test_batch_flushes_in_one_write():
+    client = make_client()
+
+    async def run():
+        async with client.batch() as batch:
+            await client.set_strength_value(Channel.BOTH, 30)
+            await client.send_wave_message(PULSES["呼吸"], 10, Channel.BOTH)
+            assert client.client.writes == []
+            assert len(batch) == 4
+            assert client.strength.A == 30
+
+    asyncio.run(run())
+    (write,) = client.client.writes
+    assert [message.get("channel") or message["message"] for message in write] == [
+        "strength-1+2+30",
+        "strength-2+2+30",
+        "A",
+        "B",
+    ]
+    assert all(message["clientId"] == "client" and message["targetId"] == "app" for message in write)
+
+
+def test_batch_merges_superseded_commands():
+    client = make_client()
+
+    async def run():
+        async with client.batch() as batch:
+            await client.set_strength(Channel.A, StrengthType.INCREASE, 1)
+            await client.set_strength_value(Channel.A, 10)
+            await client.set_strength_value(Channel.A, 20)
+            await client.send_wave_message(PULSES["呼吸"], 10, Channel.A)
+            await client.send_wave_message(PULSES["潮汐"], 10, Channel.A)
+            await client.set_strength(Channel.B, StrengthType.INCREASE, 1)
+        assert batch.merged == 3
+
+    asyncio.run(run())
+    (write,) = client.client.writes
+    assert write[0]["message"] == "strength-1+2+20"
+    assert write[1]["message"] == "A:" + json.dumps(dglabv3._wave2hex(PULSES["潮汐"]))
+    assert write[2]["type"] == StrengthType.INCREASE and write[2]["channel"] == Channel.B
+
+
+def test_batch_keeps_queued_short_waves_and_clears():
+    client = make_client()
+
+    async def run():
+        async with client.batch():
+            await client.send_wave_message(PULSES["呼吸"], 1, Channel.A)
+            await client.send_wave_message(PULSES["潮汐"], 1, Channel.A)
+            await client.clear_wave(Channel.B)
+            await client.clear_wave(Channel.B)
+            await client.send_wave_message(PULSES["連擊"], 5, Channel.B)
+
+    asyncio.run(run())
+    (write,) = client.client.writes
+    assert [(message.get("channel"), message["message"][:7]) for message in write] == [
+        ("A", "A:[\"0A0"),
+        ("A", "A:[\"0A0"),
+        (None, "clear-2"),
+        ("B", "B:[\"0A0"),
+    ]
+
+
+def test_batch_keeps_clear_before_superseded_wave():
+    client = make_client()
+
+    async def run():
+        async with client.batch() as batch:
+            await client.clear_wave(Channel.A)
+            await client.send_wave_message(PULSES["呼吸"], 10, Channel.A)
+            await client.send_wave_message(PULSES["潮汐"], 10, Channel.A)
+        assert batch.merged == 1
+
+    asyncio.run(run())
+    (write,) = client.client.writes
+    assert write[0]["message"] == "clear-1"
+    assert write[1]["message"] == "A:" + json.dumps(dglabv3._wave2hex(PULSES["潮汐"]))
+    assert len(write) == 2
+
+
+def test_batch_discarded_on_error():
+    client = make_client()
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with client.batch():
+                await client.set_strength_value(Channel.A, 10)
+                raise RuntimeError("abort")
+        assert client.strength.A == 0
+        await client.set_strength_value(Channel.A, 11)
+
+    asyncio.run(run())
+    (write,) = client.client.writes
+    assert [message["message"] for message in write] == ["strength-1+2+11"]
+
+
+def test_nested_batch_and_other_tasks():
+    client = make_client()
+
+    async def run():
+        go = asyncio.Event()
+
+        async def other():
+            await go.wait()
+            await client.clear_wave(Channel.B)
+
+        task = asyncio.create_task(other())
+        async with client.batch():
+            async with client.batch():
+                await client.set_strength_value(Channel.A, 10)
+            assert client.client.writes == []
+            # 在區塊外建立的協程不會被收進這個批次
+            go.set()
+            await task
+            assert [[message["message"] for message in write] for write in client.client.writes] == [["clear-2"]]
+            await client.set_strength_value(Channel.B, 10)
+
+    asyncio.run(run())
+    assert [len(write) for write in client.client.writes] == [1, 2]
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from dglabv3.coalesce import Debouncer, EventCoalescer
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Button
+
+
+def test_coalescer_delivers_latest_value():
+    delivered = []
+
+    async def callback(name, value):
+        delivered.append((name, value))
+
+    async def run():
+        coalescer = EventCoalescer(callback)
+        coalescer.set_interval("strength", 0.05)
+        for value in range(5):
+            await coalescer.push("strength", value)
+        await coalescer.push("other", "x")
+        assert delivered == [("strength", 0), ("other", "x")]
+        await asyncio.sleep(0.1)
+        assert delivered[-1] == ("strength", 4)
+        assert len(delivered) == 3
+
+    asyncio.run(run())
+
+
+def test_debouncer():
+    debouncer = Debouncer(0.3)
+    assert debouncer.allow(Button.button_1, now=0.0)
+    assert not debouncer.allow(Button.button_1, now=0.1)
+    assert debouncer.allow(Button.button_2, now=0.1)
+    assert debouncer.allow(Button.button_1, now=0.5)
+
+
+def test_client_updates_state_immediately():
+    client = dglabv3()
+    client.set_event_interval("strength", 10)
+    seen = []
+    client.register_event("strength", seen.append)
+
+    async def run():
+        for value in (1, 2, 3):
+            report = {"type": "msg", "message": f"strength-{value}+0+100+100"}
+            await client._handle_message(json.dumps(report))
+            assert client.strength.A == value
+        client._coalescer.cancel()
+
+    asyncio.run(run())
+    assert [strength.A for strength in seen] == [1]
@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+import pytest
+
+from dglabv3 import dglab
+from dglabv3.compact import MAX_CHUNK_FRAMES, compact_wave, find_period
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel
+from dglabv3.waves import PULSES
+
+
+def frames(*values):
+    return [[[10, 10, 10, 10], [v, v, v, v]] for v in values]
+
+
+def expand(compacted):
+    return [frame for segment in compacted.segments for _ in range(segment.repeat) for frame in segment.frames]
+
+
+def test_find_period():
+    assert find_period(frames(1, 2, 1, 2, 1, 2)) == 2
+    assert find_period(frames(1, 2, 3)) == 3
+    assert find_period(frames(1, 2, 1)) == 3
+
+
+def test_periodic_wave_becomes_single_repeated_block():
+    wave = frames(0, 50) * 10
+    compacted = compact_wave(wave, 30)
+    assert len(compacted.segments) == 1
+    segment = compacted.segments[0]
+    assert segment.repeat == 30 and len(segment.frames) == 10
+    assert expand(compacted) == (wave * 15)[:300]
+    assert compacted.report()["segments"] == 1
+    assert compacted.ratio == 2
+
+
+def test_falls_back_when_compaction_sends_more():
+    for name, wave in PULSES.items():
+        compacted = compact_wave(wave, 30)
+        assert compacted.sent_frames <= compacted.legacy_frames, name
+        assert compacted.ratio >= 1.0
+    compacted = compact_wave(PULSES["潮汐"], 30)
+    assert compacted.legacy and compacted.segments == []
+    assert compacted.report()["hex_chars"] == len(PULSES["潮汐"]) * 16
+
+
+def test_unique_frames_are_chunked():
+    wave = frames(*range(200))
+    compacted = compact_wave(wave)
+    assert [len(segment.frames) for segment in compacted.segments] == [MAX_CHUNK_FRAMES, MAX_CHUNK_FRAMES, 40]
+    assert all(segment.repeat == 1 for segment in compacted.segments)
+    assert expand(compacted) == wave
+    assert compacted.ratio == 1.0
+
+
+def test_mixed_wave_round_trips():
+    loop = frames(*range(10))
+    wave = frames(90, 91, 92) + loop * 6 + frames(93, 94)
+    compacted = compact_wave(wave)
+    assert expand(compacted) == wave
+    assert [segment.repeat for segment in compacted.segments] == [1, 6, 1]
+    assert compacted.ratio == pytest.approx(len(wave) / 15)
+    assert compacted.report()["hex_chars"] == 15 * 16
+
+
+def test_empty_wave():
+    with pytest.raises(ValueError):
+        compact_wave([])
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append((asyncio.get_running_loop().time(), json.loads(text)))
+
+
+def test_send_wave_message_compact(monkeypatch):
+    monkeypatch.setattr(dglab, "RESEND_INTERVAL", 0.01)
+    monkeypatch.setattr(dglab, "RESEND_MARGIN", 0.01)
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.client_id, client.target_id = "client", "app"
+    loop = frames(*range(10))
+    wave = loop * 3 + frames(1, 2)
+
+    async def run():
+        await client.send_wave_message(wave, None, Channel.A, compact=True)
+        assert len(client.client.sent) == 1
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    (first_at, first), (second_at, second) = client.client.sent
+    assert first["time"] == 3 and len(json.loads(first["message"][2:])) == 10
+    assert second["time"] == 1 and len(json.loads(second["message"][2:])) == 2
+    assert second_at - first_at >= 0.03
+
+
+def test_clear_cancels_pending_segments(monkeypatch):
+    monkeypatch.setattr(dglab, "RESEND_INTERVAL", 0.01)
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.client_id, client.target_id = "client", "app"
+
+    async def run():
+        await client.send_wave_message(frames(*range(10)) * 3 + frames(1), None, Channel.A, compact=True)
+        await client.clear_wave(Channel.A)
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert [message.get("time") for _, message in client.client.sent] == [3, None]
+
+
+def test_channels_keep_independent_pending_segments(monkeypatch):
+    monkeypatch.setattr(dglab, "RESEND_INTERVAL", 0.01)
+    monkeypatch.setattr(dglab, "RESEND_MARGIN", 0.01)
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.client_id, client.target_id = "client", "app"
+    wave = frames(*range(10)) * 2 + frames(1)
+
+    async def run():
+        await client.send_wave_message(wave, None, Channel.A, compact=True)
+        await client.send_wave_message(wave, None, Channel.B, compact=True)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert [(message["channel"], message["time"]) for _, message in client.client.sent] == [
+        ("A", 2),
+        ("B", 2),
+        ("A", 1),
+        ("B", 1),
+    ]
+    assert client._wave_tasks == {}
+
+
+def test_send_wave_message_compact_falls_back():
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.client_id, client.target_id = "client", "app"
+    wave = PULSES["潮汐"]
+
+    async def run():
+        await client.send_wave_message(wave, 30, Channel.A, compact=True)
+
+    asyncio.run(run())
+    ((_, message),) = client.client.sent
+    assert message["time"] == 30 and message["message"] == "A:" + json.dumps(dglabv3._wave2hex(wave))
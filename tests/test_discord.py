@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("discord")
+
+from dglabv3.discord import ControlView, DispatchBatcher, SessionManager  # noqa: E402
+
+
+class StubBot:
+    def __init__(self):
+        self.dispatched = []
+
+    def dispatch(self, event_name, *args):
+        self.dispatched.append((event_name, *args))
+
+
+def test_batcher_keeps_latest_strength_and_all_buttons():
+    bot = StubBot()
+    batcher = DispatchBatcher(bot, interval=0.01)
+
+    async def run():
+        batcher.push(1, "strength", 10)
+        batcher.push(1, "strength", 20)
+        batcher.push(2, "strength", 5)
+        batcher.push(1, "button", "a")
+        batcher.push(1, "button", "b")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    ((name, events),) = bot.dispatched
+    assert name == "dglab_events"
+    assert events == [(1, "strength", 20), (2, "strength", 5), (1, "button", "a"), (1, "button", "b")]
+
+
+def test_manager_limits_and_replaces_sessions():
+    manager = SessionManager(StubBot(), max_sessions=1)
+
+    async def run():
+        first = await manager.create(1)
+        second = await manager.create(1)
+        assert first is not second and manager.get(1) is second
+        with pytest.raises(RuntimeError):
+            await manager.create(2)
+        await manager.close()
+        assert len(manager) == 0
+
+    asyncio.run(run())
+
+
+def test_manager_evicts_idle_and_disconnected_sessions():
+    manager = SessionManager(StubBot(), idle_timeout=10)
+
+    async def run():
+        idle = await manager.create(1)
+        linked = await manager.create(2)
+        waiting = await manager.create(3)
+        idle.last_active -= 60
+        linked.message = object()
+        assert await manager.evict() == 2
+        assert list(manager.sessions) == [3]
+        assert manager.get(3) is waiting
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_disconnect_responds_before_closing():
+    order = []
+
+    class Response:
+        async def edit_message(self, **kwargs):
+            order.append("respond")
+
+    class Interaction:
+        response = Response()
+
+    async def run():
+        manager = SessionManager(StubBot())
+        await manager.create(1)
+
+        async def remove(user_id):
+            order.append("remove")
+
+        manager.remove = remove
+        view = ControlView(manager, 1)
+        await view._disconnect(Interaction())
+        assert view.is_finished()
+
+    asyncio.run(run())
+    assert order == ["respond", "remove"]
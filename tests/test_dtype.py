@@ -3,7 +3,7 @@ import random
 import pytest
 
 from dglabv3.dtype import (Button, Channel, ChannelStrength, MessageType,
-                           StrengthMode, StrengthType)
+                           Strength, StrengthMode, StrengthType)
 
 
 def test_channel_strength_initialization():
@@ -58,6 +58,24 @@ def test_channel_strength_set_random_values():
         cs.B = maxb + 1
 
 
+def test_strength_snapshot():
+    cs = ChannelStrength()
+    cs.set_strength(Strength(A=10, B=20, MAXA=50, MAXB=60))
+    assert cs.snapshot() == Strength(10, 20, 50, 60)
+    assert not hasattr(cs, "__dict__")
+    with pytest.raises(AttributeError):
+        cs.snapshot().A = 1  # type: ignore
+
+
+def test_strength_invalid_values():
+    with pytest.raises(ValueError):
+        Strength(A=60, B=0, MAXA=50, MAXB=50)
+    with pytest.raises(ValueError):
+        Strength(A=0, B=-1, MAXA=50, MAXB=50)
+    with pytest.raises(ValueError):
+        Strength(A=0, B=0, MAXA=201, MAXB=50)
+
+
 def test_channel_enum():
     assert Channel.A == 1
     assert Channel.B == 2
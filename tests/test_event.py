@@ -0,0 +1,119 @@
+import asyncio
+
+from dglabv3.event import EventEmitter, OverflowPolicy
+
+
+def test_subscription_filters_and_batches():
+    emitter = EventEmitter()
+
+    async def run():
+        with emitter.events("strength") as events:
+            for value in range(3):
+                emitter.emit("strength", value)
+            emitter.emit("button", "1")
+            batch = await events.get_batch(10)
+            assert [item.args for item in batch] == [(0,), (1,), (2,)]
+            assert await events.get_batch(10, timeout=0.01) == []
+        assert not emitter._subscriptions
+
+    asyncio.run(run())
+
+
+def test_overflow_policies():
+    emitter = EventEmitter()
+
+    async def run():
+        oldest = emitter.events(maxsize=2, overflow=OverflowPolicy.DROP_OLDEST)
+        newest = emitter.events(maxsize=2, overflow=OverflowPolicy.DROP_NEWEST)
+        for value in range(4):
+            emitter.emit("strength", value)
+        assert [item.args[0] for item in await oldest.get_batch()] == [2, 3]
+        assert [item.args[0] for item in await newest.get_batch()] == [0, 1]
+        assert oldest.dropped == newest.dropped == 2
+
+    asyncio.run(run())
+
+
+def test_block_policy_applies_backpressure():
+    emitter = EventEmitter()
+
+    async def run():
+        events = emitter.events(maxsize=1, overflow=OverflowPolicy.BLOCK)
+        await emitter.emit_async("strength", 1)
+        producer = asyncio.create_task(emitter.emit_async("strength", 2))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+        assert (await events.get()).args == (1,)
+        await producer
+        assert (await events.get()).args == (2,)
+        events.close()
+        assert [item async for item in events] == []
+
+    asyncio.run(run())
+
+
+def test_handler_tasks_are_tracked():
+    emitter = EventEmitter()
+    seen = []
+
+    async def run():
+        release = asyncio.Event()
+
+        @emitter.event("strength")
+        async def on_strength(value):
+            seen.append(value)
+            await release.wait()
+
+        @emitter.event("button")
+        async def on_button(value):
+            raise RuntimeError(value)
+
+        emitter.emit("strength", 1)
+        emitter.emit("button", "boom")
+        assert len(emitter._handler_tasks) == 2
+        await asyncio.sleep(0.01)
+        assert len(emitter._handler_tasks) == 1
+        release.set()
+        await asyncio.sleep(0.01)
+        assert not emitter._handler_tasks
+
+        release.clear()
+        emitter.emit("strength", 2)
+        await asyncio.sleep(0.01)
+        (task,) = emitter._handler_tasks
+        emitter.cancel_handlers()
+        await asyncio.sleep(0.01)
+        assert task.cancelled() and not emitter._handler_tasks
+
+    asyncio.run(run())
+    assert seen == [1, 2]
+
+
+def test_client_close_ends_subscriptions():
+    from dglabv3.dglab import dglabv3
+
+    client = dglabv3()
+
+    async def run():
+        batches = client.events("strength")
+        stream = client.events()
+        waiting = asyncio.create_task(batches.get_batch(10))
+
+        async def consume():
+            return [item.args async for item in stream]
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        client.emit("strength", 1)
+        await client.close()
+        assert [item.args for item in await waiting] == [(1,)]
+        assert await consumer == [(1,)]
+        try:
+            await batches.get_batch(10)
+        except StopAsyncIteration:
+            pass
+        else:
+            raise AssertionError("closed subscription returned a batch")
+        assert not client._subscriptions
+
+    asyncio.run(run())
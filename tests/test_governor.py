@@ -0,0 +1,75 @@
+import asyncio
+
+from dglabv3.dtype import Channel, ChannelStrength, StrengthType
+from dglabv3.governor import StrengthGovernor
+
+
+class FakeClient:
+    target_id = "target"
+
+    def __init__(self):
+        self.strength = ChannelStrength()
+        self.sent = []
+
+    def is_connected(self):
+        return True
+
+    def get_strength_value(self, channel):
+        return self.strength.A if channel == Channel.A else self.strength.B
+
+    def get_max_strength_value(self, channel):
+        return self.strength.MAX_A if channel == Channel.A else self.strength.MAX_B
+
+    async def set_strength(self, channel, type_id, strength):
+        assert type_id == StrengthType.SPECIFIC
+        if channel == Channel.A:
+            self.strength.A = strength
+        else:
+            self.strength.B = strength
+        self.sent.append((channel, strength))
+
+    async def reset_strength_value(self, channel):
+        self.sent.append((channel, 0))
+
+
+def test_set_target_clamps_to_max():
+    client = FakeClient()
+    client.strength.MAX_A = 50
+    governor = StrengthGovernor(client)
+    governor.set_target(Channel.A, 120)
+    governor.set_target(Channel.B, -5)
+    assert governor.get_target(Channel.A) == 50
+    assert governor.get_target(Channel.B) == 0
+
+
+def test_ramp_is_rate_limited_and_coalesced():
+    client = FakeClient()
+    governor = StrengthGovernor(client, max_slew=10)
+
+    async def run():
+        governor.set_target(Channel.A, 100)
+        await governor._tick(0.0)
+        for i in range(1, 6):
+            await governor._tick(i * 0.1)
+        assert client.sent == [(Channel.A, n) for n in range(1, 6)]
+        governor.set_target(Channel.A, 7)
+        await governor._tick(0.6)
+        await governor._tick(0.7)
+        await governor._tick(0.8)
+        assert client.sent[-2:] == [(Channel.A, 6), (Channel.A, 7)]
+        assert governor.settled(Channel.A)
+
+    asyncio.run(run())
+
+
+def test_decrease_is_immediate_by_default():
+    client = FakeClient()
+    client.strength.A = 80
+    governor = StrengthGovernor(client, max_slew=10)
+
+    async def run():
+        governor.set_target(Channel.A, 10)
+        await governor._tick(0.0)
+        assert client.sent == [(Channel.A, 10)]
+
+    asyncio.run(run())
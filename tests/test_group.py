@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel
+from dglabv3.group import SessionGroup
+from dglabv3.waves import PULSES
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+
+def make_client(client_id, target_id="app"):
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.client_id = client_id
+    client.target_id = target_id
+    return client
+
+
+def test_group_payload_matches_single_send():
+    single = make_client("single")
+    members = [make_client(f"c{i}") for i in range(3)]
+    group = SessionGroup(members, concurrency=2)
+
+    async def run():
+        await single.send_wave_message(PULSES["呼吸"], 5, Channel.BOTH)
+        return await group.send_wave_message(PULSES["呼吸"], 5, Channel.BOTH)
+
+    result = asyncio.run(run())
+    assert result.sent == 3 and not result.failed
+    assert len(result.latencies) == 3
+    for i, member in enumerate(members):
+        expected = [dict(message, clientId=f"c{i}") for message in single.client.sent]
+        assert member.client.sent == expected
+
+
+def test_group_isolates_member_errors():
+    ok = make_client("ok")
+    unlinked = make_client("unlinked", None)
+    limited = make_client("limited")
+    limited.strength.MAX_A = 10
+    group = SessionGroup([ok, unlinked, limited])
+
+    result = asyncio.run(group.set_strength_value(Channel.A, 50))
+    assert result.sent == 1
+    assert set(result.failed) == {unlinked, limited}
+    assert ok.client.sent[0]["message"] == "strength-1+2+50"
+    assert ok.strength.A == 50
+    assert unlinked.strength.A == 0 and limited.strength.A == 0
+
+
+def test_group_strength_validates_both_channels_first():
+    member = make_client("member")
+    member.strength.MAX_B = 10
+    group = SessionGroup([member])
+
+    result = asyncio.run(group.set_strength_value(Channel.BOTH, 50))
+    assert set(result.failed) == {member}
+    assert member.client.sent == []
+    assert member.strength.A == 0 and member.strength.B == 0
@@ -0,0 +1,48 @@
+import logging
+import subprocess
+import sys
+
+from dglabv3.dglab import dglabv3
+
+
+def test_import_does_not_configure_root_logger():
+    code = "import logging, dglabv3; root = logging.getLogger(); print(len(root.handlers), root.level)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["0", str(logging.WARNING)]
+
+
+def test_session_context(caplog):
+    client = dglabv3()
+    client.client_id, client.target_id = "c1", "t1"
+    with caplog.at_level(logging.WARNING, logger="dglabv3"):
+        client._log.warning("Unknown message type: %s", "x")
+    (record,) = caplog.records
+    assert record.getMessage() == "[c1] Unknown message type: x"
+    assert record.client_id == "c1"
+    assert record.target_id == "t1"
+
+
+def test_sampled_logging(caplog):
+    client = dglabv3()
+    client.set_log_sampling(10)
+    with caplog.at_level(logging.DEBUG, logger="dglabv3"):
+        for i in range(25):
+            client._log.sampled(logging.DEBUG, "sent", "Sent message: %s", i)
+    assert [record.getMessage() for record in caplog.records] == [
+        "[None] Sent message: 0",
+        "[None] Sent message: 10",
+        "[None] Sent message: 20",
+    ]
+    assert caplog.records[1].sample_count == 11
+
+
+def test_disabled_level_skips_formatting(caplog):
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted while disabled")
+
+    client = dglabv3()
+    with caplog.at_level(logging.INFO, logger="dglabv3"):
+        client._log.debug("Received message: %s", Expensive())
+        client._log.sampled(logging.DEBUG, "received", "Received message: %s", Expensive())
+    assert not caplog.records
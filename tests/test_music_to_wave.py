@@ -0,0 +1,106 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from dglabv3.music_to_wave import ANALYSIS_SR, MODES, convert_audio_to_v3_protocol, convert_samples, load_audio
+
+SR = 8000
+
+
+def tone(hz, seconds=2.0):
+    t = np.arange(int(SR * seconds)) / SR
+    return (np.sin(2 * np.pi * hz * t) * (0.2 + 0.8 * (t % 0.5 < 0.25))).astype(np.float32)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_modes_produce_valid_waves(mode):
+    y = tone(110) + tone(2000)
+    wave_a, wave_b = convert_samples(y, SR, mode)
+    assert len(wave_a) == len(wave_b) == 20
+    for wave in (wave_a, wave_b):
+        for freq, intensity in wave:
+            assert len(freq) == len(intensity) == 4
+            assert all(10 <= value <= 240 for value in freq)
+            assert all(0 <= value <= 100 for value in intensity)
+
+
+def test_bands_split_channels():
+    low, high = tone(110), tone(2000)
+    y = np.concatenate([low, np.zeros_like(high)]) + np.concatenate([np.zeros_like(low), high])
+    wave_a, wave_b = convert_samples(y, SR, "bands")
+    half = len(wave_a) // 2
+    assert np.mean([f[1] for f in wave_a[:half]]) > np.mean([f[1] for f in wave_a[half:]])
+    assert np.mean([f[1] for f in wave_b[half:]]) > np.mean([f[1] for f in wave_b[:half]])
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        convert_samples(tone(110), SR, "nope")
+
+
+@pytest.mark.parametrize("mode", ["dominant", "onset", "centroid", "mel"])
+def test_stereo_matches_per_channel(mode):
+    left, right = tone(110), tone(2000) * 0.3
+    wave_a, wave_b = convert_samples(np.stack([left, right]), SR, mode, stereo=True)
+    assert wave_a == convert_samples(left, SR, mode)[0]
+    assert wave_b == convert_samples(right, SR, mode)[0]
+
+
+def test_stereo_input_downmixed_without_stereo():
+    y = np.stack([tone(110), tone(110)])
+    wave_a, wave_b = convert_samples(y, SR, "centroid")
+    assert wave_a is wave_b
+    assert wave_a == convert_samples(tone(110), SR, "centroid")[0]
+
+
+def test_stereo_rejects_bands():
+    with pytest.raises(ValueError):
+        convert_samples(np.stack([tone(110), tone(110)]), SR, "bands", stereo=True)
+
+
+def write_song(path, sr=44100, seconds=3):
+    import soundfile
+
+    t = np.arange(sr * seconds) / sr
+    beat = t % 0.5
+    y = 0.5 * np.sin(2 * np.pi * 55 * t) * np.exp(-beat * 8) + 0.1 * np.sin(2 * np.pi * 440 * t)
+    y = (y * np.clip(t / 0.5, 0, 1)).astype(np.float32)
+    soundfile.write(str(path), np.stack([y, y * 0.5], axis=1), sr)
+
+
+@pytest.mark.parametrize("backend", ["soundfile", "audioread", "auto"])
+def test_load_audio_backends(tmp_path, backend):
+    path = tmp_path / "song.wav"
+    write_song(path)
+    y, sr = load_audio(str(path), ANALYSIS_SR, backend=backend)
+    assert sr == ANALYSIS_SR
+    assert y.ndim == 1 and abs(len(y) - 3 * ANALYSIS_SR) <= 1
+    stereo, _ = load_audio(str(path), ANALYSIS_SR, mono=False, backend=backend)
+    assert stereo.shape[0] == 2
+    assert np.abs(stereo[1]).max() < np.abs(stereo[0]).max()
+
+
+def test_ffmpeg_backend(tmp_path):
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg not installed")
+    path = tmp_path / "song.wav"
+    write_song(path)
+    y, sr = load_audio(str(path), ANALYSIS_SR, backend="ffmpeg")
+    assert sr == ANALYSIS_SR and abs(len(y) - 3 * ANALYSIS_SR) <= ANALYSIS_SR // 100
+
+
+def test_analysis_sr_within_tolerance(tmp_path):
+    path = tmp_path / "song.wav"
+    write_song(path)
+    reference = np.array(convert_audio_to_v3_protocol(str(path)))
+    fast = np.array(convert_audio_to_v3_protocol(str(path), analysis_sr=ANALYSIS_SR, backend="soundfile"))
+    assert fast.shape == reference.shape
+    error = np.abs(fast - reference)
+    assert error[:, 0].mean() <= 3
+    assert error[:, 1].mean() <= 3
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        load_audio(str(tmp_path / "x.wav"), backend="nope")
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from dglabv3.qrcache import QRCodeCache
+
+DATA = "https://www.dungeon-lab.com/app-download.php#DGLAB-SOCKET#wss://ws.dungeon-lab.cn/test"
+
+
+def test_render_sync_is_cached():
+    cache = QRCodeCache(maxsize=1)
+    images = cache.render_sync(DATA)
+    assert images.png.startswith(b"\x89PNG")
+    assert images.text
+    assert images.svg is None
+    assert cache.render_sync(DATA) is images
+    cache.render_sync(DATA + "2")
+    assert cache.get(DATA) is None
+
+
+def test_render_deduplicates_concurrent_requests():
+    cache = QRCodeCache(svg=True)
+
+    async def run():
+        return await asyncio.gather(cache.render(DATA), cache.render(DATA))
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert first.svg is not None and first.svg.startswith(b"<")
+
+
+def test_cancelled_render_does_not_affect_other_waiters():
+    cache = QRCodeCache()
+
+    async def run():
+        first = asyncio.create_task(cache.render(DATA))
+        second = asyncio.create_task(cache.render(DATA))
+        await asyncio.sleep(0)
+        first.cancel()
+        images = await second
+        assert first.cancelled()
+        return images
+
+    images = asyncio.run(run())
+    assert cache.get(DATA) is images
+
+
+def test_invalidate_during_render_is_not_stored():
+    cache = QRCodeCache()
+
+    async def run():
+        task = asyncio.create_task(cache.render(DATA))
+        await asyncio.sleep(0)
+        cache.invalidate(DATA)
+        return await task
+
+    assert asyncio.run(run()).png
+    assert len(cache) == 0
+
+
+def test_invalidate_and_options():
+    cache = QRCodeCache()
+    cache.render_sync(DATA)
+    cache.invalidate(DATA)
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        QRCodeCache(error_correction="X")
+
+
+def test_client_keeps_empty_cache():
+    from dglabv3.dglab import dglabv3
+
+    cache = QRCodeCache()
+    assert dglabv3(qr_cache=cache).qr_cache is cache
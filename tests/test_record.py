@@ -0,0 +1,73 @@
+import asyncio
+import io
+import json
+
+from dglabv3.dglab import dglabv3
+from dglabv3.record import TrafficRecorder, TrafficReplayer, load_recording
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(text)
+
+    async def send_many(self, texts):
+        self.sent.extend(texts)
+
+
+def test_record_and_replay():
+    stream = io.StringIO()
+    recorder = TrafficRecorder(stream)
+    client = dglabv3()
+    recorder.attach(client)
+    client.client = FakeSocket()
+
+    async def record():
+        await client._handle_message(json.dumps({"type": "msg", "message": "strength-5+6+100+100"}))
+        await client._send_message({"type": "msg", "message": "clear-1"})
+
+    asyncio.run(record())
+    recorder.close()
+    frames = load_recording(io.StringIO(stream.getvalue()))
+    assert [frame.direction for frame in frames] == ["<", ">"]
+
+    other = dglabv3()
+    replayer = TrafficReplayer(frames, speed=0)
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    async def replay():
+        assert await replayer.replay_to_client(other) == 1
+        assert await replayer.replay_outbound(send) == 1
+
+    asyncio.run(replay())
+    assert other.strength.A == 5
+    assert json.loads(sent[0])["message"] == "clear-1"
+
+
+class BrokenTap:
+    def on_inbound(self, data):
+        raise ValueError("closed file")
+
+    def on_outbound(self, text):
+        raise ValueError("closed file")
+
+
+def test_tap_errors_do_not_break_traffic():
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.add_tap(BrokenTap())
+
+    async def run():
+        await client._handle_message(json.dumps({"type": "msg", "message": "strength-5+6+100+100"}))
+        await client._send_message({"type": "msg", "message": "clear-1"})
+        async with client.batch():
+            await client._send_message({"type": "msg", "message": "clear-2"})
+
+    asyncio.run(run())
+    assert client.strength.A == 5
+    assert [json.loads(text)["message"] for text in client.client.sent] == ["clear-1", "clear-2"]
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from websockets.asyncio.client import connect
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel
+from dglabv3.relay import DGLabRelay
+from dglabv3.transport import MultiplexTransport
+
+
+async def fake_app(relay, client_id):
+    app = await connect(relay.url + client_id)
+    app_id = json.loads(await app.recv())["clientId"]
+    await app.send(json.dumps({"type": "bind", "clientId": client_id, "targetId": app_id, "message": "DGLAB"}))
+    assert json.loads(await app.recv())["message"] == "200"
+    return app, app_id
+
+
+async def recv_message(app, prefix):
+    while True:
+        message = json.loads(await app.recv())
+        if message.get("message", "").startswith(prefix):
+            return message
+
+
+def pair_and_control(client_factory):
+    async def run():
+        relay = DGLabRelay(host="127.0.0.1", port=0)
+        await relay.start()
+        client = client_factory(relay)
+        try:
+            await client.connect_and_wait(timeout=5)
+            app, app_id = await fake_app(relay, client.client_id)
+            await client.wait_for_app_connect(timeout=5)
+            assert client.target_id == app_id
+
+            await client.set_strength_value(Channel.A, 5)
+            assert (await recv_message(app, "strength-1+2+5"))["type"] == "msg"
+            await client.send_wave_message([[[10, 10, 10, 10], [0, 0, 0, 0]]] * 5, 1, Channel.B)
+            assert (await recv_message(app, "pulse-B:"))["targetId"] == app_id
+
+            report = {"type": "msg", "clientId": client.client_id, "targetId": app_id, "message": "strength-7+3+90+80"}
+            await app.send(json.dumps(report))
+            for _ in range(50):
+                if client.strength.A == 7:
+                    break
+                await asyncio.sleep(0.02)
+            assert client.get_strength_value(Channel.B) == 3
+            assert client.get_max_strength_value(Channel.A) == 90
+            metrics = relay.metrics()
+            assert metrics["bindings_current"] == 1
+            assert "dglab_relay_connections_current 2" in relay.metrics_text()
+            await app.close()
+        finally:
+            await client.close()
+            await relay.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 20))
+
+
+def test_relay_pairing_roundtrip():
+    pair_and_control(lambda relay: dglabv3(url=relay.url))
+
+
+def test_relay_multiplexed_client():
+    pair_and_control(
+        lambda relay: dglabv3(url=relay.url, transport_factory=lambda url: MultiplexTransport(url + "mux"))
+    )
+
+
+def test_url_from_environment(monkeypatch):
+    monkeypatch.setenv("DGLAB_WS_URL", "ws://relay.local:9999/")
+    client = dglabv3()
+    assert client.clienturl == "ws://relay.local:9999/"
+    assert client.clientqrurl.endswith("#DGLAB-SOCKET#ws://relay.local:9999/")
+    assert dglabv3(url="ws://other/", qr_url="qr#").clientqrurl == "qr#"
+
+
+def test_heartbeat_survives_rebind_and_closes_cleanly():
+    async def run():
+        relay = DGLabRelay(host="127.0.0.1", port=0)
+        await relay.start()
+        client = dglabv3(url=relay.url)
+        client.interval = 0.01
+        client.disconnect_time = 5
+        try:
+            await client.connect_and_wait(timeout=5)
+            heartbeat = client._heartbeat_task
+            await client._handle_message(json.dumps({"type": "bind", "clientId": client.client_id, "message": "200"}))
+            assert client._heartbeat_task is heartbeat
+            # App一直沒有連上，心跳任務自行關閉客戶端時也要關掉連線
+            await asyncio.wait_for(heartbeat, 5)
+            assert client.client is None
+            for _ in range(50):
+                if not relay.clients:
+                    break
+                await asyncio.sleep(0.01)
+            assert not relay.clients
+        finally:
+            await client.close()
+            await relay.stop()
+
+    asyncio.run(run())
+
+
+def test_replacing_wave_does_not_block_connection():
+    async def run():
+        relay = DGLabRelay(host="127.0.0.1", port=0)
+        await relay.start()
+        client = dglabv3(url=relay.url)
+        try:
+            await client.connect_and_wait(timeout=5)
+            app, app_id = await fake_app(relay, client.client_id)
+            await client.wait_for_app_connect(timeout=5)
+            wave = [[[10, 10, 10, 10], [0, 0, 0, 0]]] * 5
+            await client.send_wave_message(wave, 5, Channel.A)
+            await recv_message(app, "pulse-A:")
+            await client.send_wave_message(wave, 5, Channel.A)
+            await client.set_strength_value(Channel.B, 9)
+            received = []
+            while len(received) < 3:
+                message = json.loads(await app.recv())["message"]
+                if message.startswith(("clear", "strength-2", "pulse")):
+                    received.append(message.split(":")[0])
+            # 清除後的新波形在背景延遲發送，之後的強度指令不用等待
+            assert received == ["clear-1", "strength-2+2+9", "pulse-A"]
+            await app.close()
+        finally:
+            await client.close()
+            await relay.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 20))
@@ -0,0 +1,76 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from dglabv3 import transport
+from dglabv3.dglab import dglabv3
+from dglabv3.runtime import DEFAULT, RuntimeProfile, apply_profile, configure_loop, run
+
+
+@pytest.fixture(autouse=True)
+def restore_default():
+    policy = asyncio.get_event_loop_policy()
+    yield
+    apply_profile(DEFAULT)
+    asyncio.set_event_loop_policy(policy)
+    transport.set_default_transport(None)
+
+
+def test_profile_sets_transport_options():
+    apply_profile(RuntimeProfile(max_size=4096, max_queue=2, write_limit=1024, compression=None))
+    created = dglabv3(url="ws://127.0.0.1:1/").transport_factory("ws://127.0.0.1:1/")
+    assert isinstance(created, transport.WebSocketTransport)
+    assert created.options["max_size"] == 4096
+    assert created.options["max_queue"] == 2
+    assert created.options["write_limit"] == 1024
+    assert created.options["compression"] is None
+
+
+def test_explicit_transport_factory_wins():
+    apply_profile(RuntimeProfile(max_size=4096))
+    client = dglabv3(transport_factory=lambda url: transport.WebSocketTransport(url, max_size=10))
+    assert client.transport_factory("ws://x/").options["max_size"] == 10
+
+
+def test_run_configures_executor():
+    async def main():
+        loop = asyncio.get_running_loop()
+        executor = loop._default_executor
+        return executor, await loop.run_in_executor(None, lambda: 42)
+
+    executor, result = run(main(), RuntimeProfile(executor_workers=3))
+    assert result == 42
+    assert isinstance(executor, concurrent.futures.ThreadPoolExecutor)
+    assert executor._max_workers == 3
+
+
+def test_uvloop_profile():
+    uvloop = pytest.importorskip("uvloop")
+
+    async def main():
+        return asyncio.get_running_loop()
+
+    assert isinstance(run(main(), RuntimeProfile(uvloop=True)), uvloop.Loop)
+
+
+def test_default_profile_keeps_event_loop_policy():
+    policy = asyncio.DefaultEventLoopPolicy()
+    asyncio.set_event_loop_policy(policy)
+    apply_profile(DEFAULT)
+    assert asyncio.get_event_loop_policy() is policy
+
+
+def test_reconfigure_shuts_down_previous_executor():
+    async def main():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: None)
+        builtin = loop._default_executor
+        configure_loop(loop, RuntimeProfile(executor_workers=2))
+        first = loop._default_executor
+        configure_loop(loop, RuntimeProfile(executor_workers=3))
+        return builtin, first, loop._default_executor
+
+    builtin, first, second = asyncio.run(main())
+    assert builtin._shutdown and first._shutdown
+    assert second._max_workers == 3
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from dglabv3.dtype import Channel
+from dglabv3.scheduler import PlayMode, ScheduledWave, WaveScheduler
+
+WAVE = [[[10, 10, 10, 10], [0, 0, 0, 0]], [[10, 10, 10, 10], [100, 100, 100, 100]]]
+LOUD = [[[20, 20, 20, 20], [100, 100, 100, 100]]]
+
+
+class FakeClient:
+    target_id = "target"
+
+    def __init__(self):
+        self.sent = []
+        self.cleared = []
+
+    def is_connected(self):
+        return True
+
+    @staticmethod
+    def _wave2hex(data):
+        return ["".join(format(num, "02X") for num in sum(item, [])) for item in data]
+
+    async def _send_message(self, message, update=True):
+        self.sent.append(message)
+
+    async def clear_wave(self, channel):
+        self.cleared.append(channel)
+
+
+def test_scheduled_wave_repeats_for_time():
+    item = ScheduledWave(WAVE, 0.5)
+    frames = [item.next_frame() for _ in range(item.total)]
+    assert item.total == 5
+    assert item.done
+    assert frames[2] == WAVE[0]
+
+
+def test_scheduled_wave_empty():
+    with pytest.raises(ValueError):
+        ScheduledWave([])
+
+
+def test_tick_feeds_just_in_time():
+    client = FakeClient()
+    scheduler = WaveScheduler(client, lead_frames=2, chunk_frames=3)
+
+    async def run():
+        await scheduler.play(WAVE, 1, Channel.A)
+        await scheduler._tick(0.0)
+        await scheduler._tick(0.1)
+        assert len(client.sent) == 1
+        assert client.sent[0]["channel"] == "A"
+        assert client.sent[0]["time"] == 1
+        assert scheduler.position(Channel.A, now=0.1) == pytest.approx(0.1)
+        assert scheduler.remaining(Channel.A, now=0.1) == pytest.approx(0.9)
+        await scheduler._tick(0.3)
+        assert len(client.sent) == 2
+
+    asyncio.run(run())
+
+
+def test_interrupt_clears_queue():
+    client = FakeClient()
+    scheduler = WaveScheduler(client)
+
+    async def run():
+        await scheduler.play(WAVE, 5, Channel.BOTH)
+        await scheduler.play(LOUD, 1, Channel.A, PlayMode.INTERRUPT)
+        assert client.cleared == [Channel.A]
+        assert scheduler.now_playing(Channel.A) is None
+        assert scheduler.remaining(Channel.A, now=0.0) == pytest.approx(1.0)
+        assert scheduler.remaining(Channel.B, now=0.0) == pytest.approx(5.0)
+
+    asyncio.run(run())
+
+
+def test_crossfade_blends_intensity():
+    client = FakeClient()
+    scheduler = WaveScheduler(client, crossfade_frames=1)
+
+    async def run():
+        await scheduler.play([[[10, 10, 10, 10], [0, 0, 0, 0]]], 5, Channel.A)
+        await scheduler.play(LOUD, 1, Channel.A, PlayMode.CROSSFADE)
+        frames = scheduler._timelines[Channel.A].take(2)
+        assert frames[0] == [[20, 20, 20, 20], [50, 50, 50, 50]]
+        assert frames[1] == LOUD[0]
+
+    asyncio.run(run())
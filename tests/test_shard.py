@@ -0,0 +1,100 @@
+import asyncio
+import pickle
+import threading
+
+import pytest
+
+from dglabv3.shard import ShardedSessionHost, _Worker, shard_for
+
+
+def test_shard_for_is_stable():
+    assert shard_for("user-1", 4) == shard_for("user-1", 4)
+    assert {shard_for(i, 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_host_routes_calls_to_workers():
+    host = ShardedSessionHost(workers=2)
+
+    async def run():
+        await host.start()
+        try:
+            assert await host.call("user", "sessions") == []
+            with pytest.raises(KeyError):
+                await host.call("user", "get_strength_value", 1)
+            with pytest.raises(AttributeError):
+                await host.call("user", "close_everything")
+        finally:
+            await host.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 60))
+
+
+class PickleConn:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(pickle.loads(pickle.dumps(message)))
+
+
+class Unpicklable(Exception):
+    def __init__(self):
+        super().__init__("no pickle")
+        self.lock = threading.Lock()
+
+
+def test_worker_replies_when_value_cannot_be_pickled():
+    conn = PickleConn()
+    worker = _Worker(conn, {})
+
+    async def fail():
+        raise Unpicklable()
+
+    async def run():
+        worker.sessions["user"] = type("Client", (), {"is_connected": lambda self: threading.Lock()})()
+        await worker._execute(1, "user", "is_connected", (), {})
+        worker.sessions["user"].clear_wave = lambda channel: fail()
+        await worker._execute(2, "user", "clear_wave", (1,), {})
+
+    worker.loop.run_until_complete(run())
+    worker.loop.close()
+    (_, first, ok1, error1), (_, second, ok2, error2) = conn.sent
+    assert (first, ok1, second, ok2) == (1, False, 2, False)
+    assert "Unpicklable result" in str(error1) and "no pickle" in str(error2)
+
+
+def test_worker_forgets_session_that_failed_to_connect():
+    worker = _Worker(PickleConn(), {"url": "ws://127.0.0.1:9/"})
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await worker._open("user", 1)
+        assert worker.sessions == {}
+
+    worker.loop.run_until_complete(run())
+    worker.loop.close()
+
+
+def test_pending_calls_fail_when_worker_dies():
+    from websockets.asyncio.server import serve
+
+    async def silent(ws):
+        await ws.wait_closed()
+
+    async def run():
+        async with serve(silent, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            host = ShardedSessionHost(workers=1, client_kwargs={"url": f"ws://127.0.0.1:{port}/"})
+            await host.start()
+            try:
+                pending = asyncio.create_task(host.open_session("user", 30))
+                await asyncio.sleep(1)
+                host._processes[0].kill()
+                with pytest.raises(ConnectionError):
+                    await asyncio.wait_for(pending, 10)
+                with pytest.raises(ConnectionError):
+                    await host.call("user", "sessions")
+            finally:
+                await host.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 60))
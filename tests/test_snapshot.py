@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel, Strength
+from dglabv3.relay import DGLabRelay
+from dglabv3.snapshot import SessionSnapshot, SessionSnapshotter, SnapshotStore, WaveState, restore_sessions
+from tests.test_relay import fake_app, recv_message
+
+
+def test_store_roundtrip(tmp_path):
+    async def run():
+        store = SnapshotStore(str(tmp_path / "sessions.db"))
+        snapshot = SessionSnapshot(
+            key="user",
+            url="ws://relay/",
+            client_id="c",
+            target_id="t",
+            strength=Strength(A=5, B=6, MAXA=100, MAXB=120),
+            waves={"A": WaveState(["0a0a0a0a00000000"], 10, time.time())},
+            saved_at=time.time(),
+        )
+        await store.save([snapshot])
+        assert await store.load_all() == [snapshot]
+        assert await store.load_all(max_age=-1) == []
+        await store.delete("user")
+        assert await store.load_all() == []
+        store.close()
+
+    asyncio.run(run())
+
+
+def test_wave_state_rotation():
+    wave = WaveState([str(i) for i in range(10)], 5, 100.0)
+    assert wave.rotated(100.35) == ["3", "4", "5", "6", "7", "8", "9", "0", "1", "2"]
+    assert wave.remaining(102.0) == 3.0
+
+
+def test_untrack_without_loop_deletes_on_flush(tmp_path):
+    store = SnapshotStore(str(tmp_path / "sessions.db"))
+    snapshotter = SessionSnapshotter(store)
+    client = dglabv3(url="ws://relay/")
+    snapshotter.track("user", client)
+    asyncio.run(snapshotter.flush())
+    snapshotter.untrack("user")
+    asyncio.run(snapshotter.flush())
+    assert asyncio.run(store.load_all()) == []
+    store.close()
+
+
+def test_restore_resumes_binding(tmp_path):
+    async def run():
+        relay = DGLabRelay(host="127.0.0.1", port=0, resume_grace=5)
+        await relay.start()
+        store = SnapshotStore(str(tmp_path / "sessions.db"))
+        snapshotter = SessionSnapshotter(store)
+        client = dglabv3(url=relay.url)
+        restored = {}
+        try:
+            await client.connect_and_wait(timeout=5)
+            app, app_id = await fake_app(relay, client.client_id)
+            await client.wait_for_app_connect(timeout=5)
+            await client.set_strength_value(Channel.A, 7)
+            snapshotter.track("user", client)
+            await client.send_wave_message([[[10, 10, 10, 10], [50, 50, 50, 50]]] * 10, 30, Channel.A)
+            await recv_message(app, "pulse-A:")
+            await snapshotter.flush()
+            old_id = client.client_id
+            await client.close()
+            for _ in range(50):
+                if relay.metrics()["detached_current"] == 1:
+                    break
+                await asyncio.sleep(0.02)
+            assert relay.metrics()["detached_current"] == 1
+
+            restored = await restore_sessions(store, timeout=5)
+            assert list(restored) == ["user"]
+            new_client = restored["user"]
+            assert new_client.client_id == old_id
+            assert new_client.target_id == app_id
+            # 波形與強度都重新送到原本的App，App端沒有收到斷開通知
+            assert (await recv_message(app, "strength-1+2+7"))["clientId"] == old_id
+            assert (await recv_message(app, "pulse-A:"))["clientId"] == old_id
+            assert relay.metrics()["resumes_total"] == 1
+            await app.close()
+        finally:
+            await snapshotter.close()
+            store.close()
+            for session in restored.values():
+                await session.close()
+            await client.close()
+            await relay.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 20))
+
+
+def test_grace_expiry_breaks_binding():
+    async def run():
+        relay = DGLabRelay(host="127.0.0.1", port=0, resume_grace=0.1)
+        await relay.start()
+        client = dglabv3(url=relay.url)
+        try:
+            await client.connect_and_wait(timeout=5)
+            app, _ = await fake_app(relay, client.client_id)
+            await client.wait_for_app_connect(timeout=5)
+            await client.close()
+            while (message := json.loads(await asyncio.wait_for(app.recv(), 5)))["type"] != "break":
+                assert message["type"] == "msg"
+            assert relay.metrics()["resume_expired_total"] == 1
+            await app.close()
+        finally:
+            await client.close()
+            await relay.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 20))
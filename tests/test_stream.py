@@ -0,0 +1,108 @@
+import asyncio
+import json
+import wave
+
+import numpy as np
+import pytest
+
+from dglabv3.dtype import Channel
+from dglabv3.stream import AudioStream, wav_source
+
+SR = 8000
+
+
+class FakeClient:
+    target_id = "target"
+
+    def __init__(self):
+        self.sent = []
+
+    def is_connected(self):
+        return True
+
+    @staticmethod
+    def _wave2hex(data):
+        return ["".join(format(num, "02X") for num in sum(item, [])) for item in data]
+
+    async def _send_message(self, message, update=True):
+        self.sent.append(message)
+
+
+def write_wav(path, seconds=1.0, channels=1):
+    t = np.arange(int(SR * seconds)) / SR
+    y = np.sin(2 * np.pi * 220 * t) * (t % 0.25 < 0.1)
+    pcm = (np.repeat(y[:, None], channels, axis=1) * 20000).astype("<i2")
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(channels)
+        file.setsampwidth(2)
+        file.setframerate(SR)
+        file.writeframes(pcm.tobytes())
+
+
+def test_wav_realtime_feed(tmp_path):
+    path = tmp_path / "tone.wav"
+    write_wav(path, channels=2)
+    client = FakeClient()
+    stream = AudioStream(client, SR, channels=2, mode="onset")
+
+    async def run():
+        await stream.run(wav_source(str(path)))
+
+    asyncio.run(run())
+    assert stream.frames == 10
+    assert stream.dropped == 0
+    assert len(client.sent) == 20
+    assert {message["channel"] for message in client.sent} == {"A", "B"}
+    assert all(message["time"] == 1 for message in client.sent)
+    hex_frames = json.loads(client.sent[0]["message"][2:])
+    assert len(hex_frames) == 1 and len(hex_frames[0]) == 16
+    assert stream.latency.count == 10
+    assert stream.latency.max < 300
+
+
+def test_latency_budget_drops_frames(tmp_path):
+    path = tmp_path / "tone.wav"
+    write_wav(path)
+    client = FakeClient()
+    stream = AudioStream(client, SR, mode="bands", channel=Channel.A, max_latency=0.3)
+
+    async def run():
+        await stream.run(wav_source(str(path), speed=0))
+
+    asyncio.run(run())
+    assert stream.frames == 10
+    assert stream.dropped > 0
+    assert len(client.sent) == stream.frames - stream.dropped
+    assert all(message["channel"] == "A" for message in client.sent)
+
+
+def test_partial_samples_are_buffered():
+    client = FakeClient()
+    stream = AudioStream(client, SR, frames_per_send=2)
+    pcm = (np.ones(stream.chunk_samples * 2, dtype="<i2") * 1000).tobytes()
+
+    async def run():
+        await stream.write(pcm[:3])
+        await stream.write(pcm[3:])
+
+    asyncio.run(run())
+    assert stream.frames == 2
+    assert len(client.sent) == 2
+    assert len(json.loads(client.sent[0]["message"][2:])) == 2
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        AudioStream(FakeClient(), SR, sample_format="u8")
+
+
+def test_stereo_stream_drives_channels_independently():
+    client = FakeClient()
+    stream = AudioStream(client, SR, channels=2, stereo=True, mode="centroid")
+    t = np.arange(stream.chunk_samples * 3) / SR
+    left = np.sin(2 * np.pi * 220 * t)
+    pcm = (np.stack([left, np.zeros_like(left)], axis=1) * 20000).astype("<i2").tobytes()
+
+    asyncio.run(stream.write(pcm))
+    sent = {message["channel"]: message["message"] for message in client.sent[-2:]}
+    assert sent["A"] != sent["B"]
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import threading
+import time
+
+from dglabv3.dtype import Channel
+from dglabv3.sync import SyncDGLab
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+
+class YieldingSocket(FakeSocket):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def send(self, text):
+        # 越早的呼叫等越久，並行執行時順序就會顛倒
+        self.calls += 1
+        await asyncio.sleep(max(0.0, 0.02 - self.calls * 0.001))
+        await super().send(text)
+
+
+def test_commands_run_in_order_on_shared_loop():
+    first = SyncDGLab()
+    second = SyncDGLab()
+    assert first.loop is second.loop
+    first.client.client = FakeSocket()
+
+    futures = [first.set_strength_value(Channel.A, value, wait=False) for value in range(1, 21)]
+    for future in futures:
+        future.result(5)
+    messages = [message["message"] for message in first.client.client.sent]
+    assert messages == [f"strength-1+2+{value}" for value in range(1, 21)]
+    assert first.get_strength_value(Channel.A) == 20
+
+
+def test_commands_from_many_threads():
+    client = SyncDGLab()
+    client.client.client = FakeSocket()
+    threads = [threading.Thread(target=client.clear_wave, args=(Channel.A,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(client.client.client.sent) == 8
+
+
+def test_order_kept_across_batches_when_send_yields():
+    client = SyncDGLab()
+    client.client.client = YieldingSocket()
+    futures = []
+    for value in range(1, 21):
+        futures.append(client.set_strength_value(Channel.A, value, wait=False))
+        # 讓每則指令落在不同批次，前一批仍在等待 send 時下一批就開始排程
+        time.sleep(0.0005)
+    for future in futures:
+        future.result(5)
+    messages = [message["message"] for message in client.client.client.sent]
+    assert messages == [f"strength-1+2+{value}" for value in range(1, 21)]
+
+
+def test_qrcode_renders_on_loop_thread():
+    from dglabv3.qrcache import QRCodeCache
+
+    threads = []
+
+    class RecordingCache(QRCodeCache):
+        async def render(self, data):
+            threads.append(threading.current_thread().name)
+            return await super().render(data)
+
+    client = SyncDGLab(qr_cache=RecordingCache())
+    client.client.client_id = "client"
+    assert client.generate_qrcode_text()
+    assert client.generate_qrcode().getvalue().startswith(b"\x89PNG")
+    assert threads == ["dglabv3-loop", "dglabv3-loop"]
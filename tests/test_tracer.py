@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel
+from dglabv3.tracer import LatencyHistogram, LatencyTracer, ProfileHooks
+from dglabv3.waves import PULSES
+
+
+class FakeSocket:
+    async def send(self, text):
+        pass
+
+
+def make_client():
+    client = dglabv3()
+    client.client = FakeSocket()
+    client.client_id, client.target_id = "client", "app"
+    return client
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram((10, 100))
+    for ms in (1, 2, 50, 500):
+        histogram.record(ms)
+    assert histogram.count == 4
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(75) == 100
+    assert histogram.percentile(100) == 500
+    assert histogram.to_dict()["buckets"] == {"10": 2, "100": 1, "inf": 1}
+
+
+def test_tracer_matches_report_to_command():
+    client = make_client()
+    tracer = LatencyTracer()
+    tracer.attach(client)
+
+    async def run():
+        await client.set_strength_value(Channel.A, 10)
+        await client.set_strength_value(Channel.A, 20)
+        report = {"type": "msg", "message": "strength-5+0+100+100"}
+        await client._handle_message(json.dumps(report))
+        assert tracer.histogram(client).count == 0
+        report["message"] = "strength-20+0+100+100"
+        await client._handle_message(json.dumps(report))
+
+    asyncio.run(run())
+    assert tracer.histogram(client).count == 1
+    assert "client" in tracer.summary()
+    tracer.detach(client)
+    assert not client._taps
+
+
+def test_profile_hooks_toggle():
+    client = make_client()
+    entered = []
+    hooks = ProfileHooks(on_enter=entered.append)
+    hooks.install(client)
+
+    async def run():
+        await client.send_wave_message(PULSES["呼吸"], 1, Channel.A)
+        hooks.enabled = False
+        await client.send_wave_message(PULSES["呼吸"], 1, Channel.A)
+
+    asyncio.run(run())
+    assert entered == ["_build_wave_messages", "_send_message"]
+    assert hooks.stats()["_send_message"]["calls"] == 1
+    hooks.uninstall(client)
+    assert "_send_message" not in client.__dict__
+
+
+def test_profile_hooks_call_outermost_only():
+    client = make_client()
+    calls = []
+    hooks = ProfileHooks(
+        on_enter=lambda name: calls.append(("enter", name)), on_exit=lambda name: calls.append(("exit", name))
+    )
+    hooks.install(client)
+
+    async def run():
+        message = {"type": "bind", "clientId": "client", "targetId": "app", "message": "200"}
+        await client._handle_message(json.dumps(message))
+        client._heartbeat_task.cancel()
+
+    asyncio.run(run())
+    assert calls == [("enter", "_handle_message"), ("exit", "_handle_message")]
+    assert hooks.stats()["_send_message"]["calls"] >= 2
+
+
+def test_profile_hooks_track_depth_per_task():
+    class SlowSocket:
+        async def send(self, text):
+            await asyncio.sleep(0.01)
+
+    clients = [make_client() for _ in range(2)]
+    calls = []
+    hooks = ProfileHooks(
+        on_enter=lambda name: calls.append(("enter", name)), on_exit=lambda name: calls.append(("exit", name))
+    )
+    for client in clients:
+        client.client = SlowSocket()
+        hooks.install(client)
+
+    async def run():
+        message = {"type": "heartbeat", "message": "200"}
+        await asyncio.gather(*(client._send_message(dict(message)) for client in clients))
+
+    asyncio.run(run())
+    assert sorted(calls) == [("enter", "_send_message")] * 2 + [("exit", "_send_message")] * 2
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from websockets.asyncio.server import serve
+
+from dglabv3.transport import MultiplexTransport, WebSocketTransport, _mux_connections
+
+
+async def echo(ws):
+    async for message in ws:
+        await ws.send(message)
+
+
+async def mux_echo(ws):
+    async for raw in ws:
+        envelope = json.loads(raw)
+        if envelope.get("open"):
+            await ws.send(json.dumps({"mux": envelope["mux"], "data": f"hello {envelope['mux']}"}))
+        elif "data" in envelope:
+            await ws.send(raw)
+
+
+def test_websocket_transport_roundtrip():
+    async def run():
+        async with serve(echo, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            transport = WebSocketTransport(f"ws://127.0.0.1:{port}/", compression=None, ping_interval=None)
+            await transport.connect()
+            await transport.send("ping")
+            async for message in transport:
+                assert message == "ping"
+                break
+            await transport.close()
+
+    asyncio.run(run())
+
+
+def test_websocket_send_many_drains_once():
+    async def run():
+        async with serve(echo, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            transport = WebSocketTransport(f"ws://127.0.0.1:{port}/", compression=None, ping_interval=None)
+            await transport.connect()
+            drains = []
+            drain = transport._ws.drain
+
+            async def counting_drain():
+                drains.append(1)
+                await drain()
+
+            transport._ws.drain = counting_drain
+            await transport.send_many(["a", "b", "c"])
+            assert len(drains) == 1
+            received = []
+            async for message in transport:
+                received.append(message)
+                if len(received) == 3:
+                    break
+            assert received == ["a", "b", "c"]
+            await transport.close()
+
+    asyncio.run(run())
+
+
+def test_multiplex_transport_shares_one_socket():
+    connections = []
+
+    async def handler(ws):
+        connections.append(ws)
+        await mux_echo(ws)
+
+    async def run():
+        async with serve(handler, "127.0.0.1", 0) as server:
+            url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/mux"
+            first, second = MultiplexTransport(url), MultiplexTransport(url)
+            await first.connect()
+            await second.connect()
+            first_iter, second_iter = first.__aiter__(), second.__aiter__()
+            assert await first_iter.__anext__() == "hello 1"
+            assert await second_iter.__anext__() == "hello 2"
+            await second.send("only second")
+            assert await second_iter.__anext__() == "only second"
+            await first.close()
+            await second.close()
+            assert not _mux_connections
+        assert len(connections) == 1
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_multiplex_reopens_while_last_channel_closes():
+    connections = []
+
+    async def handler(ws):
+        connections.append(ws)
+        await mux_echo(ws)
+
+    async def run():
+        async with serve(handler, "127.0.0.1", 0) as server:
+            url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/mux"
+            first, second = MultiplexTransport(url), MultiplexTransport(url)
+            await first.connect()
+            await asyncio.gather(first.close(), second.connect())
+            second_iter = second.__aiter__()
+            assert (await second_iter.__anext__()).startswith("hello")
+            await second.send("still open")
+            assert await second_iter.__anext__() == "still open"
+            assert _mux_connections
+            await second.close()
+            assert not _mux_connections
+        assert len(connections) == 2
+
+    asyncio.run(asyncio.wait_for(run(), 10))
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from dglabv3.dglab import dglabv3
+from dglabv3.dtype import Channel
+from dglabv3.waves import PULSES
+from dglabv3.wavescript import WaveCompiler, WaveScriptError
+
+
+def test_segments_and_ranges():
+    program = WaveCompiler().compile("100ms f=10 i=0..30; 100ms i=100 # hold\nrest 100ms")
+    assert program.shared
+    assert program.wave() == [
+        [[10, 10, 10, 10], [0, 10, 20, 30]],
+        [[10, 10, 10, 10], [100, 100, 100, 100]],
+        [[0, 0, 0, 0], [0, 0, 0, 0]],
+    ]
+    assert program.duration == pytest.approx(0.3)
+
+
+def test_reproduces_handwritten_pulse():
+    source = """
+    [100ms f=10 i=100; 100ms i=0]x2
+    50ms i=100; 50ms i=0
+    """
+    program = WaveCompiler().compile(source)
+    assert program.wave() == [
+        [[10, 10, 10, 10], [100, 100, 100, 100]],
+        [[10, 10, 10, 10], [0, 0, 0, 0]],
+        [[10, 10, 10, 10], [100, 100, 100, 100]],
+        [[10, 10, 10, 10], [0, 0, 0, 0]],
+        [[10, 10, 10, 10], [100, 100, 0, 0]],
+    ]
+    quick_pinch = "100ms f=10 i=0; 100ms i=100; rest 200ms"
+    assert WaveCompiler().compile(quick_pinch).wave() == PULSES["快速按捏"]
+
+
+def test_hex_matches_encoder():
+    program = WaveCompiler().compile("1s f=10+t*200 i=50+50*sin(2*pi*t)")
+    wave = program.wave()
+    assert program.hex() == dglabv3._wave2hex(wave)
+    assert all(10 <= f <= 240 for frame in wave for f in frame[0])
+    assert all(0 <= i <= 100 for frame in wave for i in frame[1])
+
+
+def test_channel_tracks():
+    program = WaveCompiler().compile("A: [100ms i=100; 100ms i=0]x3\nB: 300ms f=20 i=50\nAB: 100ms i=10")
+    assert not program.shared
+    assert len(program.wave(Channel.A)) == 7
+    assert program.wave(Channel.B) == [[[20, 20, 20, 20], [50, 50, 50, 50]]] * 3 + [[[20, 20, 20, 20], [10] * 4]]
+
+
+def test_sticky_values_and_padding():
+    program = WaveCompiler().compile("75ms f=30 i=40; 50ms i=60")
+    assert program.wave() == [[[30, 30, 30, 30], [40, 40, 40, 60]], [[30, 0, 0, 0], [60, 0, 0, 0]]]
+
+
+def test_cache_by_source():
+    compiler = WaveCompiler(maxsize=2)
+    first = compiler.compile("100ms i=10")
+    assert compiler.compile("100ms i=10") is first
+    compiler.compile("100ms i=20")
+    compiler.compile("100ms i=30")
+    assert len(compiler) == 2
+    assert compiler.compile("100ms i=10") is not first
+    assert (compiler.hits, compiler.misses) == (1, 4)
+    with pytest.raises(ValueError):
+        first.a[0, 0, 0] = 1
+
+
+@pytest.mark.parametrize(
+    "source, message",
+    [
+        ("", "no segments"),
+        ("110ms i=1", "multiple of 25ms"),
+        ("100ms i=__import__('os')", "line 1, column 7"),
+        ("100ms i=x", "unknown name"),
+        ("100ms i=foo(t)", "unknown function"),
+        ("[100ms i=1", "missing ']'"),
+        ("100ms i=1]", "unmatched"),
+        ("100ms; i=10", "unexpected"),
+        ("100ms\n  $", "line 2, column 3"),
+        ("[1s i=1]x61", "longer than 60s"),
+        ("[" * 2000 + "100ms i=1" + "]" * 2000, "nested deeper than 16"),
+    ],
+)
+def test_errors(source, message):
+    with pytest.raises(WaveScriptError, match=message.replace("(", r"\(").replace("]", r"\]")):
+        WaveCompiler().compile(source)
+
+
+def test_hostile_expressions_are_bounded():
+    program = WaveCompiler().compile("100ms f=9**9**9 i=1/0-1/0")
+    assert program.wave() == [[[240] * 4, [0] * 4]]
+    with pytest.raises(WaveScriptError, match="too long"):
+        WaveCompiler().compile("100ms i=" + "+".join(["t"] * 40))
+
+
+def test_send_script_to_empty_track():
+    client = dglabv3()
+
+    async def run():
+        with pytest.raises(WaveScriptError, match="no segments for channel B"):
+            await client.send_wave_script("A: 100ms i=10", channel=Channel.B)
+
+    asyncio.run(run())